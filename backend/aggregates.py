@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Supplier & agency aggregates
+----------------------------
+• Materialised per-supplier and per-agency views of the award history: win
+  count, total and median award value, category mix, counterpart mix (which
+  agencies a supplier wins at / which suppliers win at an agency) and
+  monthly activity.
+• Built from the full history in one columnar NumPy pass (codes + bincount
+  / lexsort) — straight from the memory-mapped award columns when the API
+  has them (from_columns) — then kept current by AwardHistory listeners that only touch
+  the entities a new award mentions.
+• An agency → category → supplier table answers "who usually wins this
+  agency's software tenders" with a dictionary lookup.
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from awards import Award, AwardHistory
+from columnar import AwardColumns
+from historical import QuantileTable
+
+RECENT_MONTHS = 12
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# ---------------------------------------------------------------------------
+# 1  Entity view
+# ---------------------------------------------------------------------------
+
+
+def entity_key(name: str) -> str:
+    """Lookup key for a supplier / agency name (case and spacing folded)."""
+    return " ".join((name or "").split()).upper()
+
+
+def _month_index(m: str) -> int:
+    return int(m[:4]) * 12 + int(m[5:7]) - 1
+
+
+class EntityStats:
+    """Running aggregates for one supplier or agency."""
+
+    __slots__ = ("name", "wins", "total", "amounts", "categories",
+                 "counterparts", "monthly", "last_award")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wins = 0
+        self.total = 0.0
+        self.amounts = QuantileTable()
+        self.categories: Counter = Counter()
+        self.counterparts: Counter = Counter()
+        self.monthly: Counter = Counter()        # "YYYY-MM" → wins
+        self.last_award: Optional[str] = None
+
+    def add(self, award: Award, counterpart: str) -> None:
+        self.wins += 1
+        if award.amount:
+            self.total += award.amount
+            self.amounts.add(award.amount)
+        self.categories[award.category] += 1
+        if counterpart:
+            self.counterparts[counterpart] += 1
+        if award.award_date:
+            self.monthly[award.award_date[:7]] += 1
+            if self.last_award is None or award.award_date > self.last_award:
+                self.last_award = award.award_date
+
+    def recent_wins(self, months: int = RECENT_MONTHS, today: Optional[date] = None) -> int:
+        today = today or date.today()
+        now = today.year * 12 + today.month - 1
+        return sum(n for m, n in self.monthly.items() if 0 <= now - _month_index(m) < months)
+
+    def to_dict(self, top: int = 5) -> Dict:
+        return {
+            "name": self.name,
+            "wins": self.wins,
+            "total_value": self.total,
+            "median_value": self.amounts.quantile(0.5),
+            "category_mix": {c: n / self.wins for c, n in self.categories.most_common()},
+            "top_counterparts": self.counterparts.most_common(top),
+            "recent_wins": self.recent_wins(),
+            "last_award": self.last_award,
+        }
+
+
+# ---------------------------------------------------------------------------
+# 2  Columnar bulk build
+# ---------------------------------------------------------------------------
+
+
+def _codes(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    uniq, inv = np.unique(np.asarray(values, dtype=object).astype(str), return_inverse=True)
+    return np.asarray(uniq.tolist(), dtype=object), inv.reshape(-1)
+
+
+def _entity_codes(names: Sequence[str], key: Callable[[str], str] = entity_key
+                  ) -> Tuple[List[str], List[str], np.ndarray]:
+    """Codes over entity keys, plus each key's display name (first spelling seen)."""
+    raw, first, raw_codes = np.unique(np.asarray(names, dtype=object).astype(str),
+                                      return_index=True, return_inverse=True)
+    return _keyed_codes(raw.tolist(), first.tolist(), raw_codes.reshape(-1), key)
+
+
+def _keyed_codes(raw: List[str], first: Sequence[int], raw_codes: np.ndarray,
+                 key: Callable[[str], str]) -> Tuple[List[str], List[str], np.ndarray]:
+    """Regroup codes over distinct raw names (`first`: where each was first
+    seen) into codes over their entity keys."""
+    keys = [key(n) if n else "" for n in raw]
+    display: Dict[str, Tuple[int, str]] = {}
+    for k, n, at in zip(keys, raw, first):
+        if k not in display or at < display[k][0]:
+            display[k] = (at, n)
+    uniq, key_codes = _codes(keys)
+    uniq = list(uniq)
+    return uniq, [display[k][1] for k in uniq], key_codes[raw_codes]
+
+
+def _group_counts(a: np.ndarray, b: np.ndarray, nb: int) -> Dict[int, List[Tuple[int, int]]]:
+    """(a, b) pair counts as {a: [(b, count), ...]} from one np.unique."""
+    pairs, counts = np.unique(a * nb + b, return_counts=True)
+    out: Dict[int, List[Tuple[int, int]]] = {}
+    for p, n in zip(pairs.tolist(), counts.tolist()):
+        out.setdefault(p // nb, []).append((p % nb, n))
+    return out
+
+
+def _build_views(own: np.ndarray, own_keys: List[str], own_names: List[str],
+                 other: np.ndarray, other_names: List[str], cat: np.ndarray,
+                 cat_names: np.ndarray, month: np.ndarray, month_names: np.ndarray,
+                 amount: np.ndarray, day: np.ndarray) -> Dict[str, EntityStats]:
+    n_own = len(own_names)
+    wins = np.bincount(own, minlength=n_own)
+    total = np.bincount(own, weights=np.nan_to_num(amount), minlength=n_own)
+    last = np.full(n_own, -1, dtype=np.int64)
+    np.maximum.at(last, own, day)
+
+    # amounts grouped per entity, already sorted within each group
+    priced = np.flatnonzero(~np.isnan(amount))
+    order = priced[np.lexsort((amount[priced], own[priced]))]
+    bounds = np.searchsorted(own[order], np.arange(n_own + 1))
+
+    cat_mix = _group_counts(own, cat, len(cat_names))
+    counter_mix = _group_counts(own, other, len(other_names))
+    monthly = _group_counts(own, month, len(month_names))
+
+    views: Dict[str, EntityStats] = {}
+    for i, (key, name) in enumerate(zip(own_keys, own_names)):
+        if not key:
+            continue
+        s = EntityStats(name)
+        s.wins = int(wins[i])
+        s.total = float(total[i])
+        s.amounts = QuantileTable(amount[order[bounds[i]:bounds[i + 1]]].tolist())
+        s.categories = Counter({cat_names[c]: n for c, n in cat_mix.get(i, [])})
+        s.counterparts = Counter({other_names[c]: n for c, n in counter_mix.get(i, [])
+                                  if other_names[c]})
+        s.monthly = Counter({month_names[m]: n for m, n in monthly.get(i, [])
+                             if month_names[m]})
+        s.last_award = date.fromordinal(int(last[i])).isoformat() if last[i] > 0 else None
+        views[key] = s
+    return views
+
+
+# ---------------------------------------------------------------------------
+# 3  Materialised views over the award history
+# ---------------------------------------------------------------------------
+
+
+class AwardAggregates:
+    """Supplier and agency views plus an agency → category → supplier table.
+
+    `supplier_key` maps a supplier name to its grouping key; pass
+    EntityResolver.key so spelling variants count as one competitor.
+    """
+
+    def __init__(self, supplier_key: Callable[[str], str] = entity_key) -> None:
+        self._supplier_key = supplier_key
+        self.suppliers: Dict[str, EntityStats] = {}
+        self.agencies: Dict[str, EntityStats] = {}
+        # agency key → category → supplier key → [wins, total value]
+        self.winners: Dict[str, Dict[str, Dict[str, List[float]]]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, history: AwardHistory,
+                     supplier_key: Callable[[str], str] = entity_key) -> "AwardAggregates":
+        agg = cls(supplier_key)
+        agg.build(history.awards)
+        history.subscribe(agg.add_awards)
+        return agg
+
+    @classmethod
+    def from_columns(cls, columns: AwardColumns, history: Optional[AwardHistory] = None,
+                     supplier_key: Callable[[str], str] = entity_key) -> "AwardAggregates":
+        """Build the views from the column store; with `history`, follow
+        its syncs as from_history does."""
+        agg = cls(supplier_key)
+        agg.build_columns(columns)
+        if history is not None:
+            history.subscribe(agg.add_awards)
+        return agg
+
+    def build(self, awards: Sequence[Award]) -> None:
+        """Rebuild every view from scratch in one columnar pass."""
+        if not awards:
+            return
+        sup_keys, sup_names, sup = _entity_codes([a.supplier for a in awards], self._supplier_key)
+        agy_keys, agy_names, agy = _entity_codes([a.agency for a in awards])
+        cat_names, cat = _codes([a.category for a in awards])
+        mon_names, mon = _codes([(a.award_date or "")[:7] for a in awards])
+        amount = np.array([a.amount if a.amount else np.nan for a in awards], dtype=np.float64)
+        day = np.array([date.fromisoformat(a.award_date).toordinal() if a.award_date else -1
+                        for a in awards], dtype=np.int64)
+        self._build(sup_keys, sup_names, sup, agy_keys, agy_names, agy,
+                    cat_names, cat, mon_names, mon, amount, day)
+
+    def build_columns(self, columns: AwardColumns) -> None:
+        """build() over the column store: the dictionaries are already codes,
+        so only the distinct names go through Python."""
+        if not len(columns):
+            return
+        suppliers, agencies = columns.supplier_names(), columns.agency_names()
+        sup_keys, sup_names, sup = _keyed_codes(suppliers, range(len(suppliers)),
+                                                columns.supplier, self._supplier_key)
+        agy_keys, agy_names, agy = _keyed_codes(agencies, range(len(agencies)),
+                                                columns.agency, entity_key)
+        months, mon = np.unique(columns.day.astype("M8[M]"), return_inverse=True)
+        mon_names = ["" if np.isnat(m) else str(m) for m in months]
+        day = columns.column("day")
+        day = np.where(day == np.iinfo(np.int64).min, -1, day + _EPOCH_ORDINAL)
+        self._build(sup_keys, sup_names, sup, agy_keys, agy_names, agy,
+                    columns.categories, columns.category.astype(np.int64),
+                    mon_names, mon.reshape(-1), np.asarray(columns.amount), day)
+
+    def _build(self, sup_keys: List[str], sup_names: List[str], sup: np.ndarray,
+               agy_keys: List[str], agy_names: List[str], agy: np.ndarray,
+               cat_names: Sequence[str], cat: np.ndarray, mon_names: Sequence[str],
+               mon: np.ndarray, amount: np.ndarray, day: np.ndarray) -> None:
+        suppliers = _build_views(sup, sup_keys, sup_names, agy, agy_names, cat, cat_names,
+                                 mon, mon_names, amount, day)
+        agencies = _build_views(agy, agy_keys, agy_names, sup, sup_names, cat, cat_names,
+                                mon, mon_names, amount, day)
+
+        n_sup, n_cat = len(sup_names), len(cat_names)
+        cell = (agy * n_cat + cat) * n_sup + sup
+        cells, inv = np.unique(cell, return_inverse=True)
+        wins = np.bincount(inv.reshape(-1))
+        value = np.bincount(inv.reshape(-1), weights=np.nan_to_num(amount))
+        winners: Dict[str, Dict[str, Dict[str, List[float]]]] = {}
+        for c, w, v in zip(cells.tolist(), wins.tolist(), value.tolist()):
+            s, rest = c % n_sup, c // n_sup
+            ak, sk = agy_keys[rest // n_cat], sup_keys[s]
+            if ak and sk:
+                winners.setdefault(ak, {}).setdefault(cat_names[rest % n_cat], {})[sk] = [int(w), float(v)]
+
+        with self._lock:
+            self.suppliers, self.agencies, self.winners = suppliers, agencies, winners
+
+    def add_awards(self, awards: Iterable[Award]) -> None:
+        """Incremental update: only the entities named by the new awards change."""
+        with self._lock:
+            for a in awards:
+                sk = self._supplier_key(a.supplier) if a.supplier else ""
+                ak = entity_key(a.agency)
+                sup = self.suppliers.setdefault(sk, EntityStats(a.supplier)) if sk else None
+                agy = self.agencies.setdefault(ak, EntityStats(a.agency)) if ak else None
+                if sup:
+                    sup.add(a, agy.name if agy else "")
+                if agy:
+                    agy.add(a, sup.name if sup else "")
+                if sk and ak:
+                    cell = (self.winners.setdefault(ak, {}).setdefault(a.category, {})
+                            .setdefault(sk, [0, 0.0]))
+                    cell[0] += 1
+                    cell[1] += a.amount or 0.0
+
+    # ............................................................. lookups
+
+    def supplier(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            s = self.suppliers.get(self._supplier_key(name))
+            return s.to_dict() if s else None
+
+    def agency(self, name: str) -> Optional[Dict]:
+        with self._lock:
+            s = self.agencies.get(entity_key(name))
+            return s.to_dict() if s else None
+
+    def top_winners(self, agency: str, category: Optional[str] = None, k: int = 10) -> List[Dict]:
+        """Suppliers ranked by wins at an agency, optionally within a category."""
+        with self._lock:
+            by_cat = self.winners.get(entity_key(agency), {})
+            rows: Dict[str, List[float]] = {}
+            for cells in ([by_cat.get(category, {})] if category else by_cat.values()):
+                for sk, (w, v) in cells.items():
+                    acc = rows.setdefault(sk, [0, 0.0])
+                    acc[0] += w
+                    acc[1] += v
+            total = sum(w for w, _ in rows.values()) or 1
+            ranked = sorted(rows.items(), key=lambda kv: (-kv[1][0], -kv[1][1]))[:k]
+            return [{"supplier": self.suppliers[sk].name if sk in self.suppliers else sk,
+                     "wins": int(w), "share": w / total, "total_value": v}
+                    for sk, (w, v) in ranked]
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Analysis store
+--------------
+• Every finished tender analysis is kept in a local SQLite file, so a
+  result outlives the /analyze response and the Dashboard can list and
+  filter past analyses without recomputing anything.
+• Rows are keyed by the tender's fingerprint (normalised title,
+  description and estimate: case, punctuation, spacing and "SGD 1,000,000"
+  vs "1000000 SGD" do not matter) and a config digest (the options that
+  change the answer, the LLM model and the store format). Time budgets are
+  not part of the key: they decide how complete a result is, not what it is.
+• Each row also records the award-data version it was computed against
+  (the number of awards in the local store). A lookup is a hit only for
+  that same version and a complete (not degraded) result, so a re-analysis
+  is served instantly until new awards arrive.
+• Summary columns (category, bid range, risk, comparables used) are
+  stored alongside the JSON result so listing and filtering stay cheap.
+• Each analysis' keywords are indexed (analysis_terms), so the analyses a
+  newly synced award would show up for can be found without scanning
+  every stored result (affected()); reanalysis.py uses this to re-run only
+  those after a sync and advance() the rest to the new data version.
+• WAL mode: several API workers can read while one writes.
+
+Usage:
+  python analyses.py list --q network --limit 10
+  python analyses.py show <fingerprint>
+
+Requires:
+  nothing beyond the standard library
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import threading
+import unicodedata
+from dataclasses import asdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from awards import categorise, parse_award_amount
+from federated import currency_of, to_sgd
+
+ANALYSIS_DB_PATH = os.getenv(
+    "ANALYSIS_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "analyses.sqlite3"),
+)
+FORMAT_VERSION = 1
+# options that only bound how long an analysis may take
+TIMING_OPTIONS = ("budget", "gebiz_deadline", "ted_deadline")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id            INTEGER PRIMARY KEY,
+    fingerprint   TEXT NOT NULL,
+    config        TEXT NOT NULL,
+    data_version  INTEGER NOT NULL,
+    title         TEXT NOT NULL,
+    description   TEXT,
+    estimate      TEXT,
+    options       TEXT,              -- JSON, the options the config digest covers
+    estimate_sgd  REAL,
+    category      TEXT,
+    keywords      TEXT,              -- JSON list
+    bid_min       REAL,
+    bid_max       REAL,
+    risk          TEXT,
+    confidence    TEXT,
+    comparables   INTEGER,
+    degraded      INTEGER NOT NULL,
+    created       REAL NOT NULL,
+    updated       REAL NOT NULL,
+    result        TEXT NOT NULL,     -- JSON TenderAnalysis
+    UNIQUE (fingerprint, config)
+);
+CREATE INDEX IF NOT EXISTS analyses_updated ON analyses (updated);
+CREATE INDEX IF NOT EXISTS analyses_category ON analyses (category, updated);
+CREATE TABLE IF NOT EXISTS analysis_terms (
+    analysis_id   INTEGER NOT NULL,
+    word          TEXT NOT NULL,     -- first word of the keyword, the lookup key
+    keyword       TEXT NOT NULL,     -- normalised keyword; every word must match
+    PRIMARY KEY (analysis_id, keyword)
+);
+CREATE INDEX IF NOT EXISTS analysis_terms_word ON analysis_terms (word);
+"""
+
+# added after the first release of the store; older files get them on open
+_LATER_COLUMNS = {"description": "TEXT", "options": "TEXT"}
+# SQLite's limit on bound parameters is 999 on older builds
+_IN_CHUNK = 900
+
+_SUMMARY = ("fingerprint, config, data_version, title, estimate, estimate_sgd, category, "
+            "keywords, bid_min, bid_max, risk, confidence, comparables, degraded, created, updated")
+
+# ---------------------------------------------------------------------------
+# 1  Keys
+# ---------------------------------------------------------------------------
+
+
+def _normalise_text(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    return " ".join(re.findall(r"\w+", text))
+
+
+def fingerprint(title: str, description: str, estimate: Any) -> str:
+    """Stable id of a tender: same wording (modulo case, punctuation and
+    spacing) and same estimate → same fingerprint."""
+    amount = parse_award_amount(str(estimate or ""))
+    blob = json.dumps([_normalise_text(title), _normalise_text(description),
+                       amount, currency_of(str(estimate or ""))])
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:32]
+
+
+def result_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """The options that change the answer (not just how long it may take)."""
+    return {k: v for k, v in options.items() if k not in TIMING_OPTIONS}
+
+
+def config_digest(options: Dict[str, Any], model: str) -> str:
+    """Digest of everything besides the tender that shapes the answer."""
+    kept = result_options(options)
+    blob = json.dumps([kept, model, FORMAT_VERSION], sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def _terms(keywords: Iterable[str]) -> Dict[str, str]:
+    """Normalised keyword → its first word (keywords without words dropped)."""
+    out = {}
+    for kw in keywords:
+        norm = _normalise_text(str(kw))
+        if norm:
+            out[norm] = norm.split()[0]
+    return out
+
+
+def _plain(v: Any) -> Any:
+    """json.dumps fallback for NumPy scalars / arrays in analysis results."""
+    if hasattr(v, "tolist"):
+        return v.tolist()
+    return str(v)
+
+
+# ---------------------------------------------------------------------------
+# 2  Store
+# ---------------------------------------------------------------------------
+
+
+class AnalysisStore:
+    """SQLite-backed analyses, one row per (fingerprint, config); thread-safe."""
+
+    def __init__(self, path: str = ANALYSIS_DB_PATH) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+            have = {r["name"] for r in self._db.execute("PRAGMA table_info(analyses)")}
+            for col, kind in _LATER_COLUMNS.items():
+                if col not in have:
+                    self._db.execute(f"ALTER TABLE analyses ADD COLUMN {col} {kind}")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    # ...................................................... read
+
+    @staticmethod
+    def _summary(row: sqlite3.Row) -> Dict:
+        out = {k: row[k] for k in _SUMMARY.split(", ")}
+        out["keywords"] = json.loads(out["keywords"] or "[]")
+        out["degraded"] = bool(out["degraded"])
+        return out
+
+    def get(self, fp: str, config: str, data_version: Optional[int] = None) -> Optional[Dict]:
+        """The stored analysis for this tender and config, or None. With a
+        data_version, only a complete result computed against that version
+        counts."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {_SUMMARY}, result FROM analyses "
+                                   "WHERE fingerprint = ? AND config = ?", (fp, config)).fetchone()
+        if row is None:
+            return None
+        if data_version is not None and (row["data_version"] != data_version or row["degraded"]):
+            return None
+        result = json.loads(row["result"])
+        if data_version is not None and "error" in (result.get("bid_recommendation") or {}):
+            return None                     # saved as complete before errors counted as degraded
+        return {**self._summary(row), "result": result}
+
+    def versions(self, fp: str) -> List[Dict]:
+        """Every stored analysis of one tender (one per config), newest first."""
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_SUMMARY}, result FROM analyses WHERE fingerprint = ? "
+                                    "ORDER BY updated DESC", (fp,)).fetchall()
+        return [{**self._summary(r), "result": json.loads(r["result"])} for r in rows]
+
+    def query(self, text: Optional[str] = None, category: Optional[str] = None,
+              risk: Optional[str] = None, since: Optional[float] = None,
+              degraded: Optional[bool] = None, limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Summaries (no full results), newest first. `text` matches title or keywords."""
+        where, args = [], []
+        if text:
+            where.append("(title LIKE ? OR keywords LIKE ?)")
+            args += [f"%{text}%"] * 2
+        if category:
+            where.append("category = ?")
+            args.append(category)
+        if risk:
+            where.append("risk = ?")
+            args.append(risk)
+        if since is not None:
+            where.append("updated >= ?")
+            args.append(since)
+        if degraded is not None:
+            where.append("degraded = ?")
+            args.append(int(degraded))
+        sql = f"SELECT {_SUMMARY} FROM analyses"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY updated DESC LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._db.execute(sql, (*args, limit, offset)).fetchall()
+        return [self._summary(r) for r in rows]
+
+    # ...................................................... write
+
+    def save(self, fp: str, config: str, data_version: int, title: str, description: str,
+             estimate: Any, analysis: Any, options: Optional[Dict[str, Any]] = None) -> Dict:
+        """Insert or replace the analysis of this tender under this config,
+        with its keywords as dependency terms."""
+        result = asdict(analysis) if not isinstance(analysis, dict) else analysis
+        bid = result.get("bid_recommendation") or {}
+        stats = (result.get("pricing_analysis") or {}).get("stats") or {}
+        amount = parse_award_amount(str(estimate or ""))
+        now = time.time()
+        row = {
+            "fingerprint": fp, "config": config, "data_version": data_version,
+            "title": title, "description": description, "estimate": str(estimate),
+            "options": json.dumps(result_options(options or {}), default=repr),
+            "category": categorise(f"{title} {description}"),
+            "estimate_sgd": to_sgd(amount, currency_of(str(estimate or ""))),
+            "keywords": json.dumps(result.get("keywords") or []),
+            "bid_min": bid.get("bid_range_min_amt"), "bid_max": bid.get("bid_range_max_amt"),
+            "risk": bid.get("risk_level"), "confidence": bid.get("confidence_level"),
+            "comparables": stats.get("comparables"),
+            "degraded": int(bool(result.get("degraded")) or "error" in bid),
+            "created": now, "updated": now,
+            "result": json.dumps(result, default=_plain, ensure_ascii=False),
+        }
+        cols = ", ".join(row)
+        with self._lock, self._db:
+            self._db.execute(
+                f"INSERT INTO analyses ({cols}) VALUES ({', '.join('?' * len(row))}) "
+                "ON CONFLICT (fingerprint, config) DO UPDATE SET "
+                + ", ".join(f"{k} = excluded.{k}" for k in row if k != "created"),
+                tuple(row.values()))
+            aid = self._db.execute("SELECT id FROM analyses WHERE fingerprint = ? AND config = ?",
+                                   (fp, config)).fetchone()[0]
+            self._db.execute("DELETE FROM analysis_terms WHERE analysis_id = ?", (aid,))
+            self._db.executemany("INSERT INTO analysis_terms (analysis_id, word, keyword) "
+                                 "VALUES (?, ?, ?)",
+                                 [(aid, w, kw) for kw, w in _terms(result.get("keywords") or []).items()])
+        return self._summary_of(fp, config)
+
+    def _summary_of(self, fp: str, config: str) -> Dict:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_SUMMARY} FROM analyses WHERE fingerprint = ? "
+                                   "AND config = ?", (fp, config)).fetchone()
+        return self._summary(row)
+
+    def delete(self, fp: str) -> int:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM analysis_terms WHERE analysis_id IN "
+                             "(SELECT id FROM analyses WHERE fingerprint = ?)", (fp,))
+            return self._db.execute("DELETE FROM analyses WHERE fingerprint = ?", (fp,)).rowcount
+
+    # ...................................................... dependencies
+
+    def affected(self, texts: Sequence[str]) -> Set[int]:
+        """Ids of the analyses one of these award descriptions would have
+        been found for: all words of one of their keywords occur in it."""
+        postings: Dict[str, Set[int]] = {}          # word → texts containing it
+        for i, text in enumerate(texts):
+            for w in set(_normalise_text(text).split()):
+                postings.setdefault(w, set()).add(i)
+        if not postings:
+            return set()
+        words, hits = list(postings), set()
+        with self._lock:
+            for j in range(0, len(words), _IN_CHUNK):
+                chunk = words[j:j + _IN_CHUNK]
+                rows = self._db.execute(
+                    "SELECT analysis_id, keyword FROM analysis_terms "
+                    f"WHERE word IN ({', '.join('?' * len(chunk))})", chunk).fetchall()
+                for aid, kw in rows:
+                    if aid in hits:
+                        continue
+                    docs = None
+                    for w in kw.split():
+                        docs = postings.get(w, set()) if docs is None else docs & postings.get(w, set())
+                        if not docs:
+                            break
+                    if docs:
+                        hits.add(aid)
+        return hits
+
+    def advance(self, old_version: int, new_version: int, keep: Iterable[int] = ()) -> int:
+        """Move analyses that were current at old_version to new_version,
+        except those in `keep` (the ones new awards affect); returns how many."""
+        keep = list(keep)
+        # rows from before dependencies were tracked cannot be vouched for
+        sql = ("UPDATE analyses SET data_version = ? WHERE data_version = ? AND degraded = 0 "
+               "AND description IS NOT NULL")
+        with self._lock, self._db:
+            if keep:
+                self._db.execute("CREATE TEMP TABLE IF NOT EXISTS _keep (id INTEGER PRIMARY KEY)")
+                self._db.execute("DELETE FROM _keep")
+                self._db.executemany("INSERT OR IGNORE INTO _keep VALUES (?)", [(k,) for k in keep])
+                sql += " AND id NOT IN (SELECT id FROM _keep)"
+            return self._db.execute(sql, (new_version, old_version)).rowcount
+
+    def stale(self, data_version: int, ids: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Complete analyses computed against older award data (optionally
+        only these ids), with what is needed to re-run them, newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT id, {_SUMMARY}, description, options, result FROM analyses "
+                "WHERE data_version < ? AND degraded = 0 ORDER BY updated DESC",
+                (data_version,)).fetchall()
+        wanted = set(ids) if ids is not None else None
+        return [{**self._summary(r), "id": r["id"], "description": r["description"],
+                 "options": json.loads(r["options"] or "{}"), "result": json.loads(r["result"])}
+                for r in rows if wanted is None or r["id"] in wanted]
+
+
+# ---------------------------------------------------------------------------
+# 3  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Stored tender analyses.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ls = sub.add_parser("list", help="newest analyses first")
+    ls.add_argument("--q", help="text in the title or keywords")
+    ls.add_argument("--category")
+    ls.add_argument("--risk")
+    ls.add_argument("--limit", type=int, default=20)
+    show = sub.add_parser("show", help="every stored analysis of one tender")
+    show.add_argument("fingerprint")
+    args = ap.parse_args(argv)
+
+    store = AnalysisStore()
+    if args.cmd == "list":
+        for a in store.query(args.q, args.category, args.risk, limit=args.limit):
+            rng = (f"{a['bid_min']:,.0f}–{a['bid_max']:,.0f}" if a["bid_min"] and a["bid_max"]
+                   else "–")
+            print(f"  • {a['fingerprint'][:12]}  {time.strftime('%Y-%m-%d', time.localtime(a['updated']))}"
+                  f"  {a['category']:12} {rng:>24}  {a['title'][:50]}")
+    else:
+        print(json.dumps(store.versions(args.fingerprint), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,31 +1,374 @@
-from flask import Flask, request, jsonify
+import os
+import math
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import Flask, Request, request, jsonify
 from flask_cors import CORS  # only if your frontend is on another port
-from main import TenderAnalyzer  # or wherever TenderAnalyzer is defined
+from main import ANALYSIS_OPTIONS, TenderAnalyzer  # or wherever TenderAnalyzer is defined
+from document_loader import extract_offer_file
+from awards import AwardHistory
+from columnar import AwardColumns
+from analyses import AnalysisStore
+from historical import HistoricalIndex
+from trends import TrendEngine
+from aggregates import AwardAggregates
+from entities import EntityResolver
+from sketches import SketchIndex
+from offer_optimiser import optimise
+from sensitivity import analyse_sensitivity
+from pareto import DEFAULT_OBJECTIVES, OBJECTIVES, pareto_front
+import profiling
+import breakers
+import deadlines
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", tempfile.gettempdir())
+MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "200"))
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+class DiskRequest(Request):
+    """Spool every uploaded file straight into its own temp file (keeping the
+    extension for the loaders) instead of buffering it in memory. The files
+    are remembered and removed when the request ends, whichever route or
+    form field they came in on and however the request ended."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        suffix = os.path.splitext(filename or "")[1].lower()
+        f = tempfile.NamedTemporaryFile("wb+", suffix=suffix, dir=UPLOAD_DIR, delete=False)
+        if not hasattr(self, "spooled"):
+            self.spooled = []
+        self.spooled.append(f)
+        return f
+
 
 app = Flask(__name__)
+app.request_class = DiskRequest
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
 CORS(app)  # optional but likely necessary
+# X-Profile / ?profile= / PROFILE_SAMPLE_RATE; artifacts under /profiles
+profiling.install(app)
+
+
+@app.teardown_request
+def remove_spooled_uploads(exc):
+    for f in getattr(request, "spooled", ()):
+        f.close()
+        try:
+            os.unlink(f.name)
+        except OSError:
+            pass
+
+
+award_history = AwardHistory()
+# Memory-mapped columns shared by every worker process; the indexes below
+# bulk-build from them and then follow the history's syncs
+award_columns = AwardColumns.from_history(award_history)
+award_sketches = SketchIndex.from_history(award_history)
+# finished analyses, kept for the Dashboard and served again on repeat requests
+analysis_store = AnalysisStore()
+# GeBIZ supplier spellings → canonical ids. The resolver subscribes before
+# the aggregates, so new spellings have ids before the aggregates (GeBIZ
+# history only) group them; TED winners are resolved as they appear in
+# cross-market comparables
+supplier_entities = EntityResolver.from_history(award_history)
+analyzer = TenderAnalyzer(sketches=award_sketches, columns=award_columns, store=analysis_store,
+                          entities=supplier_entities)
+historical_index = HistoricalIndex.from_columns(award_columns, award_history)
+trend_engine = TrendEngine.from_columns(award_columns, award_history)
+award_aggregates = AwardAggregates.from_columns(award_columns, award_history,
+                                                supplier_entities.key)
+
+# Shared by all requests, so concurrent uploads never run more than
+# EXTRACT_WORKERS parses at once; the rest queue
+_extract_pool = None
+
+
+def _get_extract_pool():
+    global _extract_pool
+    if _extract_pool is None:
+        _extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    return _extract_pool
+
+
+# accepted range per analysis option: (low, high, low excluded). The caps keep
+# one request from holding a worker or allocating without limit; a budget
+# or deadline of 0 would switch the request deadline off
+OPTION_RANGES = {
+    "budget": (0, 120, True),
+    "search_limit": (1, 100, False),
+    "gebiz_deadline": (0, 60, True),
+    "ted_deadline": (0, 60, True),
+    "top_k": (1, 500, False),
+    "min_score": (0, 1, False),
+    "competitors": (1, 50, False),
+    "scenarios": (1, 1_000_000, False),
+    "cost_ratio": (0, 2, True),
+}
+
+
+def _analysis_options(raw):
+    """Client `options` checked against ANALYSIS_OPTIONS: only those names
+    (so refresh / previous / tolerance cannot be slipped in), each of its
+    default's type and within OPTION_RANGES. Raises ValueError."""
+    if not isinstance(raw, dict):
+        raise ValueError("'options' must be an object")
+    opts = {}
+    for name, value in raw.items():
+        if name not in ANALYSIS_OPTIONS:
+            raise ValueError(f"Unknown analysis option: {name}")
+        default = ANALYSIS_OPTIONS[name]
+        number = (isinstance(value, (int, float)) and not isinstance(value, bool)
+                  and math.isfinite(value))
+        if isinstance(default, bool):
+            if not isinstance(value, bool):
+                raise ValueError(f"Analysis option '{name}' must be true or false")
+        elif default is None or isinstance(default, int):
+            # top_k defaults to None (no cap) but otherwise takes a count
+            if not (number and float(value).is_integer()) and not (default is None and value is None):
+                raise ValueError(f"Analysis option '{name}' must be an integer")
+            value = None if value is None else int(value)
+        elif not number:
+            raise ValueError(f"Analysis option '{name}' must be a number")
+        if value is not None and name in OPTION_RANGES:
+            lo, hi, open_lo = OPTION_RANGES[name]
+            if not ((value > lo if open_lo else value >= lo) and value <= hi):
+                raise ValueError(f"Analysis option '{name}' must be in "
+                                 f"{'(' if open_lo else '['}{lo}, {hi}]")
+        opts[name] = value
+    return opts
 
-analyzer = TenderAnalyzer()
 
 @app.route("/analyze", methods=["POST"])
 def analyze():
-    data = request.json
+    data = request.json or {}
     title = data.get("title", "Untitled Tender")
     description = data.get("description", "")
     estimated_value = data.get("estimated_value", "1000000 SGD")
 
-    result = analyzer.analyse_tender(title, description, estimated_value)
+    try:
+        options = _analysis_options(data.get("options") or {})
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = analyzer.analyse_tender(title, description, estimated_value,
+                                     refresh=bool(data.get("refresh")), **options)
 
     return jsonify({
         "keywords": result.keywords,
         "similar_tenders": result.similar_tenders,
         "pricing_analysis": result.pricing_analysis,
-        "bid_recommendation": result.bid_recommendation
+        "bid_recommendation": result.bid_recommendation,
+        "ted_tenders": result.ted_tenders,
+        "cross_market": result.cross_market,
+        "sources": result.sources,
+        "degraded": bool(result.degraded),
+        "degraded_parts": result.degraded,
+        "timings": result.timings,
+        "cached_stages": result.cached_stages,
+        "fingerprint": result.fingerprint,
+        "stored": result.stored
     })
 
+@app.route("/analyses")
+def analyses():
+    try:
+        limit = min(int(request.args.get("limit", 50)), 500)
+        offset = int(request.args.get("offset", 0))
+        since = float(request.args["since"]) if "since" in request.args else None
+    except ValueError:
+        return jsonify({"error": "'limit', 'offset' and 'since' must be numeric"}), 400
+    degraded = request.args.get("degraded")
+    rows = analysis_store.query(request.args.get("q"), request.args.get("category"),
+                                request.args.get("risk"), since,
+                                None if degraded is None else degraded in ("1", "true"),
+                                limit, offset)
+    return jsonify({"analyses": rows, "limit": limit, "offset": offset, "total": len(analysis_store)})
+
+@app.route("/analyses/<fingerprint>")
+def stored_analysis(fingerprint):
+    versions = analysis_store.versions(fingerprint)
+    if not versions:
+        return jsonify({"error": f"No stored analysis '{fingerprint}'"}), 404
+    return jsonify({"fingerprint": fingerprint, "analyses": versions})
+
+@app.route("/extract", methods=["POST"])
+def extract():
+    uploads = request.files.getlist("files")
+    if not uploads:
+        return jsonify({"error": "No files uploaded (use multipart field 'files')"}), 400
+
+    pool = _get_extract_pool()
+    jobs = []
+    for up in uploads:
+        path = up.stream.name
+        up.stream.flush()
+        jobs.append((up.filename, path, time.perf_counter(), pool.submit(extract_offer_file, path)))
+
+    # the spooled files are removed when the request ends (remove_spooled_uploads)
+    results = []
+    for filename, path, t0, fut in jobs:
+        try:
+            res = fut.result()
+            results.append({"filename": filename, "ok": True, **res,
+                            "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+        except Exception as e:
+            results.append({"filename": filename, "ok": False, "error": str(e),
+                            "fields": {}, "confidence": 0.0})
+
+    return jsonify({"results": results})
+
+@app.route("/historical/compare", methods=["POST"])
+def historical_compare():
+    data = request.json or {}
+    try:
+        return jsonify(historical_index.compare(
+            amount=data.get("amount"),
+            score=data.get("score"),
+            category=data.get("category"),
+            agency=data.get("agency"),
+            description=data.get("description", ""),
+            currency=data.get("currency") or "SGD",
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/historical/percentile")
+def historical_percentile():
+    metric = request.args.get("metric", "price")
+    dim = request.args.get("dimension", "all")
+    key = request.args.get("key", "")
+    try:
+        value = float(request.args["value"])
+    except (KeyError, ValueError):
+        return jsonify({"error": "numeric 'value' query parameter required"}), 400
+    return jsonify({"percentile": historical_index.percentile(metric, value, dim, key),
+                    **historical_index.distribution(metric, dim, key)})
+
+@app.route("/trends")
+def trends():
+    dim = request.args.get("dimension", "all")
+    key = request.args.get("key", "")
+    try:
+        window = int(request.args.get("window", 12))
+        half_life = float(request.args.get("halfLife", 365))
+    except ValueError:
+        return jsonify({"error": "'window' and 'halfLife' must be numeric"}), 400
+    return jsonify({
+        "dimension": dim,
+        "key": key,
+        "series": trend_engine.series(dim, key, start=request.args.get("from"),
+                                      end=request.args.get("to")),
+        "rolling": trend_engine.rolling(dim, key, window),
+        "recency_weighted": trend_engine.recency_weighted(dim, key, half_life),
+        "trend": trend_engine.trend(dim, key),
+    })
+
+@app.route("/market/quantiles")
+def market_quantiles():
+    dim = request.args.get("dimension", "all")
+    key = request.args.get("key", "")
+    try:
+        qs = [float(q) for q in request.args.get("q", "0.1,0.25,0.5,0.75,0.9").split(",")]
+        value = float(request.args["value"]) if "value" in request.args else None
+    except ValueError:
+        return jsonify({"error": "'q' must be comma-separated numbers and 'value' numeric"}), 400
+    out = award_sketches.quantiles(qs, dim, key)
+    if value is not None:
+        out["percentile"] = award_sketches.percentile(value, dim, key)
+    return jsonify(out)
+
+@app.route("/suppliers/<path:name>")
+def supplier_profile(name):
+    profile = award_aggregates.supplier(name)
+    if profile is None:
+        return jsonify({"error": f"No awards for supplier '{name}'"}), 404
+    return jsonify({**profile, "entity": supplier_entities.entity(name)})
+
+@app.route("/agencies/<path:name>")
+def agency_profile(name):
+    profile = award_aggregates.agency(name)
+    if profile is None:
+        return jsonify({"error": f"No awards for agency '{name}'"}), 404
+    return jsonify(profile)
+
+@app.route("/agencies/<path:name>/winners")
+def agency_winners(name):
+    try:
+        k = int(request.args.get("k", 10))
+    except ValueError:
+        return jsonify({"error": "'k' must be an integer"}), 400
+    return jsonify({"agency": name, "category": request.args.get("category"),
+                    "winners": award_aggregates.top_winners(name, request.args.get("category"), k)})
+
+@app.route("/optimise", methods=["POST"])
+def optimise_offers():
+    data = request.json or {}
+    try:
+        result = optimise(
+            data.get("offers", []),
+            criteria=data.get("criteria"),
+            k=int(data.get("k", 3)),
+            budget=data.get("budget"),
+            max_avg_risk=data.get("maxAvgRisk"),
+            max_risk_level=data.get("maxRiskLevel"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@app.route("/sensitivity", methods=["POST"])
+def sensitivity():
+    data = request.json or {}
+    try:
+        result = analyse_sensitivity(
+            data.get("offers", []),
+            criteria=data.get("criteria"),
+            mode=data.get("mode", "random"),
+            samples=int(data.get("samples", 2000)),
+            spread=float(data.get("spread", 0.25)),
+            vary=data.get("vary"),
+            steps=int(data.get("steps", 5)),
+            k=int(data.get("k", 3)),
+            seed=data.get("seed"),
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+@app.route("/pareto", methods=["POST"])
+def pareto():
+    data = request.json or {}
+    offers = data.get("offers", [])
+    objectives = data.get("objectives") or DEFAULT_OBJECTIVES
+    if not isinstance(offers, list) or not all(isinstance(o, dict) for o in offers):
+        return jsonify({"error": "offers must be a list of objects"}), 400
+    if not isinstance(objectives, (list, tuple)) or not all(isinstance(o, str) for o in objectives):
+        return jsonify({"error": "objectives must be a list of names"}), 400
+    unknown = [o for o in objectives if o not in OBJECTIVES]
+    if unknown:
+        return jsonify({"error": f"Unknown objectives: {', '.join(unknown)}"}), 400
+    try:
+        frontier = pareto_front(offers, objectives)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"objectives": list(objectives), "frontier": frontier,
+                    "dominated": len(offers) - len(frontier)})
+
+@app.route("/metrics")
+def metrics():
+    # upstream health: circuit breaker states, hedged-call counts, memo hit rate
+    memo = analyzer.pipeline.memo
+    return jsonify({"breakers": breakers.snapshot(),
+                    "hedging": deadlines.hedge_stats,
+                    "memo": {"hits": memo.hits, "misses": memo.misses}})
+
 @app.route("/")
 def index():
     return "Tender Optimizer API is running ✅"
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=3000, debug=True)
+    # API_DEBUG=0 for load tests: the reloader and debugger skew latencies
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", "3000")),
+            debug=os.getenv("API_DEBUG", "1") == "1", threaded=True)
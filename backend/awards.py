@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Award history
+-------------
+• Normalises GeBIZ award records into one Award shape (amount, date, agency,
+  supplier, category).
+• Keeps a local append-only award history (JSONL) and syncs new records from
+  the GeBIZ open dataset page by page.
+• Notifies subscribed listeners of every batch of new awards, so derived
+  indexes (historical quantiles, trends, …) update incrementally instead of
+  rescanning the history.
+
+Usage:
+  python awards.py sync [--max-records N]
+
+Requires:
+  pip install requests
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import argparse
+import requests
+from datetime import datetime, date
+from dataclasses import dataclass, asdict
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+GEBIZ_DATASET_ID = "d_acde1106003906a75c3fa052592f2fcb"
+GEBIZ_ENDPOINT   = os.getenv("GEBIZ_ENDPOINT", "https://data.gov.sg/api/action/datastore_search")
+
+AWARD_HISTORY_PATH = os.getenv(
+    "AWARD_HISTORY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "awards.jsonl"),
+)
+
+# First matching category wins, so the more specific ones come first
+CATEGORY_KEYWORDS = {
+    "software":     ("software", "application", "system", "digital", "cloud", "portal",
+                     "data", "cyber", "ict", "it ", "network", "licen"),
+    "construction": ("construction", "building", "renovation", "civil", "erection",
+                     "addition and alteration", "a&a", "roof", "road"),
+    "maintenance":  ("maintenance", "repair", "servicing", "upkeep"),
+    "cleaning":     ("cleaning", "conservancy", "horticulture", "landscap", "pest"),
+    "security":     ("security", "guard", "surveillance", "cctv"),
+    "consultancy":  ("consultancy", "consultant", "study", "research", "advisory", "audit"),
+    "transport":    ("transport", "bus", "vehicle", "logistics", "shuttle"),
+    "medical":      ("medical", "clinical", "hospital", "health", "drug", "pharma"),
+    "training":     ("training", "course", "workshop", "education", "programme"),
+    "events":       ("event", "exhibition", "conference", "ceremony"),
+    "supplies":     ("supply", "supplies", "purchase", "procurement of", "equipment"),
+}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d %b %Y", "%d-%m-%Y", "%Y-%m-%dT%H:%M:%S")
+
+# ---------------------------------------------------------------------------
+# 1  Normalised award record
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Award:
+    source: str
+    award_id: str
+    description: str
+    agency: str
+    supplier: str
+    amount: Optional[float]
+    currency: str
+    award_date: Optional[str]     # ISO yyyy-mm-dd
+    category: str
+    status: str = ""
+    score: Optional[float] = None   # evaluation score, where the source publishes one
+
+    @property
+    def key(self) -> tuple:
+        # one tender can be awarded to several suppliers, so the tender number
+        # alone is not unique
+        return (self.source, self.award_id, self.supplier, self.amount)
+
+    @property
+    def day(self) -> Optional[date]:
+        return date.fromisoformat(self.award_date) if self.award_date else None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def categorise(text: str) -> str:
+    low = f" {text.lower()} "
+    for cat, words in CATEGORY_KEYWORDS.items():
+        if any(w in low for w in words):
+            return cat
+    return "other"
+
+
+def parse_date(v: str | None) -> Optional[str]:
+    if not v:
+        return None
+    s = str(v).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def parse_award_amount(v: str | float | int | None) -> Optional[float]:
+    if v in (None, "", "N/A", "–"):
+        return None
+    if isinstance(v, (int, float)):
+        return float(v) if v > 0 else None
+    s = str(v).replace(",", "").strip()
+    try:
+        val = float(s)
+    except ValueError:
+        try:
+            val = float(re.sub(r"[^\d.]", "", s))
+        except ValueError:
+            return None
+    return val if val > 0 else None
+
+
+def _field(rec: Dict, *names: str) -> str:
+    for n in names:
+        v = rec.get(n)
+        if v not in (None, ""):
+            return str(v).strip()
+    return ""
+
+
+def normalise_gebiz(rec: Dict) -> Award:
+    """Accepts both the datastore's snake_case columns and the title-case
+    names used in older exports ("Tender No", "Awarded Amt", …)."""
+    desc = _field(rec, "tender_description", "Tender Description", "description")
+    return Award(
+        source="gebiz",
+        award_id=_field(rec, "tender_no", "Tender No", "ref_no"),
+        description=desc,
+        agency=_field(rec, "agency", "Agency"),
+        supplier=_field(rec, "supplier_name", "Supplier Name"),
+        amount=parse_award_amount(rec.get("awarded_amt", rec.get("Awarded Amt"))),
+        currency="SGD",
+        award_date=parse_date(_field(rec, "award_date", "Award Date")),
+        category=categorise(desc),
+        status=_field(rec, "tender_detail_status", "Tender Detail Status"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# 2  Local history with change notification
+# ---------------------------------------------------------------------------
+
+AwardListener = Callable[[List[Award]], None]
+
+
+class AwardHistory:
+    """Append-only JSONL store of normalised awards.
+
+    Listeners registered with subscribe() receive each batch of newly added
+    awards (never duplicates), which is how derived indexes stay current.
+    """
+
+    def __init__(self, path: str = AWARD_HISTORY_PATH) -> None:
+        self.path = os.path.abspath(path)
+        self.awards: List[Award] = []
+        self._keys = set()
+        self._listeners: List[AwardListener] = []
+        self.sync_state: Dict = {"gebiz_offset": 0}
+        self._load()
+
+    # ........................................................ persistence
+
+    @property
+    def _state_path(self) -> str:
+        return self.path + ".state"
+
+    def _load(self) -> None:
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for ln in f:
+                    try:
+                        a = Award(**json.loads(ln))
+                    except (ValueError, TypeError):
+                        continue
+                    if a.key not in self._keys:
+                        self._keys.add(a.key)
+                        self.awards.append(a)
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r", encoding="utf-8") as f:
+                self.sync_state.update(json.load(f))
+
+    def _save_state(self) -> None:
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.sync_state, f)
+        os.replace(tmp, self._state_path)
+
+    # .............................................................. access
+
+    def __iter__(self) -> Iterator[Award]:
+        return iter(self.awards)
+
+    def __len__(self) -> int:
+        return len(self.awards)
+
+    def subscribe(self, listener: AwardListener) -> None:
+        self._listeners.append(listener)
+
+    def extend(self, awards: Iterable[Award]) -> List[Award]:
+        """Append unseen awards, persist them and notify listeners."""
+        new = []
+        for a in awards:
+            if a.key in self._keys:
+                continue
+            self._keys.add(a.key)
+            new.append(a)
+        if not new:
+            return new
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for a in new:
+                f.write(json.dumps(a.to_dict(), ensure_ascii=False) + "\n")
+        self.awards.extend(new)
+        for listener in self._listeners:
+            try:
+                listener(new)
+            except Exception as e:
+                print(f"⚠️ Award listener {getattr(listener, '__qualname__', listener)} failed:", e)
+        return new
+
+
+# ---------------------------------------------------------------------------
+# 3  GeBIZ sync
+# ---------------------------------------------------------------------------
+
+
+def sync_gebiz(history: AwardHistory, batch_size: int = 1000,
+               max_records: Optional[int] = None) -> int:
+    """Fetch GeBIZ records past the last synced offset; returns #new awards."""
+    added, fetched = 0, 0
+    offset = history.sync_state.get("gebiz_offset", 0)
+    while max_records is None or fetched < max_records:
+        params = {"resource_id": GEBIZ_DATASET_ID, "limit": batch_size, "offset": offset}
+        try:
+            r = requests.get(GEBIZ_ENDPOINT, params=params, timeout=30)
+            r.raise_for_status()
+            records = r.json()["result"]["records"]
+        except Exception as e:
+            print(f"⚠️ GeBIZ sync failed at offset {offset}:", e)
+            break
+        if not records:
+            break
+        added += len(history.extend(normalise_gebiz(rec) for rec in records))
+        offset += len(records)
+        fetched += len(records)
+        history.sync_state["gebiz_offset"] = offset
+        history._save_state()
+    return added
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Maintain the local award history.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("sync", help="pull new GeBIZ awards")
+    s.add_argument("--max-records", type=int)
+    s.add_argument("--batch-size", type=int, default=1000)
+    args = ap.parse_args(argv)
+
+    history = AwardHistory()
+    if args.cmd == "sync":
+        n = sync_gebiz(history, args.batch_size, args.max_records)
+        print(f"✅ {n} new awards ({len(history)} total)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite
+---------------
+• Replays recorded GeBIZ, TED and Gemini responses (bench_fixtures/*.json)
+  in place of the live services, so every run sees the same inputs and no
+  network: HTTP calls go through a patched requests Session, LLM calls
+  through a patched GenerativeModel.generate_content.
+• Times analyse_tender end to end and per stage, analyse_pricing,
+  bulk _extract_numeric_value parsing, PDF text extraction, the TED search
+  and the Flask API under concurrent load.
+• Writes machine-readable JSON; with --baseline it compares medians
+  against an earlier run and exits non-zero on a regression.
+• A benchmark that raises, or that hits a call with no recording in
+  replay mode, is reported under "failures" instead of timed, shows as
+  failed in the baseline comparison and makes the run exit non-zero.
+• Runs against a throwaway award history / sketch / supplier table, never
+  the files under data/.
+
+Usage:
+  python benchmarks.py                               # all benchmarks → stdout
+  python benchmarks.py --output bench.json --repeat 20
+  python benchmarks.py --baseline bench.json         # fail on >15% slower medians
+  python benchmarks.py --only analyse_pricing pdf_extract
+  python benchmarks.py --record                      # refresh fixtures from the live services
+
+Requires:
+  pip install numpy requests flask google-generativeai PyPDF2
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import subprocess
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE_DIR = os.getenv("BENCH_FIXTURES", os.path.join(HERE, "bench_fixtures"))
+BENCH_TENDER = os.path.join(HERE, "fake_tender.txt")
+
+DEFAULT_REPEAT = 10
+DEFAULT_TOLERANCE = 0.15        # a median more than 15% above baseline is a regression
+MIN_DELTA_MS = 0.5              # …unless it is slower by less than this (timer noise)
+DEFAULT_CONCURRENCY = 8
+API_REQUESTS = 64
+
+# ---------------------------------------------------------------------------
+# 1  Recorded responses
+# ---------------------------------------------------------------------------
+
+
+def request_key(method: str, url: str, params: Optional[Dict] = None,
+                body: Optional[Dict] = None) -> str:
+    """Stable fixture key for an HTTP call: method, URL and sorted payload."""
+    payload = json.dumps({"params": params or {}, "json": body or {}}, sort_keys=True, default=str)
+    return f"{method.upper()} {url} {payload}"
+
+
+def prompt_key(prompt: str) -> str:
+    """Fixture key for an LLM prompt: its first non-empty line (the task)
+    and its "Title:" line (the tender). The pricing figures in between move
+    with the calendar (recency weights), so they are left out."""
+    lines = [" ".join(ln.split()) for ln in str(prompt).splitlines() if ln.strip()]
+    title = next((ln for ln in lines if ln.startswith("Title:")), "")
+    return f"{lines[0] if lines else ''} | {title}"
+
+
+def _fixture_file(url: str) -> str:
+    return "ted" if "ted.europa.eu" in url else "gebiz"
+
+
+class RecordedResponse:
+    """The slice of requests.Response the backend uses."""
+
+    def __init__(self, status_code: int, text: str, url: str = "") -> None:
+        self.status_code = status_code
+        self.text = text
+        self.url = url
+        self.headers = {"Content-Type": "application/json"}
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode("utf-8")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self) -> None:
+        if not self.ok:
+            import requests
+            raise requests.HTTPError(f"{self.status_code} for {self.url} (recorded)", response=self)
+
+
+class RecordedLLMResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class Replay:
+    """Context manager that serves HTTP and Gemini calls from the fixtures.
+
+    With record=True the live services are called instead and every
+    response is written back to the fixture files on exit. A call with no
+    recording raises, exactly as a network failure would, so the code under
+    test takes its normal error path.
+    """
+
+    def __init__(self, fixture_dir: str = FIXTURE_DIR, record: bool = False) -> None:
+        self.fixture_dir = fixture_dir
+        self.record = record
+        self.fixtures: Dict[str, Dict[str, Dict]] = {
+            name: self._load(name) for name in ("gebiz", "ted", "llm")}
+        self.misses: List[str] = []
+        self._lock = threading.Lock()
+        self._patches: List = []
+
+    def _load(self, name: str) -> Dict[str, Dict]:
+        path = os.path.join(self.fixture_dir, f"{name}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self) -> None:
+        os.makedirs(self.fixture_dir, exist_ok=True)
+        for name, data in self.fixtures.items():
+            path = os.path.join(self.fixture_dir, f"{name}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, sort_keys=True, ensure_ascii=False)
+                f.write("\n")
+
+    # ............................................................ patches
+
+    def _http(self, original: Callable) -> Callable:
+        replay = self
+
+        def request(session, method, url, params=None, data=None, headers=None, *args, **kw):
+            key = request_key(method, url, params, kw.get("json"))
+            store = replay.fixtures[_fixture_file(url)]
+            if replay.record:
+                r = original(session, method, url, params, data, headers, *args, **kw)
+                with replay._lock:
+                    store[key] = {"status": r.status_code, "body": r.text}
+                return r
+            rec = store.get(key)
+            if rec is None:
+                import requests
+                with replay._lock:
+                    replay.misses.append(key)
+                raise requests.ConnectionError(f"no recorded response for {key}")
+            return RecordedResponse(rec["status"], rec["body"], url)
+
+        return request
+
+    def _llm(self, original: Callable) -> Callable:
+        replay = self
+
+        def generate_content(model, contents, *args, **kw):
+            key = prompt_key(contents)
+            store = replay.fixtures["llm"]
+            if replay.record:
+                r = original(model, contents, *args, **kw)
+                with replay._lock:
+                    store[key] = {"text": r.text}
+                return r
+            rec = store.get(key)
+            if rec is None:
+                with replay._lock:
+                    replay.misses.append(key)
+                raise RuntimeError(f"no recorded LLM response for {key}")
+            return RecordedLLMResponse(rec["text"])
+
+        return generate_content
+
+    def __enter__(self) -> "Replay":
+        import requests
+        import google.generativeai as genai
+        for owner, attr, wrap in ((requests.sessions.Session, "request", self._http),
+                                  (genai.GenerativeModel, "generate_content", self._llm)):
+            original = getattr(owner, attr)
+            self._patches.append((owner, attr, original))
+            setattr(owner, attr, wrap(original))
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for owner, attr, original in reversed(self._patches):
+            setattr(owner, attr, original)
+        self._patches.clear()
+        if self.record:
+            self.save()
+
+
+# ---------------------------------------------------------------------------
+# 2  Timing helpers
+# ---------------------------------------------------------------------------
+
+
+def summarise(samples_s: List[float]) -> Dict:
+    ms = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    return {
+        "runs": int(len(ms)),
+        "mean_ms": float(ms.mean()),
+        "median_ms": float(np.median(ms)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+    }
+
+
+def measure(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarise(samples)
+
+
+@contextlib.contextmanager
+def quiet():
+    """The analyzer reports progress with print(); keep it out of the timings' output."""
+    with open(os.devnull, "w", encoding="utf-8") as sink, contextlib.redirect_stdout(sink):
+        yield
+
+
+# ---------------------------------------------------------------------------
+# 3  Inputs
+# ---------------------------------------------------------------------------
+
+
+def bench_tender() -> Dict[str, str]:
+    from document_loader import iter_tender_file
+    return next(iter_tender_file(BENCH_TENDER))
+
+
+def synthetic_awards(n: int, seed: int = 7) -> List[Dict]:
+    """GeBIZ-shaped award records with a spread of descriptions, amounts
+    (including blanks and junk) and dates."""
+    rng = random.Random(seed)
+    words = ("software development cloud platform integration maintenance transit passenger "
+             "ticketing mobile application api database migration security testing support "
+             "network data analytics portal system upgrade renovation cleaning services").split()
+    out = []
+    for i in range(n):
+        amount = rng.choice([
+            f"{rng.lognormvariate(13.5, 1.0):.2f}",
+            f"{rng.lognormvariate(13.5, 1.0):,.0f}",
+            "", "N/A", "0",
+        ])
+        out.append({
+            "tender_no": f"BENCH{i:06d}",
+            "tender_description": " ".join(rng.choice(words) for _ in range(rng.randint(6, 18))),
+            "agency": f"Agency {rng.randint(1, 40)}",
+            "supplier_name": f"Supplier {rng.randint(1, 300)} Pte Ltd",
+            "awarded_amt": amount,
+            "award_date": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2018, 2025)}",
+            "tender_detail_status": "Awarded to Suppliers",
+        })
+    return out
+
+
+def synthetic_amounts(n: int, seed: int = 11) -> List[object]:
+    """Award / estimate values in the formats seen in GeBIZ, TED and user input."""
+    rng = random.Random(seed)
+    out: List[object] = []
+    for _ in range(n):
+        v = rng.lognormvariate(12.0, 1.5)
+        out.append(rng.choice([
+            f"{v:.2f}", f"{v:,.2f}", f"SGD {v:,.0f}", f"S${v:,.0f}", f"{v:,.0f} SGD",
+            f"\xa0{v:,.2f}\xa0", v, int(v), "", "N/A", "–", "0", None, "TBC",
+        ]))
+    return out
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def minimal_pdf(path: str, pages: int = 20, lines: int = 40) -> str:
+    """Write a plain-text PDF (Helvetica, one content stream per page)."""
+    objs = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+            "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for p in range(pages):
+        body = [f"Page {p + 1} line {i + 1}: supply, delivery and maintenance of "
+                f"transit ticketing systems" for i in range(lines)]
+        text = "\n".join(f"({_pdf_escape(ln)}) Tj T*" for ln in body)
+        stream = f"BT /F1 9 Tf 11 TL 40 800 Td\n{text}\nET"
+        objs.append(f"<< /Length {len(stream.encode())} >>\nstream\n{stream}\nendstream")
+        objs.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                    f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objs)} 0 R >>")
+        kids.append(f"{len(objs)} 0 R")
+    objs[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    buf = io.BytesIO()
+    buf.write(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objs, 1):
+        offsets.append(buf.tell())
+        buf.write(f"{i} 0 obj\n{body}\nendobj\n".encode())
+    xref = buf.tell()
+    buf.write(f"xref\n0 {len(objs) + 1}\n0000000000 65535 f \n".encode())
+    for off in offsets:
+        buf.write(f"{off:010d} 00000 n \n".encode())
+    buf.write(f"trailer\n<< /Size {len(objs) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    with open(path, "wb") as f:
+        f.write(buf.getvalue())
+    return path
+
+
+def _isolate(workdir: str, record: bool = False) -> None:
+    """Point every persistent store at a scratch directory before the
+    backend modules read their paths, and seed it with the recorded awards."""
+    os.environ["AWARD_HISTORY"] = os.path.join(workdir, "awards.jsonl")
+    os.environ["AWARD_SKETCHES"] = os.path.join(workdir, "award_sketches.json")
+    os.environ["SUPPLIER_ENTITIES"] = os.path.join(workdir, "suppliers.jsonl")
+    os.environ["AWARD_COLUMNS"] = os.path.join(workdir, "award_columns")
+    os.environ["ANALYSIS_DB"] = os.path.join(workdir, "analyses.sqlite3")
+    os.environ["PIPELINE_MEMO_ENTRIES"] = "0"      # time the stages, not the stage memo
+    if not record:
+        os.environ.setdefault("GEMINI_API_KEY", "replay")
+
+
+def _seed_history(replay: Replay) -> int:
+    from awards import AwardHistory, normalise_gebiz
+    records = []
+    for rec in replay.fixtures["gebiz"].values():
+        try:
+            records.extend(json.loads(rec["body"])["result"]["records"])
+        except (ValueError, KeyError, TypeError):
+            continue
+    return len(AwardHistory().extend(normalise_gebiz(r) for r in records))
+
+
+# ---------------------------------------------------------------------------
+# 4  Benchmarks
+# ---------------------------------------------------------------------------
+# Each returns {name: stats}; names with a "/" are sub-measurements.
+
+
+def bench_analyse_tender(ctx: Dict) -> Dict[str, Dict]:
+    from awards import AwardHistory
+    from main import TenderAnalyzer
+    from sketches import SketchIndex
+    from pipeline import Memo
+    analyzer = TenderAnalyzer(sketches=SketchIndex.from_history(AwardHistory()))
+    t = ctx["tender"]
+    args = (t["title"], t["description"], t["estimated_value"])
+    stages: Dict[str, List[float]] = {}
+    with quiet():
+        analyzer.analyse_tender(*args)
+        for _ in range(ctx["repeat"]):
+            res = analyzer.analyse_tender(*args)
+            for stage, secs in res.timings.items():
+                stages.setdefault(stage, []).append(secs)
+        # a repeat analysis with one tunable changed: only pricing onwards reruns
+        analyzer.pipeline.memo = Memo(entries=64)
+        analyzer.analyse_tender(*args)
+        memoised = measure(lambda: analyzer.analyse_tender(*args, min_score=0.21), ctx["repeat"], 0)
+    out = {"analyse_tender": summarise(stages.pop("total"))}
+    out.update({f"analyse_tender/{s}": summarise(v) for s, v in stages.items()})
+    out["analyse_tender/memoised_retune"] = memoised
+    return out
+
+
+def bench_analyse_pricing(ctx: Dict) -> Dict[str, Dict]:
+    from main import TenderAnalyzer
+    analyzer = TenderAnalyzer()
+    out = {}
+    with quiet():
+        for n in (100, 1000):
+            awards = synthetic_awards(n)
+            out[f"analyse_pricing/{n}"] = measure(
+                lambda: analyzer.analyse_pricing(awards, "1,500,000 SGD",
+                                                 ["software", "ticketing"], "transit system"),
+                ctx["repeat"])
+    return out
+
+
+def bench_numeric_parse(ctx: Dict) -> Dict[str, Dict]:
+    from main import TenderAnalyzer
+    values = synthetic_amounts(10_000)
+    parse = TenderAnalyzer._extract_numeric_value
+    with quiet():
+        stats = measure(lambda: [parse(v) for v in values], ctx["repeat"])
+    stats["values"] = len(values)
+    return {"extract_numeric_value/10000": stats}
+
+
+def bench_pdf_extract(ctx: Dict) -> Dict[str, Dict]:
+    from document_loader import extract_text
+    path = minimal_pdf(os.path.join(ctx["workdir"], "bench.pdf"))
+    return {"pdf_extract/20_pages": measure(lambda: extract_text(path), ctx["repeat"])}
+
+
+def bench_ted_search(ctx: Dict) -> Dict[str, Dict]:
+    from ted_api import get_similar_tenders
+    with quiet():
+        return {"ted_search": measure(lambda: get_similar_tenders("software", limit=20),
+                                      ctx["repeat"])}
+
+
+def bench_api(ctx: Dict) -> Dict[str, Dict]:
+    """Latency of /analyze and /market/quantiles with `concurrency` clients
+    sharing one app, as the dev server's threads would."""
+    import api
+    client = api.app.test_client()
+    t = ctx["tender"]
+    calls = {
+        # refresh: time the analysis itself, not the analysis store's lookup
+        "analyze": lambda: client.post("/analyze", json={
+            "title": t["title"], "description": t["description"],
+            "estimated_value": t["estimated_value"], "refresh": True}),
+        "market_quantiles": lambda: client.get("/market/quantiles"),
+    }
+    out = {}
+    n = ctx["concurrency"]
+    requests_per_run = max(API_REQUESTS, n)
+    for name, call in calls.items():
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def one() -> None:
+            t0 = time.perf_counter()
+            r = call()
+            dt = time.perf_counter() - t0
+            if r.status_code >= 500:
+                raise RuntimeError(f"/{name} returned {r.status_code}")
+            with lock:
+                latencies.append(dt)
+
+        with quiet():
+            call()
+            wall = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                for f in [pool.submit(one) for _ in range(requests_per_run)]:
+                    f.result()
+            wall = time.perf_counter() - wall
+        stats = summarise(latencies)
+        stats.update({"concurrency": n, "throughput_rps": requests_per_run / wall})
+        out[f"api/{name}"] = stats
+    return out
+
+
+BENCHMARKS: Dict[str, Callable[[Dict], Dict[str, Dict]]] = {
+    "analyse_tender": bench_analyse_tender,
+    "analyse_pricing": bench_analyse_pricing,
+    "extract_numeric_value": bench_numeric_parse,
+    "pdf_extract": bench_pdf_extract,
+    "ted_search": bench_ted_search,
+    "api": bench_api,
+}
+
+# ---------------------------------------------------------------------------
+# 5  Baseline comparison
+# ---------------------------------------------------------------------------
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[Dict]:
+    """Median-to-median comparison of every benchmark present in both runs.
+    Baseline results of a benchmark that failed this time count as regressed."""
+    rows = []
+    base = baseline.get("results", {})
+    failed = current.get("failures", {})
+    for name, stats in current.get("results", {}).items():
+        if name not in base:
+            continue
+        old, new = base[name]["median_ms"], stats["median_ms"]
+        ratio = new / old if old else float("inf")
+        rows.append({
+            "name": name, "baseline_ms": old, "current_ms": new, "ratio": ratio,
+            "regression": ratio > 1 + tolerance and new - old > MIN_DELTA_MS, "failed": False,
+        })
+    for name, stats in base.items():
+        if name.split("/", 1)[0] in failed:
+            rows.append({"name": name, "baseline_ms": stats["median_ms"], "current_ms": None,
+                         "ratio": None, "regression": True, "failed": True})
+    return rows
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 6  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the tender pipeline against recorded responses.")
+    ap.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run just these benchmarks")
+    ap.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="timed runs per benchmark")
+    ap.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="API client threads")
+    ap.add_argument("--output", help="write the JSON results here (default: stdout)")
+    ap.add_argument("--baseline", help="earlier results JSON to compare medians against")
+    ap.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                    help="allowed slowdown before a benchmark counts as regressed")
+    ap.add_argument("--record", action="store_true",
+                    help="call the live services and overwrite the fixtures")
+    args = ap.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="tender-bench-") as workdir:
+        _isolate(workdir, args.record)
+        sys.path.insert(0, HERE)
+        with Replay(record=args.record) as replay:
+            failures: Dict[str, str] = {}
+            with quiet():
+                seeded = _seed_history(replay)
+            if replay.misses:
+                # every benchmark after this runs against incomplete history
+                failures["seed_history"] = f"{len(replay.misses)} fixture misses"
+            ctx = {"repeat": args.repeat, "concurrency": args.concurrency,
+                   "workdir": workdir, "tender": bench_tender()}
+            results: Dict[str, Dict] = {}
+            for name in args.only or BENCHMARKS:
+                print(f"⏱️  {name}", file=sys.stderr)
+                misses = len(replay.misses)
+                try:
+                    out = BENCHMARKS[name](ctx)
+                except Exception as e:
+                    failures[name] = f"{type(e).__name__}: {e}"
+                    print(f"❌ {name} failed:", e, file=sys.stderr)
+                    continue
+                # a replayed call with no recording takes the error path, so
+                # its timings measure the fallback, not the code under test
+                if len(replay.misses) > misses:
+                    failures[name] = f"{len(replay.misses) - misses} fixture misses"
+                    print(f"❌ {name} failed: {failures[name]}", file=sys.stderr)
+                    continue
+                results.update(out)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "recorded": args.record,
+            "seeded_awards": seeded,
+            "fixture_misses": sorted(set(replay.misses)),
+        },
+        "results": results,
+        "failures": failures,
+    }
+
+    status = 1 if failures else 0
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            rows = compare(report, json.load(f), args.tolerance)
+        report["comparison"] = {"baseline": args.baseline, "tolerance": args.tolerance, "rows": rows}
+        for r in rows:
+            if r["failed"]:
+                print(f"❌ {r['name']:<36} {r['baseline_ms']:>10.2f} → failed", file=sys.stderr)
+                continue
+            mark = "❌" if r["regression"] else "✅"
+            print(f"{mark} {r['name']:<36} {r['baseline_ms']:>10.2f} → {r['current_ms']:>10.2f} ms "
+                  f"({r['ratio']:.2f}×)", file=sys.stderr)
+        if any(r["regression"] for r in rows):
+            status = 1
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        failed = f", {len(failures)} failed" if failures else ""
+        print(f"{'⚠️' if failures else '✅'} {len(results)} results{failed} → {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Circuit breakers for upstream services
+--------------------------------------
+• One breaker per upstream (GeBIZ, TED, LLM) shared by every request in
+  the process. Each keeps a rolling time window of call outcomes and opens
+  when, over at least BREAKER_MIN_CALLS calls, the failure rate or the
+  slow-call rate crosses its threshold.
+• While open, calls are refused at once with CircuitOpen, so callers fall
+  back (local award mirror, cached TED replies, the offline keyword
+  extractor, the statistical bid range) instead of each request waiting
+  out full timeouts.
+• After BREAKER_OPEN_SECONDS the breaker goes half-open and lets a few
+  probe calls through: all succeed → closed, any fails → open again.
+• Calls cut short by the request deadline count as slow, not failed, so a
+  hanging upstream still trips the slow-call rate.
+• snapshot() is the state of every breaker for the metrics endpoint.
+
+Usage:
+  r = breaker("gebiz").call(lambda: check(requests.get(url, timeout=20)))
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Tuple
+
+import deadlines
+
+BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "60"))              # seconds of history
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_PROBES = int(os.getenv("BREAKER_PROBES", "3"))
+
+# what counts as a slow call, per upstream (seconds)
+SLOW_CALL_SECONDS = {"gebiz": 5.0, "ted": 5.0, "llm": 15.0}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(RuntimeError):
+    """The upstream's breaker is open; use the fallback."""
+
+
+class UpstreamError(RuntimeError):
+    """A reply that counts as a failure (5xx, 429) without raising by itself."""
+
+
+# ---------------------------------------------------------------------------
+# 1  Breaker
+# ---------------------------------------------------------------------------
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, slow_call: float = 5.0, window: float = BREAKER_WINDOW,
+                 min_calls: int = BREAKER_MIN_CALLS, failure_rate: float = BREAKER_FAILURE_RATE,
+                 slow_rate: float = BREAKER_SLOW_RATE, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 probes: int = BREAKER_PROBES) -> None:
+        self.name = name
+        self.slow_call = slow_call
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+        self.state = CLOSED
+        self._events: Deque[Tuple[float, bool, bool]] = deque()    # (time, failed, slow)
+        self._opened_at = 0.0
+        self._changed_at = time.time()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.counters = {"calls": 0, "failures": 0, "slow": 0, "rejected": 0, "opened": 0}
+
+    def _trim(self, now: float) -> None:
+        while self._events and self._events[0][0] < now - self.window:
+            self._events.popleft()
+
+    def _rates(self) -> Tuple[int, float, float]:
+        n = len(self._events)
+        if not n:
+            return 0, 0.0, 0.0
+        return (n, sum(e[1] for e in self._events) / n, sum(e[2] for e in self._events) / n)
+
+    def _move(self, state: str) -> None:
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.counters["opened"] += 1
+            print(f"⚠️ Circuit for {self.name} opened; using fallbacks for {self.open_seconds:g}s")
+        elif state == CLOSED:
+            self._events.clear()
+            print(f"✅ Circuit for {self.name} closed again")
+        self.state = state
+        self._changed_at = time.time()
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (a half-open breaker admits a few probes)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._move(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._probes_in_flight < self.probes:
+                self._probes_in_flight += 1
+                return True
+            self.counters["rejected"] += 1
+            return False
+
+    def record(self, failed: bool, seconds: float) -> None:
+        slow = seconds >= self.slow_call
+        with self._lock:
+            now = time.monotonic()
+            self.counters["calls"] += 1
+            self.counters["failures"] += failed
+            self.counters["slow"] += slow
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed or slow:
+                    self._move(OPEN)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probes:
+                        self._move(CLOSED)
+                return
+            if self.state == OPEN:
+                return                      # a straggler from before the breaker opened
+            self._events.append((now, failed, slow))
+            self._trim(now)
+            n, fail_rate, slow_rate = self._rates()
+            if n >= self.min_calls and (fail_rate >= self.failure_rate or slow_rate >= self.slow_rate):
+                self._move(OPEN)
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """fn(*args, **kwargs) through the breaker; raises CircuitOpen when refused."""
+        if not self.allow():
+            raise CircuitOpen(f"{self.name} circuit is open")
+        t0 = time.perf_counter()
+        try:
+            out = fn(*args, **kwargs)
+        except Exception:
+            secs = time.perf_counter() - t0
+            if deadlines.expired():
+                # cut short by our own deadline: the upstream was slow, not broken
+                self.record(False, max(secs, self.slow_call))
+            else:
+                self.record(True, secs)
+            raise
+        self.record(False, time.perf_counter() - t0)
+        return out
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            n, fail_rate, slow_rate = self._rates()
+            return {"state": self.state, "state_code": _STATE_CODES[self.state],
+                    "since": self._changed_at, "window_calls": n,
+                    "failure_rate": fail_rate, "slow_rate": slow_rate,
+                    "retry_in": max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+                    if self.state == OPEN else None,
+                    **self.counters}
+
+
+def check(response: Any) -> Any:
+    """Raise UpstreamError for replies that mean the upstream is in trouble
+    (5xx, 429); other replies, 4xx included, are the caller's business."""
+    if response.status_code >= 500 or response.status_code == 429:
+        raise UpstreamError(f"HTTP {response.status_code}")
+    return response
+
+
+# ---------------------------------------------------------------------------
+# 2  Registry
+# ---------------------------------------------------------------------------
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    with _registry_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, SLOW_CALL_SECONDS.get(name, 5.0))
+        return _breakers[name]
+
+
+def is_open(name: str) -> bool:
+    """True while calls to `name` would be refused (does not use up a probe)."""
+    b = breaker(name)
+    return b.state == OPEN and time.monotonic() - b._opened_at < b.open_seconds
+
+
+def snapshot() -> Dict[str, Dict]:
+    with _registry_lock:
+        names = sorted(set(_breakers) | set(SLOW_CALL_SECONDS))      # known upstreams even if unused
+    return {name: breaker(name).snapshot() for name in names}
@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""
+Columnar award store
+--------------------
+• The normalised award history as one flat file per column (amount, score,
+  award day, agency / supplier / category codes) plus offsets-indexed
+  string heaps for descriptions and the agency and supplier dictionaries.
+• Columns are memory-mapped read-only into NumPy arrays: opening the store
+  costs a few mmap calls whatever its size, nothing is parsed or copied,
+  and every API worker on the host shares the same page-cache pages.
+• Append-only like AwardHistory: new awards are appended to the column
+  files and then published by atomically replacing meta.json, so readers
+  only ever see whole rows and arrays already handed out stay valid.
+• Appends take an flock on the store, so several workers following the
+  same history never write a row twice.
+• A reset never touches files another process may have mapped (truncating
+  them would SIGBUS its readers): it publishes an empty store under a new
+  generation, whose files carry a ".g<n>" suffix, and unlinks the old
+  generation's files, which stay readable to whoever still maps them.
+• Vectorised selections (category / agency / date range) and exact
+  quantiles over the views; the historical, trend and aggregate indexes
+  bulk-build from the store instead of from Award objects.
+• search() finds local comparables by scanning the description heap in
+  place (one regex pass per term), for when GeBIZ cannot answer in time.
+
+Usage:
+  python columnar.py build           # catch up with the local award history
+  python columnar.py build --reset   # start a new generation, then rebuild
+  python columnar.py info
+  python columnar.py query category software 0.25 0.5 0.75
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import argparse
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:          # not POSIX: a single writer is assumed
+    fcntl = None
+
+from awards import Award, AwardHistory
+
+AWARD_COLUMNS_PATH = os.getenv(
+    "AWARD_COLUMNS",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "awards.columns"),
+)
+FORMAT_VERSION = 1
+
+# column → on-disk dtype (explicitly little-endian so files move between hosts)
+COLUMNS = {
+    "amount":   "<f8",      # NaN where the source has no amount
+    "score":    "<f8",      # NaN where the source publishes no score
+    "day":      "<i8",      # days since 1970-01-01, NaT where undated
+    "agency":   "<i4",      # code into the agency heap
+    "supplier": "<i4",      # code into the supplier heap
+    "category": "<i2",      # code into meta["categories"]
+}
+HEAPS = ("descriptions", "agencies", "suppliers")
+_STORE_FILE = re.compile(r"^(\w+)(?:\.g(\d+))?\.(col|heap|off)$")
+NAT = np.iinfo(np.int64).min
+DIMENSIONS = ("all", "category", "agency")
+
+# ---------------------------------------------------------------------------
+# 1  String heap
+# ---------------------------------------------------------------------------
+
+
+class StringHeap:
+    """UTF-8 strings laid end to end in <name>.heap, with n + 1 int64 offsets
+    in <name>.off; string i is heap[off[i]:off[i + 1]]."""
+
+    def __init__(self, directory: str, name: str) -> None:
+        self.directory = directory
+        self.name = name
+        self.count = 0
+        self._off = np.zeros(1, dtype="<i8")
+        self._heap = np.empty(0, dtype=np.uint8)
+        self.map(0, 0)
+
+    def map(self, count: int, generation: int) -> None:
+        self.heap_path = _store_path(self.directory, self.name, "heap", generation)
+        self.off_path = _store_path(self.directory, self.name, "off", generation)
+        self.count = count
+        self._off = _mapped(self.off_path, "<i8", count + 1) if count else np.zeros(1, dtype="<i8")
+        self._heap = _mapped(self.heap_path, np.uint8, int(self._off[-1]))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, i: int) -> str:
+        if not -self.count <= i < self.count:
+            raise IndexError(i)
+        i %= self.count
+        return self._heap[self._off[i]:self._off[i + 1]].tobytes().decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (self[i] for i in range(self.count))
+
+    def append(self, strings: Sequence[str], count: int) -> None:
+        """Append after the first `count` strings (anything past them is the
+        remains of an interrupted write and is cut off first)."""
+        end = int(np.fromfile(self.off_path, dtype="<i8", count=count + 1)[-1]) if count else 0
+        _truncate(self.off_path, (count + 1) * 8 if count else 0)
+        _truncate(self.heap_path, end)
+        blobs = [s.encode("utf-8") for s in strings]
+        ends = end + np.cumsum([len(b) for b in blobs], dtype=np.int64)
+        with open(self.heap_path, "ab") as f:
+            f.write(b"".join(blobs))
+        with open(self.off_path, "ab") as f:
+            if not count:
+                f.write(np.zeros(1, dtype="<i8").tobytes())
+            f.write(ends.astype("<i8").tobytes())
+
+
+def _mapped(path: str, dtype, count: int) -> np.ndarray:
+    """Read-only view of the first `count` items of a column file (mmap
+    refuses empty files, so an empty store gets an empty array)."""
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _store_path(directory: str, name: str, ext: str, generation: int) -> str:
+    """Generation 0 keeps the plain names stores were written with before
+    resets started new generations."""
+    return os.path.join(directory, f"{name}.g{generation}.{ext}" if generation else f"{name}.{ext}")
+
+
+@contextmanager
+def _store_lock(directory: str):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def reset_store(directory: str = AWARD_COLUMNS_PATH) -> int:
+    """Publish an empty store as a new generation and unlink the files of
+    older ones; returns the new generation. Works on a store of another
+    format too, so `build --reset` can recover from one."""
+    directory = os.path.abspath(directory)
+    meta_path = os.path.join(directory, "meta.json")
+    with _store_lock(directory):
+        # past every generation published or left on disk, so no file a
+        # reader may have mapped is ever reused
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                generation = int(json.load(f).get("generation", 0))
+        except (OSError, ValueError, TypeError, AttributeError):
+            generation = 0
+        for name in os.listdir(directory):
+            m = _STORE_FILE.match(name)
+            if m:
+                generation = max(generation, int(m.group(2) or 0))
+        generation += 1
+        meta = {**_empty_meta(), "generation": generation}
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        for e in os.scandir(directory):
+            m = _STORE_FILE.match(e.name)
+            if m and int(m.group(2) or 0) != generation:
+                try:
+                    os.unlink(e.path)       # mappings of it stay valid until dropped
+                except OSError:
+                    pass                    # still mapped somewhere that forbids unlinking
+    return generation
+
+
+def _truncate(path: str, size: int) -> None:
+    if not os.path.exists(path):
+        open(path, "wb").close()
+    elif os.path.getsize(path) > size:
+        os.truncate(path, size)
+
+
+def _empty_meta() -> Dict:
+    return {"format": FORMAT_VERSION, "generation": 0, "count": 0, "categories": [],
+            "heaps": {name: 0 for name in HEAPS}}
+
+
+# ---------------------------------------------------------------------------
+# 2  Store
+# ---------------------------------------------------------------------------
+
+
+class AwardColumns:
+    """Memory-mapped columns over the first `count` history awards.
+
+    `count` plays the role of SketchIndex.consumed: AwardHistory is
+    append-only, so row i is always history.awards[i].
+    """
+
+    def __init__(self, directory: str = AWARD_COLUMNS_PATH) -> None:
+        self.directory = os.path.abspath(directory)
+        self.count = 0
+        self.generation = 0
+        self.categories: List[str] = []
+        self.heaps = {name: StringHeap(self.directory, name) for name in HEAPS}
+        self._cols: Dict[str, np.ndarray] = {c: np.empty(0, dtype=dt) for c, dt in COLUMNS.items()}
+        self._meta_stamp = None
+        # name → code for the agency and supplier heaps, extended as they grow
+        self._codes: Dict[str, Dict[str, int]] = {"agencies": {}, "suppliers": {}}
+        self._codes_generation = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @classmethod
+    def from_history(cls, history: AwardHistory, directory: str = AWARD_COLUMNS_PATH) -> "AwardColumns":
+        """Open the store, append awards synced since it was last written,
+        and keep it current as the history grows."""
+        cols = cls(directory)
+        if cols.count > len(history):
+            cols.reset()                    # history was reset: start over
+        if cols.count < len(history):
+            cols.append(history.awards[cols.count:], start=cols.count)
+
+        def on_new(awards: List[Award]) -> None:
+            cols.append(awards, start=len(history) - len(awards))
+
+        history.subscribe(on_new)
+        return cols
+
+    # ........................................................ persistence
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _column_path(self, name: str, generation: int) -> str:
+        return _store_path(self.directory, name, "col", generation)
+
+    def _read_meta(self) -> Dict:
+        if not os.path.exists(self._meta_path):
+            return _empty_meta()
+        with open(self._meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{self.directory} is column format {meta.get('format')}, "
+                             f"expected {FORMAT_VERSION}; run `python columnar.py build --reset`")
+        return meta
+
+    def _write_meta(self, meta: Dict) -> None:
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._meta_path)
+
+    def refresh(self) -> bool:
+        """Remap if another process has published rows since; True if so."""
+        try:
+            st = os.stat(self._meta_path)
+            stamp = (st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._meta_stamp:
+            return False
+        meta = self._read_meta()
+        with self._lock:
+            self.count = meta["count"]
+            self.generation = meta.get("generation", 0)
+            self.categories = list(meta["categories"])
+            for name, n in meta["heaps"].items():
+                self.heaps[name].map(n, self.generation)
+            self._cols = {c: _mapped(self._column_path(c, self.generation), dt, self.count)
+                          for c, dt in COLUMNS.items()}
+            self._meta_stamp = stamp
+        return True
+
+    def _write_lock(self):
+        return _store_lock(self.directory)
+
+    def reset(self) -> None:
+        """Start over as a new, empty generation (see reset_store)."""
+        reset_store(self.directory)
+        self.refresh()
+
+    def _sync_codes(self, heap: str) -> Dict[str, int]:
+        codes, strings = self._codes[heap], self.heaps[heap]
+        if len(codes) > len(strings):
+            codes.clear()
+        for i in range(len(codes), len(strings)):
+            codes.setdefault(strings[i], i)
+        return codes
+
+    def _code(self, heap: str, value: str, meta: Dict, new: Dict[str, List[str]]) -> int:
+        codes = self._codes[heap]
+        if value not in codes:
+            codes[value] = meta["heaps"][heap] + len(new[heap])
+            new[heap].append(value)
+        return codes[value]
+
+    def append(self, awards: Sequence[Award], start: int) -> int:
+        """Write awards[k] as row start + k, skipping rows another process
+        has already written; returns the number of rows added."""
+        with self._write_lock():
+            meta = self._read_meta()
+            skip = meta["count"] - start
+            if skip < 0:
+                raise ValueError(f"Column store has {meta['count']} rows; cannot append row {start}")
+            batch = awards[skip:]
+            if not batch:
+                self.refresh()
+                return 0
+            # dictionaries as published (another writer may have grown them,
+            # or reset the store into a new generation)
+            generation = meta.get("generation", 0)
+            if generation != self._codes_generation:
+                self._codes = {"agencies": {}, "suppliers": {}}
+                self._codes_generation = generation
+            for heap in self._codes:
+                self.heaps[heap].map(meta["heaps"][heap], generation)
+                self._sync_codes(heap)
+
+            new: Dict[str, List[str]] = {"agencies": [], "suppliers": []}
+            cats = list(meta["categories"])
+            cat_codes = {c: i for i, c in enumerate(cats)}
+            rows = {c: np.empty(len(batch), dtype=dt) for c, dt in COLUMNS.items()}
+            for i, a in enumerate(batch):
+                rows["amount"][i] = a.amount if a.amount else np.nan
+                rows["score"][i] = a.score if a.score is not None else np.nan
+                rows["day"][i] = (np.datetime64(a.award_date, "D").astype(np.int64)
+                                  if a.award_date else NAT)
+                rows["agency"][i] = self._code("agencies", a.agency, meta, new)
+                rows["supplier"][i] = self._code("suppliers", a.supplier, meta, new)
+                if a.category not in cat_codes:
+                    cat_codes[a.category] = len(cats)
+                    cats.append(a.category)
+                rows["category"][i] = cat_codes[a.category]
+
+            n = meta["count"]
+            for c, dt in COLUMNS.items():
+                path = self._column_path(c, generation)
+                _truncate(path, n * np.dtype(dt).itemsize)
+                with open(path, "ab") as f:
+                    f.write(rows[c].tobytes())
+            self.heaps["descriptions"].map(meta["heaps"]["descriptions"], generation)
+            self.heaps["descriptions"].append([a.description for a in batch], meta["heaps"]["descriptions"])
+            for heap, strings in new.items():
+                self.heaps[heap].append(strings, meta["heaps"][heap])
+
+            meta["count"] = n + len(batch)
+            meta["categories"] = cats
+            meta["heaps"] = {"descriptions": meta["heaps"]["descriptions"] + len(batch),
+                             **{h: meta["heaps"][h] + len(new[h]) for h in new}}
+            self._write_meta(meta)
+        self.refresh()
+        return len(batch)
+
+    # ............................................................. views
+
+    def __len__(self) -> int:
+        return self.count
+
+    def column(self, name: str) -> np.ndarray:
+        """Zero-copy read-only view of one column."""
+        return self._cols[name]
+
+    @property
+    def amount(self) -> np.ndarray:
+        return self._cols["amount"]
+
+    @property
+    def score(self) -> np.ndarray:
+        return self._cols["score"]
+
+    @property
+    def day(self) -> np.ndarray:
+        """Award dates as datetime64[D] (a view, NaT where undated)."""
+        return self._cols["day"].view("M8[D]")
+
+    @property
+    def agency(self) -> np.ndarray:
+        return self._cols["agency"]
+
+    @property
+    def supplier(self) -> np.ndarray:
+        return self._cols["supplier"]
+
+    @property
+    def category(self) -> np.ndarray:
+        return self._cols["category"]
+
+    def description(self, i: int) -> str:
+        return self.heaps["descriptions"][i]
+
+    def row(self, i: int) -> Dict:
+        """One award, in the shape of Award.to_dict() minus the fields the
+        store does not keep (source ids, currency, status)."""
+        day = self._cols["day"][i]
+        return {
+            "description": self.description(i),
+            "agency": self.heaps["agencies"][int(self.agency[i])],
+            "supplier": self.heaps["suppliers"][int(self.supplier[i])],
+            "amount": None if np.isnan(self.amount[i]) else float(self.amount[i]),
+            "award_date": None if day == NAT else str(np.datetime64(int(day), "D")),
+            "category": self.categories[int(self.category[i])],
+            "score": None if np.isnan(self.score[i]) else float(self.score[i]),
+        }
+
+    def agency_names(self) -> List[str]:
+        return list(self.heaps["agencies"])
+
+    def supplier_names(self) -> List[str]:
+        return list(self.heaps["suppliers"])
+
+    def scope_codes(self, dim: str) -> Tuple[List[str], np.ndarray]:
+        """(key per code, code per row) for one dimension."""
+        if dim == "all":
+            return [""], np.zeros(self.count, dtype=np.int8)
+        if dim == "category":
+            return self.categories, self.category
+        if dim == "agency":
+            return self.agency_names(), self.agency
+        raise ValueError(f"Unknown dimension '{dim}' (expected one of {', '.join(DIMENSIONS)})")
+
+    def _code_of(self, dim: str, key: str) -> Optional[int]:
+        if dim == "category":
+            return self.categories.index(key) if key in self.categories else None
+        with self._lock:
+            code = self._sync_codes("agencies").get(key)
+        return code if code is not None and code < len(self.heaps["agencies"]) else None
+
+    def select(self, dim: str = "all", key: str = "", since: Optional[str] = None,
+               until: Optional[str] = None) -> np.ndarray:
+        """Boolean row mask for a scope and an optional [since, until] date range."""
+        if dim not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dim}' (expected one of {', '.join(DIMENSIONS)})")
+        if dim == "all":
+            mask = np.ones(self.count, dtype=bool)
+        else:
+            code = self._code_of(dim, key)
+            if code is None:
+                return np.zeros(self.count, dtype=bool)
+            mask = self.column(dim) == code
+        if since or until:
+            day = self.day
+            if since:
+                mask &= day >= np.datetime64(since, "D")
+            if until:
+                mask &= day <= np.datetime64(until, "D")
+        return mask
+
+    def amounts(self, dim: str = "all", key: str = "", **dates) -> np.ndarray:
+        """Priced award amounts in a scope, ascending."""
+        mask = self.select(dim, key, **dates)
+        mask &= ~np.isnan(self.amount)
+        return np.sort(self.amount[mask])
+
+    def search(self, terms: Sequence[str], limit: int = 20) -> List[int]:
+        """Rows whose description contains the most of `terms` (ASCII
+        case-insensitive), newest first among equals."""
+        heap = self.heaps["descriptions"]
+        n = min(len(heap), self.count)
+        if not n:
+            return []
+        hits = np.zeros(n, dtype=np.int32)
+        for term in dict.fromkeys(t.strip().lower() for t in terms if t and t.strip()):
+            pattern = re.compile(re.escape(term.encode("utf-8")), re.IGNORECASE)
+            at = np.fromiter((m.start() for m in pattern.finditer(heap._heap)), dtype=np.int64)
+            rows = np.unique(np.searchsorted(heap._off, at, side="right") - 1)
+            hits[rows[rows < n]] += 1
+        found = np.flatnonzero(hits)
+        order = found[np.lexsort((self._cols["day"][found], hits[found]))[::-1]]
+        return order[:limit].tolist()
+
+    # ............................................................ queries
+
+    def quantiles(self, qs: Sequence[float], dim: str = "all", key: str = "") -> Dict:
+        """Exact quantiles, in the shape SketchIndex.quantiles returns."""
+        xs = self.amounts(dim, key)
+        if not len(xs):
+            return {"count": 0}
+        return {"count": int(len(xs)), "min": float(xs[0]), "max": float(xs[-1]),
+                "quantiles": {f"p{round(q * 100, 2):g}": float(v)
+                              for q, v in zip(qs, np.quantile(xs, qs))}}
+
+    def percentile(self, value: float, dim: str = "all", key: str = "") -> Optional[float]:
+        """Share of the scope's awards (0–100) at or below value; ties count half."""
+        xs = self.amounts(dim, key)
+        if not len(xs):
+            return None
+        lo = np.searchsorted(xs, value, side="left")
+        hi = np.searchsorted(xs, value, side="right")
+        return 100.0 * (lo + (hi - lo) / 2) / len(xs)
+
+
+def sorted_groups(codes: np.ndarray, values: np.ndarray) -> Iterator[Tuple[int, np.ndarray]]:
+    """(code, its values ascending) for every code with a non-NaN value,
+    from one lexsort instead of one sort per group."""
+    keep = np.flatnonzero(~np.isnan(values))
+    if not len(keep):
+        return
+    order = keep[np.lexsort((values[keep], codes[keep]))]
+    grouped = codes[order]
+    starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+    ends = np.r_[starts[1:], len(order)]
+    for s, e in zip(starts.tolist(), ends.tolist()):
+        yield int(grouped[s]), values[order[s:e]]
+
+
+# ---------------------------------------------------------------------------
+# 3  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Memory-mapped columnar copy of the award history.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="append awards synced since the last build")
+    b.add_argument("--reset", action="store_true", help="rewrite the store from scratch")
+    sub.add_parser("info", help="row count, dictionaries and file sizes")
+    q = sub.add_parser("query", help="print exact quantiles for one dimension/key")
+    q.add_argument("dimension", choices=DIMENSIONS)
+    q.add_argument("key", nargs="?", default="")
+    q.add_argument("q", nargs="*", type=float, default=[0.1, 0.25, 0.5, 0.75, 0.9])
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        if args.reset:
+            print(f"✅ Started column generation {reset_store(AWARD_COLUMNS_PATH)}")
+        cols = AwardColumns.from_history(AwardHistory())
+        print(f"✅ {len(cols)} awards in {len(COLUMNS)} columns → {cols.directory}")
+    elif args.cmd == "info":
+        cols = AwardColumns()
+        sizes = {e.name: e.stat().st_size for e in os.scandir(cols.directory)} \
+            if os.path.isdir(cols.directory) else {}
+        print(json.dumps({"rows": len(cols), "categories": cols.categories,
+                          "agencies": len(cols.heaps["agencies"]),
+                          "suppliers": len(cols.heaps["suppliers"]),
+                          "bytes": sizes}, indent=2))
+    else:
+        cols = AwardColumns()
+        print(json.dumps(cols.quantiles(args.q, args.dimension, args.key), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Request deadlines & hedged calls
+--------------------------------
+• A deadline is set once per unit of work (an /analyze request, a CLI run)
+  and carried in a context variable, so every stage and outbound call below
+  it can ask how much time is left without it being passed down by hand.
+• Work handed to a thread pool keeps the caller's deadline when submitted
+  through submit() (context variables do not cross threads on their own),
+  and the pool thread joins the caller's profile, if any (profiling.py).
+• timeout(default) caps an HTTP / LLM timeout at the time remaining, so no
+  single call can outlive the request.
+• hedged(): if an idempotent upstream call has not answered within the
+  upstream's recent p95 latency, a second identical call is started and
+  whichever answers first wins; the tail of one slow connection no longer
+  becomes the request's latency.
+
+Usage:
+  with deadline(30):
+      requests.get(url, timeout=timeout(20))
+      r = hedged("gebiz", requests.get, url, timeout=timeout(20))
+"""
+
+from __future__ import annotations
+
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+import profiling
+
+HEDGE_AFTER = float(os.getenv("HEDGE_AFTER", "2.0"))           # seconds, until latencies are known
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.2"))
+HEDGE_QUANTILE = 0.95
+HEDGE_WINDOW = 200                                              # recent latencies per upstream
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WORKERS = int(os.getenv("HEDGE_WORKERS", "16"))
+# set HEDGE=0 to send every upstream call exactly once
+HEDGE_ENABLED = os.getenv("HEDGE", "1") == "1"
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out before the work could start or finish."""
+
+
+# ---------------------------------------------------------------------------
+# 1  Deadline in context
+# ---------------------------------------------------------------------------
+
+_expires: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """Run the block under a budget of `seconds` (None or <= 0: no budget).
+    A nested deadline can only tighten the one already in force."""
+    if not seconds or seconds <= 0:
+        yield
+        return
+    at = time.monotonic() + seconds
+    outer = _expires.get()
+    token = _expires.set(at if outer is None else min(at, outer))
+    try:
+        yield
+    finally:
+        _expires.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left (never negative), or None when no deadline is set."""
+    at = _expires.get()
+    return None if at is None else max(0.0, at - time.monotonic())
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0.0
+
+
+def timeout(default: float) -> float:
+    """`default` capped at the time remaining; raises once nothing is left."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0.0:
+        raise DeadlineExceeded("request deadline exceeded")
+    return min(default, left)
+
+
+def submit(pool: ThreadPoolExecutor, fn: Callable, *args, **kwargs) -> Future:
+    """pool.submit that carries the caller's context (and so its deadline
+    and profile session)."""
+    return pool.submit(contextvars.copy_context().run, profiling.follow, fn, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# 2  Hedged requests
+# ---------------------------------------------------------------------------
+
+
+class LatencyWindow:
+    """Recent successful call latencies of one upstream."""
+
+    def __init__(self, size: int = HEDGE_WINDOW) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            xs = sorted(self._samples)
+        if len(xs) < HEDGE_MIN_SAMPLES:
+            return None
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+_latencies: Dict[str, LatencyWindow] = {}
+_hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+hedge_stats: Dict[str, Dict[str, int]] = {}       # upstream → {"calls", "hedged", "hedge_won"}
+
+
+def hedge_delay(upstream: str) -> float:
+    """When to send the backup call: the upstream's recent p95 latency."""
+    p = _latencies.setdefault(upstream, LatencyWindow()).quantile(HEDGE_QUANTILE)
+    return HEDGE_AFTER if p is None else max(HEDGE_MIN_DELAY, p)
+
+
+def _timed(fn: Callable, *args, **kwargs) -> tuple:
+    t0 = time.perf_counter()
+    return fn(*args, **kwargs), time.perf_counter() - t0
+
+
+def hedged(upstream: str, fn: Callable, *args, **kwargs) -> Any:
+    """fn(*args, **kwargs), backed up by a second identical call if the first
+    is slower than usual. Only for idempotent calls. The first successful
+    answer wins; if both fail, the last error is raised."""
+    stats = hedge_stats.setdefault(upstream, {"calls": 0, "hedged": 0, "hedge_won": 0})
+    stats["calls"] += 1
+    window = _latencies.setdefault(upstream, LatencyWindow())
+    if not HEDGE_ENABLED:
+        out, secs = _timed(fn, *args, **kwargs)
+        window.add(secs)
+        return out
+
+    first = submit(_hedge_pool, _timed, fn, *args, **kwargs)
+    left = remaining()
+    delay = hedge_delay(upstream) if left is None else min(hedge_delay(upstream), left)
+    done, _ = wait([first], timeout=delay)
+    calls = [first]
+    if not done and not expired():
+        stats["hedged"] += 1
+        calls.append(submit(_hedge_pool, _timed, fn, *args, **kwargs))
+
+    error: Optional[BaseException] = None
+    pending = set(calls)
+    while pending:
+        done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded(f"{upstream} call still running at the request deadline")
+        for fut in done:
+            try:
+                out, secs = fut.result()
+            except Exception as e:
+                error = e
+                continue
+            window.add(secs)
+            if fut is not first:
+                stats["hedge_won"] += 1
+            return out
+    raise error
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Tender document loading
+-----------------------
+• Extracts raw text from TXT, DOCX and PDF tender files.
+• Parses the "Title / Description / Estimated Value" layout used by the analyzers.
+• Streams multi-tender exports ("Example 1 … Example N") one record at a time.
+• Normalises the estimated value into a numeric amount and currency code.
+
+Requires:
+  pip install python-docx PyPDF2
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import re
+from typing import Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+# For handling DOCX and PDF
+from docx import Document
+import PyPDF2
+
+SUPPORTED_EXTENSIONS = (".txt", ".docx", ".pdf")
+
+_CURRENCY_RE = re.compile(r"\b(SGD|EUR|USD|GBP|AUD|MYR|CNY|JPY)\b", re.IGNORECASE)
+_SYMBOLS     = (("S$", "SGD"), ("US$", "USD"), ("€", "EUR"), ("£", "GBP"), ("$", "USD"))
+_NUMBER_RE   = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(k|m|mn|million|b|bn|billion)?\b", re.IGNORECASE)
+_MAGNITUDE   = {"k": 1e3, "m": 1e6, "mn": 1e6, "million": 1e6,
+                "b": 1e9, "bn": 1e9, "billion": 1e9}
+
+_HEADING_RE  = re.compile(r"^(?:example|tender)\s+\d+\b", re.IGNORECASE)
+_FIELD_RE    = re.compile(r"^(title|description|estimated[ _]value)\s*:\s*(.*)$", re.IGNORECASE)
+_QUOTES      = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+
+
+# ---------------------------------------------------------------------------
+# 1  Text extraction
+# ---------------------------------------------------------------------------
+
+
+def extract_text(file_path: str) -> str:
+    """Return the plain text of a TXT, DOCX or PDF file (raises on I/O errors)."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext == ".docx":
+        doc = Document(file_path)
+        return "\n".join(para.text for para in doc.paragraphs)
+    if ext == ".pdf":
+        with open(file_path, "rb") as f:
+            reader = PyPDF2.PdfReader(f)
+            return "\n".join(page.extract_text() or "" for page in reader.pages)
+    with open(file_path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+# ---------------------------------------------------------------------------
+# 2  Field parsing
+# ---------------------------------------------------------------------------
+
+
+def parse_tender_content(content: str) -> Dict[str, str]:
+    tender_data = {"title": "", "description": "", "estimated_value": ""}
+    lines = content.strip().split("\n")
+    current_section = None
+    current_content = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.lower().startswith('title:'):
+            if current_section:
+                tender_data[current_section] = "\n".join(current_content).strip()
+            current_section = 'title'
+            current_content = [stripped.split(':', 1)[1].strip()]
+        elif stripped.lower().startswith('description:'):
+            if current_section:
+                tender_data[current_section] = "\n".join(current_content).strip()
+            current_section = 'description'
+            current_content = [stripped.split(':', 1)[1].strip()]
+        elif stripped.lower().startswith('estimated value:') or stripped.lower().startswith('estimated_value:'):
+            if current_section:
+                tender_data[current_section] = "\n".join(current_content).strip()
+            current_section = 'estimated_value'
+            current_content = [stripped.split(':', 1)[1].strip()]
+        elif stripped and current_section:
+            current_content.append(stripped)
+    if current_section:
+        tender_data[current_section] = "\n".join(current_content).strip()
+    # Fallback to entire text as description
+    if not tender_data['title'] and not tender_data['description']:
+        tender_data['description'] = content
+        tender_data['estimated_value'] = '1000000 EUR'
+    return tender_data
+
+
+def strip_quotes(value: str) -> str:
+    """Remove one pair of surrounding quotes ("…", '…', “…”)."""
+    v = value.strip()
+    if len(v) >= 2 and _QUOTES.get(v[0]) == v[-1]:
+        return v[1:-1].strip()
+    return v
+
+
+def parse_amount(value: str | float | int | None) -> Tuple[Optional[float], Optional[str]]:
+    """Split an estimated value such as "2,800,000 EUR", "S$1.2m" or
+    "EUR 3.5 million" into (amount, currency code)."""
+    if value is None:
+        return None, None
+    if isinstance(value, (int, float)):
+        return (float(value) if value > 0 else None), None
+    s = strip_quotes(str(value).replace("\xa0", " "))
+    cur = _CURRENCY_RE.search(s)
+    currency = cur.group(1).upper() if cur else None
+    if currency is None:
+        currency = next((code for sym, code in _SYMBOLS if sym in s), None)
+    num = _NUMBER_RE.search(s)
+    amount = None
+    if num:
+        try:
+            amount = float(num.group(1).replace(",", ""))
+        except ValueError:
+            amount = None
+        if amount and num.group(2):
+            amount *= _MAGNITUDE[num.group(2).lower()]
+    return (amount or None), currency
+
+
+def normalise_tender(tender: Dict[str, str], source: str = "", index: int = 0) -> Dict:
+    """Flatten a parsed tender into the record shape written by batch ingestion."""
+    amount, currency = parse_amount(tender.get("estimated_value"))
+    return {
+        "source": source,
+        "index": index,
+        "heading": tender.get("heading", ""),
+        "title": tender.get("title", ""),
+        "description": tender.get("description", ""),
+        "estimated_value": tender.get("estimated_value", ""),
+        "amount": amount,
+        "currency": currency,
+    }
+
+
+# ---------------------------------------------------------------------------
+# 3  Streaming multi-tender parser
+# ---------------------------------------------------------------------------
+
+
+def iter_tenders(source: str | TextIO | Iterable[str]) -> Iterator[Dict[str, str]]:
+    """Yield one {title, description, estimated_value, heading} dict per tender
+    block, reading the source line by line.
+
+    A new block starts at an "Example N" / "Tender N" heading, or at a second
+    "Title:" within the current block. The estimated value is a single line;
+    free text after it (commentary between blocks) is ignored. A source with
+    no field markers yields one record with the whole text as description,
+    matching parse_tender_content.
+    """
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8") as f:
+            yield from iter_tenders(f)
+        return
+
+    rec: Dict[str, str] = {}
+    section: Optional[str] = None
+    bucket: list = []
+    preamble: list = []
+    emitted = False
+
+    def close_section() -> None:
+        if section:
+            rec[section] = strip_quotes("\n".join(bucket).strip())
+
+    def finish() -> Optional[Dict[str, str]]:
+        close_section()
+        if rec.get("title") or rec.get("description"):
+            return {"title": rec.get("title", ""), "description": rec.get("description", ""),
+                    "estimated_value": rec.get("estimated_value", ""),
+                    "heading": rec.get("heading", "")}
+        return None
+
+    for raw in source:
+        line = raw.strip()
+        m = _FIELD_RE.match(line)
+        if _HEADING_RE.match(line) or (m and m.group(1).lower() == "title" and "title" in rec):
+            done = finish()
+            if done:
+                emitted = True
+                yield done
+            rec, section, bucket = {}, None, []
+            if not m:
+                rec["heading"] = line
+                continue
+        if m:
+            close_section()
+            name = m.group(1).lower().replace(" ", "_")
+            section, bucket = name, [m.group(2).strip()] if m.group(2).strip() else []
+            if name == "estimated_value" and bucket:
+                close_section()
+                section = None
+        elif section and line:
+            bucket.append(line)
+            if section == "estimated_value":
+                close_section()
+                section = None
+        elif not rec and not emitted:
+            preamble.append(raw)
+
+    done = finish()
+    if done:
+        yield done
+    elif not emitted and "".join(preamble).strip():
+        yield {"title": "", "description": "".join(preamble).strip(),
+               "estimated_value": "1000000 EUR", "heading": ""}
+
+
+def iter_tender_file(file_path: str) -> Iterator[Dict[str, str]]:
+    """Stream tender blocks from a file; TXT is read lazily, DOCX/PDF are
+    extracted to text first since those formats are not line-addressable."""
+    if os.path.splitext(file_path)[1].lower() in (".docx", ".pdf"):
+        yield from iter_tenders(io.StringIO(extract_text(file_path)))
+    else:
+        yield from iter_tenders(file_path)
+
+
+# ---------------------------------------------------------------------------
+# 4  TenderOffer field extraction
+# ---------------------------------------------------------------------------
+
+# How much of the raw text survives extraction, per format
+SOURCE_CONFIDENCE = {".txt": 1.0, ".csv": 1.0, ".docx": 0.95, ".pdf": 0.85}
+
+_LABEL = r"^\s*(?:{})\s*(?:name)?\s*[:\-]\s*(.+)$"
+_SCORE = r"(?:{})[^\n\d]{{0,20}}(\d+(?:\.\d+)?)\s*(?:/\s*10|out of (?:10|ten))?"
+
+# (field, pattern, confidence when matched); the first matching pattern wins,
+# so stronger "Label: value" forms are listed before loose ones
+_OFFER_PATTERNS = {
+    "supplierName": [
+        (_LABEL.format("supplier|company|vendor|contractor|tenderer|bidder"), 0.9),
+        (r"(?-i:\b([A-Z][\w&\-]*(?: [A-Z&][\w&\-]*){0,5} (?:Pte\.? Ltd|Ltd|Inc|Corp|LLP|GmbH)\b))", 0.6),
+    ],
+    "projectName": [
+        (_LABEL.format("project|tender|proposal|title"), 0.9),
+    ],
+    "deliveryTime": [
+        (r"(?:delivery(?: time)?|lead time|duration|completion)[^\n\d]{0,20}(\d+)\s*(days?|weeks?|months?)", 0.85),
+    ],
+    "qualityScore": [(_SCORE.format("quality|grade"), 0.8)],
+    "reliabilityScore": [(_SCORE.format("reliability"), 0.8)],
+    "technicalScore": [(_SCORE.format("technical(?: score)?"), 0.8)],
+    "financialStability": [(_SCORE.format("financial(?: stability)?"), 0.8)],
+    "pastPerformance": [(_SCORE.format("past performance|performance"), 0.75)],
+    "riskLevel": [
+        (r"risk(?: level)?\s*[:\-]?\s*(low|medium|high)\b", 0.9),
+        (r"\b(low|medium|high)[ -]risk\b", 0.6),
+    ],
+    "terms": [(_LABEL.format("terms|payment terms|conditions"), 0.85)],
+    "description": [(_LABEL.format("description|scope|summary"), 0.85)],
+}
+_COST_RE = re.compile(
+    r"(?:total(?: cost)?|cost|price|amount|bid|estimated value)\s*[:\-]?\s*"
+    r"((?:[A-Z]{3}|S\$|US\$|[$€£])?\s*\d[\d,]*(?:\.\d+)?\s*(?:k|m|mn|million|bn|billion)?\s*(?:[A-Z]{3})?)",
+    re.IGNORECASE,
+)
+_DAYS_PER = {"day": 1, "week": 7, "month": 30}
+
+
+def extract_offer_fields(text: str, source_confidence: float = 1.0) -> Dict:
+    """Pull TenderOffer fields out of free text.
+
+    Returns {"fields": {name: {"value", "confidence"}}, "confidence": overall}
+    where each confidence is the pattern strength scaled by how reliable the
+    source format's text extraction is.
+    """
+    fields: Dict[str, Dict] = {}
+
+    def put(name, value, conf):
+        fields[name] = {"value": value, "confidence": round(conf * source_confidence, 3)}
+
+    for name, patterns in _OFFER_PATTERNS.items():
+        for pattern, conf in patterns:
+            m = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+            if not m:
+                continue
+            raw = strip_quotes(m.group(1))
+            if name == "deliveryTime":
+                unit = m.group(2).lower().rstrip("s")
+                put(name, int(raw) * _DAYS_PER[unit], conf)
+            elif name.endswith("Score") or name in ("financialStability", "pastPerformance"):
+                put(name, min(10.0, max(1.0, float(raw))), conf)
+            elif name == "riskLevel":
+                put(name, raw.lower(), conf)
+            else:
+                put(name, raw.rstrip(" .,;"), conf)
+            break
+
+    m = _COST_RE.search(text)
+    if m:
+        amount, currency = parse_amount(m.group(1))
+        if amount:
+            put("totalCost", amount, 0.85 if currency else 0.65)
+            if currency:
+                put("currency", currency, 0.85)
+
+    # Fall back to the Title/Description/Estimated Value layout the analyzers
+    # understand (only when it is really present, not parse_tender_content's
+    # whole-text default)
+    tender = parse_tender_content(text)
+    if tender.get("title"):
+        if "projectName" not in fields:
+            put("projectName", strip_quotes(tender["title"]), 0.7)
+        if "description" not in fields and tender.get("description"):
+            put("description", strip_quotes(tender["description"])[:2000], 0.5)
+        if "totalCost" not in fields and tender.get("estimated_value"):
+            amount, currency = parse_amount(tender["estimated_value"])
+            if amount:
+                put("totalCost", amount, 0.6)
+                if currency:
+                    put("currency", currency, 0.6)
+
+    overall = sum(f["confidence"] for f in fields.values()) / len(_OFFER_PATTERNS) if fields else 0.0
+    return {"fields": fields, "confidence": round(min(1.0, overall), 3), "tender": tender}
+
+
+def extract_offer_file(file_path: str) -> Dict:
+    """Extract TenderOffer fields from a TXT, DOCX or PDF file on disk."""
+    ext = os.path.splitext(file_path)[1].lower()
+    if ext not in SOURCE_CONFIDENCE:
+        raise ValueError(f"Unsupported file type: {ext or 'unknown'}")
+    return extract_offer_fields(extract_text(file_path), SOURCE_CONFIDENCE[ext])
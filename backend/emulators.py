@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Local service emulators
+-----------------------
+• Stand-ins for the upstream services the analyzer calls, so api.py can be
+  load-tested without spending quota:
+    – GeBIZ: CKAN `datastore_search` with `q` / `limit` / `offset`,
+    – TED: `POST /v3/notices/search` with page-number paging,
+    – LLM: Gemini REST `generateContent` and Bedrock `invoke_model`
+      (Anthropic messages) shaped replies.
+• Every service serves a deterministic synthetic corpus of configurable
+  size, and has its own injectable profile: base latency with lognormal
+  jitter, an error rate, and a token-bucket rate limit answered with 429.
+• Point the backend at it through configuration only:
+    GEBIZ_ENDPOINT=http://127.0.0.1:8765/api/action/datastore_search
+    TED_ENDPOINT=http://127.0.0.1:8765/v3/notices/search
+    GEMINI_ENDPOINT=http://127.0.0.1:8765       (REST transport)
+    BEDROCK_ENDPOINT=http://127.0.0.1:8765      (test.py)
+
+Usage:
+  python emulators.py --records 50000 --port 8765
+  python emulators.py --gebiz latency=120,jitter=0.6,errors=0.01,rps=50 \
+                      --llm latency=900,jitter=0.4,rps=5,burst=10
+  curl 'http://127.0.0.1:8765/_emulator'                 # request / error / 429 counters
+
+Requires:
+  pip install flask numpy
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from awards import GEBIZ_DATASET_ID
+
+DEFAULT_PORT = 8765
+DEFAULT_RECORDS = 20_000
+DEFAULT_SEED = 42
+
+# ---------------------------------------------------------------------------
+# 1  Fault profiles
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Profile:
+    """Latency / failure behaviour of one emulated service."""
+    latency: float = 0.0          # median added latency, ms
+    jitter: float = 0.0           # lognormal sigma around it (0 = fixed)
+    errors: float = 0.0           # share of requests answered 503
+    rps: float = 0.0              # sustained request rate before 429s (0 = unlimited)
+    burst: float = 0.0            # token-bucket depth (default: one second of rps)
+
+    @classmethod
+    def parse(cls, spec: str) -> "Profile":
+        """"latency=120,jitter=0.5,errors=0.02,rps=20" → Profile."""
+        p = cls()
+        for part in filter(None, (s.strip() for s in (spec or "").split(","))):
+            key, _, value = part.partition("=")
+            if key not in cls.__dataclass_fields__:
+                raise ValueError(f"Unknown profile field '{key}' "
+                                 f"(expected {', '.join(cls.__dataclass_fields__)})")
+            setattr(p, key, float(value))
+        return p
+
+
+class Faults:
+    """Applies a Profile to requests: sleeps, fails or throttles them."""
+
+    def __init__(self, profile: Profile, seed: int = DEFAULT_SEED) -> None:
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._tokens = profile.burst or profile.rps
+        self._stamp = time.monotonic()
+        self.counts = {"requests": 0, "errors": 0, "throttled": 0}
+
+    def _take_token(self) -> bool:
+        p = self.profile
+        if p.rps <= 0:
+            return True
+        now = time.monotonic()
+        self._tokens = min(p.burst or p.rps, self._tokens + (now - self._stamp) * p.rps)
+        self._stamp = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def apply(self) -> Optional[Tuple[Dict, int, Dict]]:
+        """None to serve the request normally, else an error response."""
+        p = self.profile
+        with self._lock:
+            self.counts["requests"] += 1
+            allowed = self._take_token()
+            fail = self._rng.random() < p.errors
+            delay = p.latency * (self._rng.lognormvariate(0.0, p.jitter) if p.jitter else 1.0)
+            if not allowed:
+                self.counts["throttled"] += 1
+            elif fail:
+                self.counts["errors"] += 1
+        if not allowed:
+            retry = max(1, int(round(1 / p.rps)))
+            return {"error": "rate limit exceeded"}, 429, {"Retry-After": str(retry)}
+        if delay:
+            time.sleep(delay / 1000.0)
+        if fail:
+            return {"error": "service unavailable (injected)"}, 503, {}
+        return None
+
+
+# ---------------------------------------------------------------------------
+# 2  Synthetic corpus
+# ---------------------------------------------------------------------------
+
+_SUBJECTS = (
+    "transit ticketing system", "passenger information system", "fleet management software",
+    "cloud hosting services", "data analytics platform", "cybersecurity operations centre",
+    "mobile application development", "enterprise resource planning system",
+    "network infrastructure upgrade", "cctv video analytics", "building renovation works",
+    "facilities management services", "cleaning services", "road resurfacing works",
+    "consultancy for digital transformation", "payment gateway integration",
+    "document management portal", "api gateway and integration services",
+)
+_PHRASES = ("Call for provision of", "Tender for the supply, delivery and maintenance of",
+            "Invitation to quote for", "Period contract for", "Design, development and support of")
+_QUALIFIERS = ("for the rail network", "for bus services", "including 3 years maintenance",
+               "(cloud hosted)", "for schools", "for hospitals", "and related services", "")
+_AGENCIES = ("Land Transport Authority", "Ministry of Transport", "GovTech", "Ministry of Education",
+             "Ministry of Health", "Housing and Development Board", "Ministry of Home Affairs",
+             "Public Utilities Board", "National Environment Agency", "Singapore Police Force")
+_SUPPLIERS = ("NCS Pte. Ltd.", "ST Engineering Urban Solutions Ltd", "Accenture Pte Ltd",
+              "Ensign InfoSecurity (Singapore) Pte. Ltd.", "Thales Solutions Asia Pte Ltd",
+              "CrimsonLogic Pte Ltd", "Singtel Singapore Pte Ltd", "Hitachi Asia Ltd",
+              "Certis Technology (Singapore) Pte Ltd", "ISS Facility Services Pte Ltd",
+              "Koh Brothers Building & Civil Engineering Contractor (Pte.) Ltd.")
+_COUNTRIES = ("DEU", "FRA", "POL", "ESP", "NLD", "ITA", "BEL", "AUT", "SWE", "FIN")
+# buyers that publish values in their national currency (per EUR)
+_NATIONAL_CURRENCY = {"POL": ("PLN", 4.3), "SWE": ("SEK", 11.4)}
+_EU_WINNERS = ("Atos SE", "Indra Sistemas S.A.", "Capgemini Deutschland GmbH", "Sopra Steria SA",
+               "Asseco Poland S.A.", "Engineering Ingegneria Informatica S.p.A.", "Tietoevry Oyj")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+class Corpus:
+    """Deterministic award records plus an inverted index for `q` lookups."""
+
+    def __init__(self, size: int = DEFAULT_RECORDS, seed: int = DEFAULT_SEED) -> None:
+        rng = random.Random(seed)
+        start = date(2018, 1, 1).toordinal()
+        span = date(2025, 12, 31).toordinal() - start
+        self.gebiz: List[Dict] = []
+        self.ted: List[Dict] = []
+        for i in range(size):
+            subject = rng.choice(_SUBJECTS)
+            amount = rng.lognormvariate(13.5, 1.2)
+            day = date.fromordinal(start + rng.randrange(span))
+            self.gebiz.append({
+                "_id": i + 1,
+                "tender_no": f"GEM{day.year}{i:07d}",
+                "tender_description": " ".join(filter(None, (rng.choice(_PHRASES), subject,
+                                                             rng.choice(_QUALIFIERS)))),
+                "agency": rng.choice(_AGENCIES),
+                "award_date": day.strftime("%d/%m/%Y"),
+                "tender_detail_status": "Awarded to Suppliers",
+                "supplier_name": rng.choice(_SUPPLIERS),
+                "awarded_amt": f"{amount:.2f}" if rng.random() > 0.05 else "na",
+            })
+            if i % 4 == 0:                      # a smaller EU corpus alongside
+                value = round(amount / 1.45, 2)
+                notice = {
+                    "publication-number": f"{100000 + i}-{day.year}",
+                    "TI": {"eng": f"{rng.choice(_COUNTRIES)} – {subject.capitalize()}"},
+                    "CY": [rng.choice(_COUNTRIES)],
+                    "estimated-value-lot": [round(value * rng.uniform(0.9, 1.3), 2)],
+                    "tender-value": [value],
+                    "winner-country": [rng.choice(_COUNTRIES)],
+                    "winner-name": {"eng": [rng.choice(_EU_WINNERS)]},
+                    "award-criterion-name-lot": {"eng": ["Price", "Quality"]},
+                }
+                currency, rate = _NATIONAL_CURRENCY.get(notice["CY"][0], ("EUR", 1.0))
+                for f in ("estimated-value-lot", "tender-value"):
+                    notice[f] = [round(notice[f][0] * rate, 2)]
+                notice["estimated-value-cur-lot"] = [currency]
+                notice["tender-value-cur"] = [currency]
+                self.ted.append(notice)
+        self.vocabulary = sorted({w for s in _SUBJECTS for w in _words(s) if len(w) > 3})
+        self._gebiz_index = self._index(r["tender_description"] for r in self.gebiz)
+        self._ted_index = self._index(n["TI"]["eng"] for n in self.ted)
+
+    @staticmethod
+    def _index(texts) -> Dict[str, np.ndarray]:
+        postings: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            for w in set(_words(text)):
+                postings.setdefault(w, []).append(i)
+        return {w: np.asarray(ids, dtype=np.int64) for w, ids in postings.items()}
+
+    @staticmethod
+    def _search(index: Dict[str, np.ndarray], n: int, q: str) -> np.ndarray:
+        """Row ids matching every word of q (all rows for an empty query)."""
+        terms = _words(q or "")
+        if not terms:
+            return np.arange(n)
+        hits: Optional[np.ndarray] = None
+        for t in terms:
+            ids = index.get(t)
+            if ids is None:
+                return np.empty(0, dtype=np.int64)
+            hits = ids if hits is None else np.intersect1d(hits, ids, assume_unique=True)
+        return hits
+
+    def search_gebiz(self, q: str) -> np.ndarray:
+        return self._search(self._gebiz_index, len(self.gebiz), q)
+
+    def search_ted(self, q: str) -> np.ndarray:
+        return self._search(self._ted_index, len(self.ted), q)
+
+
+# ---------------------------------------------------------------------------
+# 3  LLM replies
+# ---------------------------------------------------------------------------
+
+
+def llm_reply(prompt: str, vocabulary: List[str]) -> str:
+    """Plausible JSON for the analyzer's two prompts (keywords, bid range);
+    anything else gets a short plain-text answer."""
+    low = prompt.lower()
+    if "keyword" in low:
+        seen = list(dict.fromkeys(w for w in _words(prompt) if w in vocabulary))
+        kws = (seen + [w for w in vocabulary if w not in seen])[:12]
+        return "```json\n" + json.dumps(kws) + "\n```"
+    if "bid range" in low:
+        m = re.search(r"quartiles\s+([\d.]+)%\s*/\s*([\d.]+)%\s*/\s*([\d.]+)%", prompt)
+        lo, hi = (float(m.group(1)) / 100, float(m.group(3)) / 100) if m else (0.85, 0.95)
+        return "```json\n" + json.dumps({
+            "bid_range_min_sgd": 0, "bid_range_max_sgd": 0,
+            "bid_range_min_pct": round(lo, 4), "bid_range_max_pct": round(hi, 4),
+            "risk_level": "Medium", "confidence_level": "Medium",
+            "reasoning": "Emulated reply: interquartile range of the comparable awards.",
+        }) + "\n```"
+    return "Emulated reply."
+
+
+def _prompt_text(contents) -> str:
+    """Concatenated text parts of a Gemini `contents` payload."""
+    parts = []
+    for c in contents or []:
+        for p in (c.get("parts", []) if isinstance(c, dict) else []):
+            if isinstance(p, dict) and "text" in p:
+                parts.append(p["text"])
+    return "\n".join(parts)
+
+
+# ---------------------------------------------------------------------------
+# 4  App
+# ---------------------------------------------------------------------------
+
+
+def create_app(records: int = DEFAULT_RECORDS, seed: int = DEFAULT_SEED,
+               profiles: Optional[Dict[str, Profile]] = None) -> Flask:
+    corpus = Corpus(records, seed)
+    profiles = profiles or {}
+    faults = {name: Faults(profiles.get(name, Profile()), seed + i)
+              for i, name in enumerate(("gebiz", "ted", "llm"))}
+    app = Flask(__name__)
+
+    def injected(service: str):
+        hit = faults[service].apply()
+        if hit is None:
+            return None
+        body, status, headers = hit
+        return jsonify(body), status, headers
+
+    @app.route("/api/action/datastore_search", methods=["GET", "POST"])
+    def datastore_search():
+        err = injected("gebiz")
+        if err:
+            return err
+        args = request.values if request.method == "GET" else (request.json or {})
+        if args.get("resource_id") not in (None, GEBIZ_DATASET_ID):
+            return jsonify({"success": False, "error": {"message": "Not found: Resource was not found."}}), 404
+        limit = min(int(args.get("limit", 100)), 32000)
+        offset = int(args.get("offset", 0))
+        q = args.get("q", "")
+        hits = corpus.search_gebiz(q)
+        page = [corpus.gebiz[i] for i in hits[offset:offset + limit].tolist()]
+        return jsonify({"success": True, "result": {
+            "resource_id": GEBIZ_DATASET_ID, "records": page, "total": int(len(hits)),
+            "limit": limit, "offset": offset, **({"q": q} if q else {})}})
+
+    @app.route("/v3/notices/search", methods=["POST"])
+    def notices_search():
+        err = injected("ted")
+        if err:
+            return err
+        payload = request.json or {}
+        phrase = re.search(r'~\s*"([^"]*)"', payload.get("query", ""))
+        hits = corpus.search_ted(phrase.group(1) if phrase else "")
+        limit = max(1, min(int(payload.get("limit", 10)), 250))
+        page = max(1, int(payload.get("page", 1)))
+        fields = payload.get("fields")
+        rows = [corpus.ted[i] for i in hits[(page - 1) * limit:page * limit].tolist()]
+        if fields:
+            rows = [{"publication-number": r["publication-number"],
+                     **{f: r[f] for f in fields if f in r}} for r in rows]
+        return jsonify({"notices": rows, "totalNoticeCount": int(len(hits)), "timedOut": False})
+
+    @app.route("/v1beta/models/<model>:generateContent", methods=["POST"])
+    @app.route("/v1/models/<model>:generateContent", methods=["POST"])
+    def generate_content(model):
+        err = injected("llm")
+        if err:
+            return err
+        prompt = _prompt_text((request.json or {}).get("contents"))
+        text = llm_reply(prompt, corpus.vocabulary)
+        return jsonify({
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                            "finishReason": "STOP", "index": 0}],
+            "usageMetadata": {"promptTokenCount": len(prompt) // 4,
+                              "candidatesTokenCount": len(text) // 4,
+                              "totalTokenCount": (len(prompt) + len(text)) // 4},
+            "modelVersion": model,
+        })
+
+    @app.route("/model/<path:model>/invoke", methods=["POST"])
+    def invoke_model(model):
+        err = injected("llm")
+        if err:
+            return err
+        body = json.loads(request.get_data() or b"{}")
+        prompt = "\n".join(m["content"] if isinstance(m.get("content"), str)
+                           else "\n".join(c.get("text", "") for c in m.get("content", []))
+                           for m in body.get("messages", []))
+        text = llm_reply(prompt, corpus.vocabulary)
+        return jsonify({
+            "id": f"msg_emu_{abs(hash(prompt)) % 10**12:012d}", "type": "message",
+            "role": "assistant", "model": model,
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        })
+
+    @app.route("/_emulator")
+    def status():
+        return jsonify({"records": {"gebiz": len(corpus.gebiz), "ted": len(corpus.ted)},
+                        "services": {name: {"profile": asdict(f.profile), **f.counts}
+                                     for name, f in faults.items()}})
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# 5  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Serve local GeBIZ / TED / LLM emulators.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument("--records", type=int, default=DEFAULT_RECORDS, help="synthetic GeBIZ awards")
+    ap.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    for name in ("gebiz", "ted", "llm"):
+        ap.add_argument(f"--{name}", default="", metavar="PROFILE",
+                        help="e.g. latency=120,jitter=0.5,errors=0.02,rps=20,burst=40")
+    args = ap.parse_args(argv)
+
+    try:
+        profiles = {name: Profile.parse(getattr(args, name)) for name in ("gebiz", "ted", "llm")}
+    except ValueError as e:
+        print("❌", e)
+        return 2
+    app = create_app(args.records, args.seed, profiles)
+    base = f"http://{args.host}:{args.port}"
+    print(f"✅ Emulators on {base} ({args.records:,} records). Point the backend at them with:\n"
+          f"  export GEBIZ_ENDPOINT={base}/api/action/datastore_search\n"
+          f"  export TED_ENDPOINT={base}/v3/notices/search\n"
+          f"  export GEMINI_ENDPOINT={base}\n"
+          f"  export BEDROCK_ENDPOINT={base}")
+    app.run(host=args.host, port=args.port, threaded=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
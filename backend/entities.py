@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Supplier entity resolution
+--------------------------
+• Normalises supplier names from any source (GeBIZ `Supplier Name`, TED
+  `winner-name`, …): case, accents, punctuation, "&"/"and", and legal-form
+  suffixes such as "Pte Ltd", "Sdn Bhd", "GmbH".
+• Finds candidate matches through blocking instead of comparing every
+  pair: MinHash LSH over character trigrams plus a token-prefix block, then
+  fuzzy-matches only inside the candidate set.
+• Keeps a persistent, append-only alias → canonical-id table (JSONL), so
+  ids are stable across runs and new names resolve incrementally.
+• GeBIZ suppliers are resolved as the award history syncs; TED winners are
+  resolved when they turn up in an analysis' cross-market comparables
+  (TenderAnalyzer._cross_market), so a company that wins on both sides
+  carries one supplier_id there. The supplier aggregates cover the GeBIZ
+  award history only.
+
+Usage:
+  python entities.py resolve "ACME Engineering Pte. Ltd."
+  python entities.py rebuild          # resolve every supplier in the award history
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import sys
+import json
+import zlib
+import argparse
+import threading
+import unicodedata
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+
+from awards import Award, AwardHistory
+
+ENTITY_TABLE_PATH = os.getenv(
+    "SUPPLIER_ENTITIES",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "suppliers.jsonl"),
+)
+
+MATCH_THRESHOLD = 0.90
+NUM_PERM = 64
+LSH_BANDS = 16                  # 16 bands × 4 rows: pairs with trigram Jaccard ≳ 0.5 collide
+MIN_EST_JACCARD = 0.6           # MinHash-estimated trigram overlap needed before fuzzy scoring
+BLOCK_MAX = 50                  # blocks bigger than this (e.g. every "… engineering") carry
+                                # no signal and would make matching quadratic, so skip them
+
+# Legal forms and filler words dropped before matching (already lower-cased,
+# punctuation stripped, so "Pte. Ltd." arrives here as "pte ltd")
+_LEGAL_SUFFIXES = {
+    "pte", "ltd", "limited", "private", "pvt", "llp", "lp", "plc", "inc", "incorporated",
+    "corp", "corporation", "co", "company", "llc", "sdn", "bhd", "berhad", "tbk", "pt",
+    "gmbh", "mbh", "ag", "kg", "ug", "se", "sa", "sas", "sarl", "srl", "spa", "sl",
+    "bv", "nv", "oy", "ab", "as", "aps", "asa", "kft", "sro", "zoo", "sp", "the",
+}
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+# Multiply-shift hashes: high 32 bits of (a·x + b) mod 2^64 with odd a.
+# Fixed seed: signatures must be stable across runs.
+_rng = np.random.default_rng(20240101)
+_PERM_A = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+_PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64)
+
+# ---------------------------------------------------------------------------
+# 1  Normalisation & similarity
+# ---------------------------------------------------------------------------
+
+
+def normalise_name(name: str) -> str:
+    """Matching form of a supplier name: "ACME Engineering Pte. Ltd." → "acme engineering"."""
+    s = unicodedata.normalize("NFKD", name or "")
+    s = "".join(c for c in s if not unicodedata.combining(c)).lower().replace("&", " and ")
+    tokens: List[str] = []
+    run = ""
+    for t in _NON_ALNUM.sub(" ", s).split():
+        if len(t) == 1 and t.isalpha():
+            run += t                    # spelt-out initials: "s a" → "sa", "n c s" → "ncs"
+            continue
+        if run:
+            tokens.append(run)
+            run = ""
+        tokens.append(t)
+    if run:
+        tokens.append(run)
+    core = [t for t in tokens if t not in _LEGAL_SUFFIXES]
+    return " ".join(core or tokens)
+
+
+def _prefix_key(norm: str) -> str:
+    """Blocking key: the first three characters of the first two tokens."""
+    return " ".join(t[:3] for t in norm.split()[:2])
+
+
+def _trigrams(norm: str) -> Set[str]:
+    s = f"  {norm} "
+    return {s[i:i + 3] for i in range(len(s) - 2)}
+
+
+def minhash(norm: str) -> np.ndarray:
+    """NUM_PERM-value MinHash signature over character trigrams."""
+    grams = _trigrams(norm)
+    x = np.array([zlib.crc32(g.encode()) for g in grams], dtype=np.uint64)
+    with np.errstate(over="ignore"):                # wrap-around is the point
+        h = (_PERM_A[:, None] * x[None, :] + _PERM_B[:, None]) >> np.uint64(32)
+    return h.min(axis=1)
+
+
+def _numbers(norm: str) -> List[str]:
+    return [t for t in norm.split() if t.isdigit()]
+
+
+def similarity(a: str, b: str) -> float:
+    """Fuzzy similarity of two normalised names in [0, 1]. Names whose
+    numbers differ ("Alpha 2" vs "Alpha 3") never match."""
+    if a == b or a.replace(" ", "") == b.replace(" ", ""):
+        return 1.0
+    if _numbers(a) != _numbers(b):
+        return 0.0
+    sm = SequenceMatcher(None, a, b, autojunk=False)
+    # cheap upper bounds first; most candidates fail them
+    if sm.real_quick_ratio() < MATCH_THRESHOLD or sm.quick_ratio() < MATCH_THRESHOLD:
+        return 0.0
+    return sm.ratio()
+
+
+# ---------------------------------------------------------------------------
+# 2  Persistent resolver
+# ---------------------------------------------------------------------------
+
+
+class EntityResolver:
+    """Alias → canonical supplier id, with blocked fuzzy matching for unseen
+    spellings. Every new alias is appended to the table, so a restart
+    replays to the same ids."""
+
+    def __init__(self, path: str = ENTITY_TABLE_PATH) -> None:
+        self.path = os.path.abspath(path)
+        self.by_alias: Dict[str, str] = {}         # alias as written → id
+        self.by_norm: Dict[str, str] = {}          # normalised alias → id
+        self.canonical: Dict[str, Dict] = {}      # id → {"id", "name", "aliases", "sources"}
+        self._bands: List[Dict[bytes, Set[str]]] = [{} for _ in range(LSH_BANDS)]
+        self._prefix: Dict[str, Set[str]] = {}    # token-prefix block key → norms
+        self._sigs: Dict[str, np.ndarray] = {}    # norm → MinHash signature
+        self._lock = threading.RLock()
+        self._load()
+
+    @classmethod
+    def from_history(cls, history: AwardHistory, path: str = ENTITY_TABLE_PATH) -> "EntityResolver":
+        """Resolve every supplier already in the history and follow new syncs.
+        Subscribe this before any index that keys suppliers through it."""
+        res = cls(path)
+        res.add_awards(history.awards)
+        history.subscribe(res.add_awards)
+        return res
+
+    # ........................................................ persistence
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for ln in f:
+                try:
+                    rec = json.loads(ln)
+                except ValueError:
+                    continue
+                self._register(rec["alias"], rec["norm"], rec["id"], rec.get("source", ""))
+
+    def _append(self, rows: List[Dict]) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for r in rows:
+                f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def _register(self, alias: str, norm: str, eid: str, source: str) -> None:
+        ent = self.canonical.setdefault(eid, {"id": eid, "name": alias, "aliases": [], "sources": []})
+        if alias not in self.by_alias:
+            self.by_alias[alias] = eid
+            ent["aliases"].append(alias)
+        if source and source not in ent["sources"]:
+            ent["sources"].append(source)
+        if norm in self.by_norm:
+            return
+        self.by_norm[norm] = eid
+        sig = self._sigs[norm] = minhash(norm)
+        rows = NUM_PERM // LSH_BANDS
+        for b in range(LSH_BANDS):
+            self._bands[b].setdefault(sig[b * rows:(b + 1) * rows].tobytes(), set()).add(norm)
+        if norm:
+            self._prefix.setdefault(_prefix_key(norm), set()).add(norm)
+
+    # ............................................................ matching
+
+    def _candidates(self, norm: str) -> List[str]:
+        sig = minhash(norm)
+        rows = NUM_PERM // LSH_BANDS
+        out: Set[str] = set()
+        blocks = [self._bands[b].get(sig[b * rows:(b + 1) * rows].tobytes(), ())
+                  for b in range(LSH_BANDS)]
+        blocks.append(self._prefix.get(_prefix_key(norm), ()))
+        for block in blocks:
+            if len(block) <= BLOCK_MAX:
+                out.update(block)
+        if not out:
+            return []
+        # share of agreeing signature slots estimates the trigram Jaccard;
+        # one vectorised compare prunes most blocks before any fuzzy match
+        cands = list(out)
+        est = (np.stack([self._sigs[c] for c in cands]) == sig).mean(axis=1)
+        return [c for c, j in zip(cands, est) if j >= MIN_EST_JACCARD]
+
+    def match(self, name: str) -> Optional[str]:
+        """Canonical id for a name if it is known or fuzzy-matches a known
+        alias; never creates an entity."""
+        if name in self.by_alias:
+            return self.by_alias[name]
+        norm = normalise_name(name)
+        if not norm:
+            return None
+        with self._lock:
+            if norm in self.by_norm:
+                return self.by_norm[norm]
+            best, best_score = None, MATCH_THRESHOLD
+            for cand in self._candidates(norm):
+                score = similarity(norm, cand)
+                if score >= best_score:
+                    best, best_score = cand, score
+            return self.by_norm[best] if best else None
+
+    def resolve(self, name: str, source: str = "") -> Optional[str]:
+        """Canonical id for a name, creating a new entity if nothing matches."""
+        return self.resolve_many([name], source)[0]
+
+    def resolve_many(self, names: Iterable[str], source: str = "") -> List[Optional[str]]:
+        out, new_rows = [], []
+        with self._lock:
+            for name in names:
+                if name in self.by_alias:
+                    out.append(self.by_alias[name])
+                    continue
+                norm = normalise_name(name)
+                if not norm:
+                    out.append(None)
+                    continue
+                eid = self.match(name) or f"S{len(self.canonical) + 1:06d}"
+                self._register(name, norm, eid, source)
+                new_rows.append({"alias": name, "norm": norm, "id": eid, "source": source})
+                out.append(eid)
+            if new_rows:
+                self._append(new_rows)
+        return out
+
+    def add_awards(self, awards: Iterable[Award]) -> None:
+        by_source: Dict[str, List[str]] = {}
+        for a in awards:
+            if a.supplier:
+                by_source.setdefault(a.source, []).append(a.supplier)
+        for source, names in by_source.items():
+            self.resolve_many(names, source)
+
+    # ............................................................. lookups
+
+    def key(self, name: str) -> str:
+        """Grouping key for aggregates: the canonical id, or the normalised
+        name for a supplier nobody has resolved yet."""
+        return self.match(name) or normalise_name(name).upper()
+
+    def entity(self, name_or_id: str) -> Optional[Dict]:
+        with self._lock:
+            if name_or_id in self.canonical:
+                return self.canonical[name_or_id]
+            eid = self.match(name_or_id)
+            return self.canonical.get(eid) if eid else None
+
+
+# ---------------------------------------------------------------------------
+# 3  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Resolve supplier names to canonical ids.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("resolve", help="look up (and register) supplier names")
+    r.add_argument("names", nargs="+")
+    sub.add_parser("rebuild", help="resolve every supplier in the award history")
+    args = ap.parse_args(argv)
+
+    resolver = EntityResolver()
+    if args.cmd == "resolve":
+        for name in args.names:
+            eid = resolver.resolve(name)
+            print(f"{name!r} → {eid} ({resolver.canonical[eid]['name']})" if eid else f"{name!r} → –")
+    else:
+        history = AwardHistory()
+        resolver.add_awards(history.awards)
+        print(f"✅ {len(resolver.by_norm)} aliases → {len(resolver.canonical)} suppliers")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
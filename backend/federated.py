@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Federated comparable search
+---------------------------
+• Queries GeBIZ (SGD awards) and TED (EU notices, mostly EUR) concurrently,
+  each against its own deadline, so a tender's cross-market comparables
+  cost the slower of the two searches rather than their sum.
+• A source that misses its deadline or fails is reported as such and the
+  others' results are returned anyway (a partial result); its call keeps
+  running on the shared pool and is simply not waited for. A source's
+  deadline counts from when its call starts, not from when it was queued.
+  No source is waited for past the request deadline (deadlines.py), and
+  one whose circuit breaker is open (breakers.py) answers at once with no
+  records.
+• Results from both sources are normalised into one Comparable record with
+  amounts converted to SGD, then merge-ranked with the same text / value /
+  recency scoring used for GeBIZ comparables (comparables.py).
+• FX rates are static reference rates (FX_RATES overrides them, e.g.
+  "EUR=1.46,USD=1.35"); good enough for ranking and ratios, not for quoting.
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from awards import categorise, normalise_gebiz, parse_award_amount
+from comparables import score_comparables
+from deadlines import remaining, submit
+from breakers import CircuitOpen
+
+GEBIZ_DEADLINE = float(os.getenv("GEBIZ_DEADLINE", "15"))     # seconds
+TED_DEADLINE = float(os.getenv("TED_DEADLINE", "10"))
+# searches are I/O-bound and threads are started lazily; enough workers that
+# calls abandoned at their deadline (which run on until their own HTTP
+# timeout) never leave new searches waiting in the queue
+FEDERATED_WORKERS = int(os.getenv("FEDERATED_WORKERS", "64"))
+
+# SGD per unit of each currency
+FX_TO_SGD = {"SGD": 1.0, "EUR": 1.45, "USD": 1.34, "GBP": 1.70, "CHF": 1.52,
+             "SEK": 0.127, "DKK": 0.194, "NOK": 0.125, "PLN": 0.34, "CZK": 0.058,
+             "HUF": 0.0037, "RON": 0.29, "BGN": 0.74}
+FX_TO_SGD.update({k.strip().upper(): float(v) for k, v in
+                  (pair.split("=") for pair in os.getenv("FX_RATES", "").split(",") if "=" in pair)})
+
+_CURRENCY_RE = re.compile(r"\b([A-Z]{3})\b")
+
+# ---------------------------------------------------------------------------
+# 1  One record shape for every source
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Comparable:
+    source: str                     # "gebiz" | "ted"
+    ref: str                        # tender number / publication number
+    title: str
+    buyer: str                      # agency, or buyer country for TED
+    supplier: str
+    amount: Optional[float]         # in `currency`
+    currency: str
+    amount_sgd: Optional[float]
+    award_date: Optional[str]       # ISO yyyy-mm-dd, where the source has one
+    category: str
+    score: Optional[float] = None   # merge-rank score, 0–1
+    supplier_id: Optional[str] = None   # canonical id (entities.py), set after ranking
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def to_sgd(amount: Optional[float], currency: str) -> Optional[float]:
+    rate = FX_TO_SGD.get((currency or "").upper())
+    return amount * rate if amount is not None and rate else None
+
+
+def currency_of(text: str, default: str = "SGD") -> str:
+    """First known ISO currency code in a value string ("1.2M EUR" → EUR)."""
+    for code in _CURRENCY_RE.findall(str(text or "").upper()):
+        if code in FX_TO_SGD:
+            return code
+    return default
+
+
+def _first(v: Any) -> Any:
+    """TED fields come as scalars, lists or {language: value-or-list}."""
+    if isinstance(v, dict):
+        v = v.get("eng") or next(iter(v.values()), None)
+    if isinstance(v, list):
+        v = v[0] if v else None
+    return v
+
+
+def from_gebiz(rec: Dict) -> Comparable:
+    a = normalise_gebiz(rec)
+    return Comparable("gebiz", a.award_id, a.description, a.agency, a.supplier, a.amount,
+                      a.currency, to_sgd(a.amount, a.currency), a.award_date, a.category)
+
+
+def from_ted(notice: Dict) -> Comparable:
+    title = str(_first(notice.get("TI")) or "")
+    # the awarded value where published, else the estimate, each in its own currency
+    awarded = parse_award_amount(_first(notice.get("tender-value")))
+    amount = awarded or parse_award_amount(_first(notice.get("estimated-value-lot")))
+    currency = str(_first(notice.get("tender-value-cur" if awarded else "estimated-value-cur-lot"))
+                   or "EUR").upper()
+    return Comparable("ted", str(notice.get("publication-number") or ""), title,
+                      str(_first(notice.get("CY")) or ""), str(_first(notice.get("winner-name")) or ""),
+                      amount, currency, to_sgd(amount, currency), None, categorise(title))
+
+
+# ---------------------------------------------------------------------------
+# 2  Concurrent search with per-source deadlines
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Source:
+    """search(keywords, limit) → raw records; normalise(record) → Comparable."""
+    name: str
+    search: Callable[[List[str], int], List[Dict]]
+    normalise: Callable[[Dict], Comparable]
+    deadline: float
+
+
+# shared so a call abandoned at its deadline never holds up the caller
+_pool = ThreadPoolExecutor(max_workers=FEDERATED_WORKERS, thread_name_prefix="federated")
+
+
+class _Started:
+    """Set by the worker when a queued search actually starts."""
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.at = 0.0
+
+
+def _timed(started: _Started, fn: Callable, *args) -> tuple:
+    started.at = t0 = time.perf_counter()
+    started.event.set()
+    return fn(*args), time.perf_counter() - t0
+
+
+def federated_search(sources: Sequence[Source], keywords: List[str], limit: int) -> Dict:
+    """Raw records per source, the normalised records of all of them and a
+    status per source ("ok", "timeout", "circuit_open" or "error")."""
+    start = time.perf_counter()
+    left = remaining()
+    end = None if left is None else start + left       # the request deadline
+    calls = {s.name: _Started() for s in sources}
+    futures = {s.name: submit(_pool, _timed, calls[s.name], s.search, keywords, limit)
+               for s in sources}
+    out: Dict = {"raw": {}, "records": [], "sources": {}}
+    for s in sorted(sources, key=lambda s: s.deadline):
+        fut, started = futures[s.name], calls[s.name]
+        # a call still queued gets at most its own deadline (or what is left
+        # of the request's) to start
+        queue_end = time.perf_counter() + s.deadline if end is None else end
+        started.event.wait(max(0.0, queue_end - time.perf_counter()))
+        if started.event.is_set():
+            stop = started.at + s.deadline if end is None else min(started.at + s.deadline, end)
+            wait([fut], timeout=max(0.0, stop - time.perf_counter()))
+        if not fut.done():
+            queued = not started.event.is_set()
+            print(f"⚠️ {s.name} search {'never started' if queued else 'missed its deadline'}; "
+                  f"continuing without it")
+            out["raw"][s.name] = []
+            out["sources"][s.name] = {"status": "timeout", "count": 0, "deadline": s.deadline,
+                                      **({"queued": True} if queued else {})}
+            continue
+        try:
+            rows, secs = fut.result()
+        except CircuitOpen:
+            print(f"⚠️ {s.name} circuit open; continuing without it")
+            out["raw"][s.name] = []
+            out["sources"][s.name] = {"status": "circuit_open", "count": 0}
+            continue
+        except Exception as e:
+            print(f"⚠️ {s.name} search failed:", e)
+            out["raw"][s.name] = []
+            out["sources"][s.name] = {"status": "error", "count": 0, "error": str(e)}
+            continue
+        out["raw"][s.name] = rows
+        out["records"].extend(s.normalise(r).to_dict() for r in rows)
+        out["sources"][s.name] = {"status": "ok", "count": len(rows), "seconds": secs}
+    out["complete"] = all(v["status"] == "ok" for v in out["sources"].values())
+    return out
+
+
+# ---------------------------------------------------------------------------
+# 3  Merged ranking
+# ---------------------------------------------------------------------------
+
+
+def merge_rank(records: List[Dict], estimate_sgd: Optional[float], query: Sequence[str],
+               limit: Optional[int] = None) -> List[Dict]:
+    """Priced records from every source, deduplicated and scored against our
+    estimate in SGD, best first."""
+    seen, priced = set(), []
+    for r in records:
+        key = (r["source"], r["ref"])
+        if not r["amount_sgd"] or (r["ref"] and key in seen):
+            continue
+        seen.add(key)
+        priced.append(r)
+    if not priced:
+        return []
+    sig = score_comparables([r["title"] for r in priced], [r["amount_sgd"] for r in priced],
+                            [r["award_date"] for r in priced], estimate_sgd, query)
+    order = np.argsort(-sig["score"], kind="stable")[:limit]
+    return [{**priced[i], "score": float(sig["score"][i])} for i in order.tolist()]
@@ -1,5 +1,9 @@
 import google.generativeai as genai
 import os
+import json
+import time
+import hashlib
+from datetime import datetime
 from dotenv import load_dotenv
 import PyPDF2
 import io
@@ -17,6 +21,18 @@ if not api_key:
 # Configure the API
 genai.configure(api_key=api_key)
 
+# Local registry of files already uploaded to Gemini, keyed by content hash
+UPLOAD_REGISTRY_PATH = os.getenv(
+    "GEMINI_UPLOAD_REGISTRY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".gemini_uploads.json"),
+)
+UPLOAD_TTL_SECONDS = 48 * 3600      # Gemini keeps uploaded files for 48h
+UPLOAD_EXPIRY_MARGIN = 10 * 60      # re-upload if less than this is left
+_HASH_CHUNK = 1 << 20
+
+_hash_memo = {}       # (path, size, mtime_ns) -> sha256
+_handle_memo = {}     # sha256 -> uploaded File handle
+
 def extract_text_from_pdf(pdf_path):
     """Extract text from a PDF file"""
     try:
@@ -31,17 +47,89 @@ def extract_text_from_pdf(pdf_path):
         print(f"Error reading PDF: {e}")
         return None
 
+def file_sha256(path):
+    """Hash a file's content in chunks, memoised on (path, size, mtime)"""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if key not in _hash_memo:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+                h.update(chunk)
+        _hash_memo[key] = h.hexdigest()
+    return _hash_memo[key]
+
+def _load_registry():
+    try:
+        with open(UPLOAD_REGISTRY_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_registry(registry):
+    # Drop expired entries and write atomically so a crash never corrupts it
+    now = time.time()
+    registry = {k: v for k, v in registry.items() if v.get("expires_at", 0) > now}
+    tmp = UPLOAD_REGISTRY_PATH + ".tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2)
+    os.replace(tmp, UPLOAD_REGISTRY_PATH)
+
+def _expiry_epoch(uploaded_file):
+    exp = getattr(uploaded_file, "expiration_time", None)
+    if isinstance(exp, datetime):
+        return exp.timestamp()
+    return time.time() + UPLOAD_TTL_SECONDS
+
+def _is_fresh(expires_at):
+    return expires_at - time.time() > UPLOAD_EXPIRY_MARGIN
+
 def upload_pdf_to_gemini(pdf_path):
-    """Upload PDF file directly to Gemini (for supported file types)"""
+    """Upload PDF file directly to Gemini, reusing a live upload of the same content"""
+    try:
+        digest = file_sha256(pdf_path)
+    except OSError as e:
+        print(f"Error reading PDF: {e}")
+        return None
+
+    registry = _load_registry()
+    entry = registry.get(digest)
+    if entry and _is_fresh(entry["expires_at"]):
+        cached = _handle_memo.get(digest)
+        if cached is not None:
+            return cached
+        try:
+            # Metadata lookup only - the file bytes are not sent again
+            uploaded_file = genai.get_file(entry["name"])
+            _handle_memo[digest] = uploaded_file
+            print(f"Reusing uploaded file: {uploaded_file.name}")
+            return uploaded_file
+        except Exception as e:
+            print(f"Cached upload {entry['name']} unavailable, re-uploading: {e}")
+
+    _handle_memo.pop(digest, None)
     try:
         # Upload the file to Gemini
         uploaded_file = genai.upload_file(pdf_path)
         print(f"Uploaded file: {uploaded_file.name}")
-        return uploaded_file
     except Exception as e:
         print(f"Error uploading PDF to Gemini: {e}")
         return None
 
+    registry[digest] = {
+        "name": uploaded_file.name,
+        "uri": getattr(uploaded_file, "uri", None),
+        "path": os.path.abspath(pdf_path),
+        "uploaded_at": time.time(),
+        "expires_at": _expiry_epoch(uploaded_file),
+    }
+    try:
+        _save_registry(registry)
+    except OSError as e:
+        print(f"Could not update upload registry: {e}")
+    _handle_memo[digest] = uploaded_file
+    return uploaded_file
+
 def chat_with_pdf(pdf_path, question="Please summarize this document"):
     """Chat with PDF using Gemini AI"""
 
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Historical comparison service
+-----------------------------
+• Precomputes price (and, where awards carry one, score) distributions per
+  category and per agency from the local award history.
+• Each distribution is a sorted sample plus a 101-point quantile table, so
+  "what percentile is this bid" is a binary search (O(log n)) and quantile
+  lookups are O(1).
+• New awards are buffered and merged in on the next query, so syncs never
+  trigger a full rebuild.
+• from_columns() bulk-builds every table from the memory-mapped award
+  columns (one lexsort per scope) instead of award by award.
+• Award prices are kept in SGD; compare() converts a bid in another
+  currency at the reference rates (federated.FX_TO_SGD) and reports the
+  price distributions back in the bid's currency.
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from awards import Award, AwardHistory, categorise
+from columnar import AwardColumns, sorted_groups
+
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+_PRICE_FIELDS = ("min", "max", "mean") + tuple(f"p{int(q * 100)}" for q in SUMMARY_QUANTILES)
+
+# ---------------------------------------------------------------------------
+# 1  Quantile table
+# ---------------------------------------------------------------------------
+
+
+class QuantileTable:
+    """Sorted sample with O(log n) rank queries and batched incremental inserts."""
+
+    def __init__(self, values: Iterable[float] = ()) -> None:
+        self._sorted: List[float] = sorted(values)
+        self._pending: List[float] = []
+        self._sum = sum(self._sorted)
+        self._table: List[float] = []
+        self._rebuild_table()
+
+    def __len__(self) -> int:
+        return len(self._sorted) + len(self._pending)
+
+    def add(self, value: float) -> None:
+        self._pending.append(value)
+        self._sum += value
+
+    def _merge(self) -> None:
+        if self._pending:
+            self._pending.sort()
+            self._sorted = list(heapq.merge(self._sorted, self._pending))
+            self._pending = []
+            self._rebuild_table()
+
+    def _rebuild_table(self) -> None:
+        n = len(self._sorted)
+        self._table = [self._interp(i / 100) for i in range(101)] if n else []
+
+    def _interp(self, q: float) -> float:
+        xs = self._sorted
+        pos = q * (len(xs) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(xs) - 1)
+        return xs[lo] + (xs[hi] - xs[lo]) * (pos - lo)
+
+    def values(self) -> List[float]:
+        """The whole sample, sorted."""
+        self._merge()
+        return self._sorted
+
+    @classmethod
+    def from_sorted(cls, values: Iterable[float]) -> "QuantileTable":
+        """A table over values already in ascending order (no re-sort)."""
+        xs = np.asarray(values, dtype=np.float64)
+        t = cls()
+        t._sorted = xs.tolist()
+        t._sum = float(xs.sum())
+        if len(xs):
+            # the same linear interpolation as _interp, for all 101 points at once
+            t._table = np.interp(np.linspace(0, len(xs) - 1, 101), np.arange(len(xs)), xs).tolist()
+        return t
+
+    @classmethod
+    def merged(cls, tables: Iterable["QuantileTable"]) -> "QuantileTable":
+        """One table over the union of several (a k-way merge, no re-sort)."""
+        t = cls()
+        t._sorted = list(heapq.merge(*(x.values() for x in tables)))
+        t._sum = sum(t._sorted)
+        t._rebuild_table()
+        return t
+
+    def percentile(self, value: float) -> Optional[float]:
+        """Share of the sample (0–100) at or below value; ties count half."""
+        self._merge()
+        n = len(self._sorted)
+        if not n:
+            return None
+        lo = bisect_left(self._sorted, value)
+        hi = bisect_right(self._sorted, value)
+        return 100.0 * (lo + (hi - lo) / 2) / n
+
+    def quantile(self, q: float) -> Optional[float]:
+        self._merge()
+        if not self._table:
+            return None
+        pos = max(0.0, min(1.0, q)) * 100
+        lo = int(pos)
+        if lo >= 100:
+            return self._table[100]
+        return self._table[lo] + (self._table[lo + 1] - self._table[lo]) * (pos - lo)
+
+    def summary(self) -> Dict:
+        self._merge()
+        n = len(self._sorted)
+        if not n:
+            return {"count": 0}
+        out = {"count": n, "min": self._sorted[0], "max": self._sorted[-1], "mean": self._sum / n}
+        for q in SUMMARY_QUANTILES:
+            out[f"p{int(q * 100)}"] = self.quantile(q)
+        return out
+
+
+# ---------------------------------------------------------------------------
+# 2  Index over the award history
+# ---------------------------------------------------------------------------
+
+
+def _position_label(pct: float) -> str:
+    if pct < 10:
+        return "well below typical awards"
+    if pct < 25:
+        return "bottom quartile"
+    if pct < 75:
+        return "within the typical range"
+    if pct < 90:
+        return "top quartile"
+    return "well above typical awards"
+
+
+class HistoricalIndex:
+    """Quantile tables keyed by (metric, dimension, value), e.g.
+    ("price", "category", "software") or ("price", "agency", "GovTech")."""
+
+    def __init__(self) -> None:
+        self.tables: Dict[Tuple[str, str, str], QuantileTable] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, history: AwardHistory) -> "HistoricalIndex":
+        """Build the index and keep it current as the history grows."""
+        idx = cls()
+        idx.add_awards(history.awards)
+        history.subscribe(idx.add_awards)
+        return idx
+
+    @classmethod
+    def from_columns(cls, columns: AwardColumns, history: Optional[AwardHistory] = None
+                     ) -> "HistoricalIndex":
+        """Build the index from the column store; with `history`, follow
+        its syncs as from_history does."""
+        idx = cls()
+        for metric, values in (("price", columns.amount), ("score", columns.score)):
+            for dim in ("all", "category", "agency"):
+                keys, codes = columns.scope_codes(dim)
+                for code, xs in sorted_groups(codes, values):
+                    idx.tables[(metric, dim, keys[code])] = QuantileTable.from_sorted(xs)
+        if history is not None:
+            history.subscribe(idx.add_awards)
+        return idx
+
+    def _table(self, metric: str, dim: str, key: str) -> QuantileTable:
+        k = (metric, dim, key)
+        if k not in self.tables:
+            self.tables[k] = QuantileTable()
+        return self.tables[k]
+
+    def add_awards(self, awards: Iterable[Award]) -> None:
+        with self._lock:
+            for a in awards:
+                scopes = (("all", ""), ("category", a.category), ("agency", a.agency))
+                if a.amount:
+                    for dim, key in scopes:
+                        self._table("price", dim, key).add(a.amount)
+                if a.score is not None:
+                    for dim, key in scopes:
+                        self._table("score", dim, key).add(a.score)
+
+    # ............................................................. queries
+
+    def percentile(self, metric: str, value: float, dim: str = "all", key: str = "") -> Optional[float]:
+        with self._lock:
+            t = self.tables.get((metric, dim, key))
+            return t.percentile(value) if t else None
+
+    def distribution(self, metric: str, dim: str = "all", key: str = "") -> Dict:
+        with self._lock:
+            t = self.tables.get((metric, dim, key))
+            return t.summary() if t else {"count": 0}
+
+    def compare(self, amount: Optional[float] = None, score: Optional[float] = None,
+                category: Optional[str] = None, agency: Optional[str] = None,
+                description: str = "", currency: str = "SGD") -> Dict:
+        """Place a bid against every scope that has history (overall, its
+        category, its agency). `amount` is in `currency`, and so are the
+        price distributions returned; raises ValueError for a currency
+        without a reference rate."""
+        from federated import FX_TO_SGD        # federated → comparables → trends → here
+
+        currency = (currency or "SGD").upper()
+        rate = FX_TO_SGD.get(currency)
+        if rate is None:
+            raise ValueError(f"no exchange rate for currency {currency!r}")
+        category = category or (categorise(description) if description else None)
+        scopes = [("all", "")]
+        if category:
+            scopes.append(("category", category))
+        if agency:
+            scopes.append(("agency", agency))
+
+        out: Dict = {"category": category, "agency": agency, "currency": currency,
+                     "price": {}, "score": {}}
+        for metric, value in (("price", amount), ("score", score)):
+            if value is None:
+                continue
+            for dim, key in scopes:
+                dist = self.distribution(metric, dim, key)
+                if not dist["count"]:
+                    continue
+                if metric == "price":
+                    pct = self.percentile(metric, value * rate, dim, key)
+                    dist.update({f: dist[f] / rate for f in _PRICE_FIELDS})
+                else:
+                    pct = self.percentile(metric, value, dim, key)
+                out[metric][dim] = {**dist, "key": key, "value": value,
+                                    "percentile": pct, "position": _position_label(pct)}
+        return out
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Bulk tender ingestion
+---------------------
+• Walks a directory of TXT / DOCX / PDF tender files.
+• Parses them across a process pool (one record per tender block, so
+  multi-tender exports fan out) and writes normalised tender records
+  to JSONL (default) or Parquet.
+• Keeps a checkpoint so an interrupted run resumes where it stopped.
+• Reports per-file timing and failures.
+
+Usage:
+  python ingest.py tenders/ -o tenders.jsonl
+  python ingest.py tenders/ -o tenders.parquet --workers 8 --report report.json
+
+Requires:
+  pip install python-docx PyPDF2
+  pip install pyarrow            # only for Parquet output
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from typing import List, Dict, Optional, Iterator
+
+from document_loader import SUPPORTED_EXTENSIONS, iter_tender_file, normalise_tender
+
+PARQUET_ROW_GROUP = 1000
+
+# ---------------------------------------------------------------------------
+# 1  Per-file worker (runs in the pool)
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FileResult:
+    path: str
+    size: int
+    mtime_ns: int
+    ok: bool
+    elapsed_ms: float
+    records: List[Dict] = field(default_factory=list)
+    error: str = ""
+
+
+def ingest_file(path: str) -> FileResult:
+    size = mtime_ns = 0
+    t0 = time.perf_counter()
+    try:
+        # a file removed or unreadable since the walk is a failed file, not a failed run
+        st = os.stat(path)
+        size, mtime_ns = st.st_size, st.st_mtime_ns
+        # one file may hold several tenders back to back
+        records = [normalise_tender(t, source=path, index=i)
+                   for i, t in enumerate(iter_tender_file(path))]
+        ok, error = True, ""
+    except Exception as e:
+        records, ok, error = [], False, f"{type(e).__name__}: {e}"
+    elapsed = (time.perf_counter() - t0) * 1000
+    return FileResult(path, size, mtime_ns, ok, elapsed, records, error)
+
+
+# ---------------------------------------------------------------------------
+# 2  Checkpoint
+# ---------------------------------------------------------------------------
+
+
+class Checkpoint:
+    """Append-only log of finished files; a file is skipped on resume only if it
+    succeeded and is unchanged (same size and mtime). Failed files are retried."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.done: Dict[str, tuple] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for ln in f:
+                    try:
+                        e = json.loads(ln)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if e.get("ok"):
+                        self.done[e["path"]] = (e["size"], e["mtime_ns"])
+                    else:
+                        self.done.pop(e["path"], None)
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def is_done(self, path: str) -> bool:
+        st = os.stat(path)
+        return self.done.get(path) == (st.st_size, st.st_mtime_ns)
+
+    def mark(self, r: FileResult) -> None:
+        self._fh.write(json.dumps({"path": r.path, "size": r.size,
+                                   "mtime_ns": r.mtime_ns, "ok": r.ok}) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+# ---------------------------------------------------------------------------
+# 3  Output writers
+# ---------------------------------------------------------------------------
+
+
+class JsonlWriter:
+    def __init__(self, path: str) -> None:
+        self._fh = open(path, "a", encoding="utf-8")
+
+    def write(self, records: List[Dict]) -> bool:
+        """Write records; returns True once everything written so far is on disk."""
+        for rec in records:
+            self._fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+        return True
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+class ParquetWriter:
+    """Parquet files cannot be appended to, so records go to part files next
+    to the requested path (tenders.part-0001.parquet, ...), one per row group.
+    Each part is written whole (footer included) under a temporary name and
+    renamed into place, so a crash never leaves an unreadable file behind
+    records the checkpoint already counts as done."""
+
+    def __init__(self, path: str) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("❌ Parquet output needs pyarrow: pip install pyarrow")
+        self._pa, self._pq = pa, pq
+        self._stem, self._ext = os.path.splitext(path)
+        self._next = 1
+        self.paths: List[str] = []
+        self._schema = pa.schema([
+            ("source", pa.string()), ("index", pa.int32()),
+            ("heading", pa.string()), ("title", pa.string()),
+            ("description", pa.string()), ("estimated_value", pa.string()),
+            ("amount", pa.float64()), ("currency", pa.string()),
+        ])
+        self._buf: List[Dict] = []
+
+    def write(self, records: List[Dict]) -> bool:
+        """Buffer records; returns True once everything written so far is on disk."""
+        self._buf.extend(records)
+        if len(self._buf) >= PARQUET_ROW_GROUP:
+            self._flush()
+        return not self._buf
+
+    def _part_path(self) -> str:
+        while os.path.exists(f"{self._stem}.part-{self._next:04d}{self._ext}"):
+            self._next += 1
+        return f"{self._stem}.part-{self._next:04d}{self._ext}"
+
+    def _flush(self) -> None:
+        if not self._buf:
+            return
+        path = self._part_path()
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            self._pq.write_table(self._pa.Table.from_pylist(self._buf, schema=self._schema), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self.paths.append(path)
+        self._buf = []
+
+    def close(self) -> None:
+        """Write out what is buffered; safe to call more than once."""
+        self._flush()
+
+
+# ---------------------------------------------------------------------------
+# 4  Driver
+# ---------------------------------------------------------------------------
+
+
+def iter_tender_files(root: str) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for fn in sorted(filenames):
+            if os.path.splitext(fn)[1].lower() in SUPPORTED_EXTENSIONS:
+                yield os.path.join(dirpath, fn)
+
+
+def run_ingest(root: str, output: str, fmt: Optional[str] = None,
+               workers: Optional[int] = None, checkpoint: Optional[str] = None) -> List[FileResult]:
+    fmt = fmt or ("parquet" if output.endswith(".parquet") else "jsonl")
+    ckpt = Checkpoint(checkpoint or output + ".checkpoint")
+    pending = [p for p in iter_tender_files(root) if not ckpt.is_done(p)]
+    skipped = len(ckpt.done)
+    print(f"🔍 {len(pending)} files to ingest ({skipped} already done per checkpoint)")
+
+    writer = ParquetWriter(output) if fmt == "parquet" else JsonlWriter(output)
+    results: List[FileResult] = []
+    unmarked: List[FileResult] = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(ingest_file, p) for p in pending]
+            for fut in as_completed(futures):
+                r = fut.result()
+                results.append(r)
+                unmarked.append(r)
+                if not r.ok:
+                    print(f"⚠️ {r.path}: {r.error}")
+                # files are checkpointed only once their records are on disk,
+                # so a crash can at worst re-emit a file, never lose it
+                if writer.write(r.records if r.ok else []):
+                    for u in unmarked:
+                        ckpt.mark(u)
+                    unmarked = []
+    finally:
+        # on success and after an error alike, the buffered records reach a
+        # complete file and only then are their files marked, so a resumed
+        # run neither loses them nor writes them a second time
+        try:
+            writer.close()
+            for u in unmarked:
+                ckpt.mark(u)
+        finally:
+            ckpt.close()
+    return results
+
+
+def summarise(results: List[FileResult], wall_s: float) -> Dict:
+    ok = [r for r in results if r.ok]
+    times = sorted(r.elapsed_ms for r in results)
+    return {
+        "files": len(results),
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "records": sum(len(r.records) for r in ok),
+        "wall_s": round(wall_s, 3),
+        "files_per_s": round(len(results) / wall_s, 2) if wall_s else None,
+        "p50_ms": round(times[len(times) // 2], 2) if times else None,
+        "max_ms": round(times[-1], 2) if times else None,
+        "slowest": [{"path": r.path, "elapsed_ms": round(r.elapsed_ms, 2)}
+                    for r in sorted(results, key=lambda r: -r.elapsed_ms)[:10]],
+        "failures": [{"path": r.path, "error": r.error} for r in results if not r.ok],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Bulk-ingest a directory of tender files.")
+    ap.add_argument("directory")
+    ap.add_argument("-o", "--output", default="tenders.jsonl")
+    ap.add_argument("--format", choices=("jsonl", "parquet"))
+    ap.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    ap.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    ap.add_argument("--report", help="write per-file timings and failures as JSON")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    results = run_ingest(args.directory, args.output, args.format, args.workers, args.checkpoint)
+    summary = summarise(results, time.perf_counter() - t0)
+
+    print(f"\n✅ {summary['succeeded']} files ingested, {summary['records']} records "
+          f"in {summary['wall_s']}s ({summary['files_per_s']} files/s)")
+    if summary["failed"]:
+        print(f"❌ {summary['failed']} files failed:")
+        for f in summary["failures"]:
+            print(f"  • {f['path']}: {f['error']}")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "files": [
+                {k: v for k, v in asdict(r).items() if k != "records"} for r in results
+            ]}, f, indent=2)
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Load test for the /analyze API
+------------------------------
+• Drives a running api.py over HTTP in one of two modes:
+    – closed loop: N clients, each sending its next request as soon as the
+      previous one returns (measures capacity at a given concurrency),
+    – open loop: requests arrive at a fixed rate whatever the server does;
+      latency is counted from the scheduled send time, so a stalled server
+      shows up in the tail instead of silently slowing the generator.
+• Sweeps concurrency levels (or arrival rates) automatically and reports,
+  per level, p50/p95/p99 latency, throughput, error rate and the per-stage
+  breakdown returned in the response's `timings`, plus the first level at
+  which throughput stops growing.
+• Reports are JSON with run metadata; --baseline prints the per-level
+  change against an earlier report.
+• Pair it with emulators.py to keep upstream services out of the picture,
+  and start the API with PIPELINE_MEMO_ENTRIES=0 unless the point is to
+  measure the stage memo (the sample tenders repeat).
+
+Usage:
+  python loadtest.py --url http://127.0.0.1:3000 --sweep 1,2,4,8,16 --duration 20
+  python loadtest.py --mode open --sweep 2,5,10,20 --duration 30 --output open.json
+  python loadtest.py --sweep 1,4,16 --baseline last.json
+
+Requires:
+  pip install numpy requests
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+from benchmarks import BENCH_TENDER, git_commit
+from document_loader import iter_tender_file
+
+DEFAULT_URL = "http://127.0.0.1:3000"
+DEFAULT_SWEEP = (1, 2, 4, 8, 16)
+DEFAULT_DURATION = 20.0         # seconds per level
+DEFAULT_WARMUP = 2.0            # seconds per level not counted
+DEFAULT_TIMEOUT = 120.0
+SATURATION_GAIN = 1.10          # a level must add >10% throughput to count as scaling
+
+# ---------------------------------------------------------------------------
+# 1  Samples
+# ---------------------------------------------------------------------------
+
+
+class Recorder:
+    """Thread-safe collection of per-request outcomes for one level."""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def ok(self, latency: float, timings: Optional[Dict]) -> None:
+        with self._lock:
+            self.latencies.append(latency)
+            for stage, secs in (timings or {}).items():
+                self.stages.setdefault(stage, []).append(secs)
+
+    def fail(self, kind: str) -> None:
+        with self._lock:
+            self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+def _percentiles(seconds: List[float]) -> Dict:
+    if not seconds:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None, "max_ms": None}
+    ms = np.asarray(seconds) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "mean_ms": float(ms.mean()), "max_ms": float(ms.max())}
+
+
+def summarise(rec: Recorder, level: float, wall: float) -> Dict:
+    done = len(rec.latencies)
+    failed = sum(rec.errors.values())
+    return {
+        "level": level,
+        "requests": done + failed,
+        "throughput_rps": done / wall if wall else 0.0,
+        "error_rate": failed / (done + failed) if done + failed else 0.0,
+        "errors": dict(rec.errors),
+        "latency": _percentiles(rec.latencies),
+        "stages": {s: _percentiles(v) for s, v in sorted(rec.stages.items())},
+    }
+
+
+# ---------------------------------------------------------------------------
+# 2  Load generators
+# ---------------------------------------------------------------------------
+
+
+class Target:
+    """POSTs tenders to /analyze round-robin; one HTTP session per thread."""
+
+    def __init__(self, url: str, tenders: List[Dict], timeout: float = DEFAULT_TIMEOUT) -> None:
+        self.url = url.rstrip("/") + "/analyze"
+        self.tenders = tenders
+        self.timeout = timeout
+        self._local = threading.local()
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _payload(self) -> Dict:
+        with self._lock:
+            t = self.tenders[self._next % len(self.tenders)]
+            self._next += 1
+        # refresh: measure the analysis itself, not the analysis store
+        return {"title": t["title"], "description": t["description"],
+                "estimated_value": t["estimated_value"], "refresh": True}
+
+    def send(self, rec: Optional[Recorder], started: Optional[float] = None) -> None:
+        """One request. `started` is the scheduled send time in open-loop
+        mode; latency includes any time spent waiting for a free client."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        t0 = started if started is not None else time.perf_counter()
+        try:
+            r = session.post(self.url, json=self._payload(), timeout=self.timeout)
+        except requests.RequestException as e:
+            if rec is not None:
+                rec.fail("timeout" if isinstance(e, requests.Timeout) else type(e).__name__)
+            return
+        dt = time.perf_counter() - t0
+        if rec is None:
+            return
+        if r.status_code >= 400:
+            rec.fail(f"http_{r.status_code}")
+            return
+        try:
+            timings = r.json().get("timings")
+        except ValueError:
+            rec.fail("bad_json")
+            return
+        rec.ok(dt, timings)
+
+
+def closed_loop(target: Target, clients: int, duration: float, warmup: float) -> Dict:
+    rec = Recorder()
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+
+    def client() -> None:
+        while True:
+            now = time.perf_counter()
+            if now >= stop:
+                return
+            target.send(rec if now >= measure_from else None)
+
+    threads = [threading.Thread(target=client, daemon=True) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    # requests still in flight at `stop` finish late but count towards the window
+    return summarise(rec, clients, max(time.perf_counter(), stop) - measure_from)
+
+
+def open_loop(target: Target, rate: float, duration: float, warmup: float,
+              max_in_flight: int = 256) -> Dict:
+    rec = Recorder()
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    measure_from = start + warmup
+    stop = measure_from + duration
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        k = 0
+        while True:
+            due = start + k * interval
+            if due >= stop:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(target.send, rec if due >= measure_from else None, due)
+            k += 1
+    return summarise(rec, rate, time.perf_counter() - measure_from)
+
+
+# ---------------------------------------------------------------------------
+# 3  Sweep & comparison
+# ---------------------------------------------------------------------------
+
+
+def saturation_level(levels: List[Dict]) -> Optional[float]:
+    """The level after which adding load no longer adds SATURATION_GAIN × throughput."""
+    for prev, cur in zip(levels, levels[1:]):
+        if cur["throughput_rps"] < prev["throughput_rps"] * SATURATION_GAIN:
+            return prev["level"]
+    return None
+
+
+def compare(current: Dict, baseline: Dict) -> List[Dict]:
+    base = {lv["level"]: lv for lv in baseline.get("levels", [])}
+    rows = []
+    for lv in current["levels"]:
+        old = base.get(lv["level"])
+        if not old:
+            continue
+        rows.append({
+            "level": lv["level"],
+            "throughput_rps": (old["throughput_rps"], lv["throughput_rps"]),
+            "p95_ms": (old["latency"]["p95_ms"], lv["latency"]["p95_ms"]),
+            "p99_ms": (old["latency"]["p99_ms"], lv["latency"]["p99_ms"]),
+            "error_rate": (old["error_rate"], lv["error_rate"]),
+        })
+    return rows
+
+
+def _fmt(v: Optional[float], spec: str) -> str:
+    return "–" if v is None else format(v, spec)
+
+
+# ---------------------------------------------------------------------------
+# 4  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Load-test the /analyze endpoint.")
+    ap.add_argument("--url", default=os.getenv("API_URL", DEFAULT_URL))
+    ap.add_argument("--mode", choices=("closed", "open"), default="closed")
+    ap.add_argument("--sweep", default=",".join(map(str, DEFAULT_SWEEP)),
+                    help="concurrency levels (closed) or arrival rates in req/s (open)")
+    ap.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="seconds per level")
+    ap.add_argument("--warmup", type=float, default=DEFAULT_WARMUP, help="unmeasured seconds per level")
+    ap.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    ap.add_argument("--tenders", default=BENCH_TENDER, help="tender file to draw request bodies from")
+    ap.add_argument("--output", help="write the JSON report here (default: stdout)")
+    ap.add_argument("--baseline", help="earlier report to compare each level against")
+    args = ap.parse_args(argv)
+
+    levels = [float(x) for x in args.sweep.split(",") if x.strip()]
+    tenders = list(iter_tender_file(args.tenders))
+    if not tenders:
+        print(f"❌ No tenders found in {args.tenders}")
+        return 2
+    target = Target(args.url, tenders, args.timeout)
+    try:
+        requests.get(args.url, timeout=5).raise_for_status()
+    except requests.RequestException as e:
+        print(f"❌ API not reachable at {args.url}:", e)
+        return 2
+
+    results = []
+    for level in levels:
+        print(f"⏱️  {args.mode} loop, {level:g} {'clients' if args.mode == 'closed' else 'req/s'}",
+              file=sys.stderr)
+        if args.mode == "closed":
+            res = closed_loop(target, int(level), args.duration, args.warmup)
+        else:
+            res = open_loop(target, level, args.duration, args.warmup)
+        lat = res["latency"]
+        print(f"   {res['throughput_rps']:.2f} req/s  p50 {_fmt(lat['p50_ms'], '.0f')} ms  "
+              f"p95 {_fmt(lat['p95_ms'], '.0f')} ms  p99 {_fmt(lat['p99_ms'], '.0f')} ms  "
+              f"errors {res['error_rate']:.1%}", file=sys.stderr)
+        results.append(res)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "url": args.url,
+            "mode": args.mode,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "tenders": len(tenders),
+        },
+        "levels": results,
+        "saturation_level": saturation_level(results) if args.mode == "closed" else None,
+    }
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("mode") != args.mode:
+            print(f"⚠️ Baseline was a {baseline.get('meta', {}).get('mode')}-loop run; "
+                  f"levels are not comparable", file=sys.stderr)
+        rows = compare(report, baseline)
+        report["comparison"] = {"baseline": args.baseline, "rows": rows}
+        for r in rows:
+            (t0, t1), (a0, a1) = r["throughput_rps"], r["p95_ms"]
+            print(f"   level {r['level']:g}: {t0:.2f} → {t1:.2f} req/s, "
+                  f"p95 {_fmt(a0, '.0f')} → {_fmt(a1, '.0f')} ms", file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"✅ Report → {args.output}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
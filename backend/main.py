@@ -8,7 +8,7 @@ Tender Analyzer – Singapore GeBIZ version
 • Prints a concise console report.
 
 Requires:
-  pip install python-dotenv google-generativeai
+  pip install python-dotenv google-generativeai numpy
 """
 
 from __future__ import annotations
@@ -16,14 +16,32 @@ from __future__ import annotations
 import os
 import json
 import re
-import statistics
+import time
 import requests
-from dataclasses import dataclass
+import numpy as np
+from dataclasses import dataclass, field
 from typing import List, Dict, Optional
 
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+from simulation import (DEFAULT_COMPETITORS, DEFAULT_COST_RATIO, DEFAULT_SCENARIOS,
+                        simulate_win_probability, win_probability_at)
+from trends import recency_weights, weighted_quantiles
+from awards import GEBIZ_DATASET_ID, GEBIZ_ENDPOINT, categorise
+from sketches import SKETCH_PATH, SketchIndex
+from columnar import AwardColumns
+from analyses import AnalysisStore, config_digest, fingerprint
+from entities import EntityResolver
+from comparables import COMPARABLES_MIN_SCORE, COMPARABLES_TOP_K, score_comparables, select_comparables
+from profiling import PROFILE_DIR, profiled
+from pipeline import Pipeline, Stage, UseFallback
+from deadlines import DeadlineExceeded, deadline, expired, hedged, timeout
+from breakers import CircuitOpen, breaker, check
+from ted_api import get_similar_tenders as search_ted
+from federated import GEBIZ_DEADLINE, TED_DEADLINE, Source, currency_of, federated_search, \
+    from_gebiz, from_ted, merge_rank, to_sgd
+
 # ---------------------------------------------------------------------------
 # 1  Config
 # ---------------------------------------------------------------------------
@@ -33,10 +51,39 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise EnvironmentError("GEMINI_API_KEY env var not set")
 
-genai.configure(api_key=GEMINI_API_KEY)
-
-GEBIZ_DATASET_ID = "d_acde1106003906a75c3fa052592f2fcb"
-GEBIZ_ENDPOINT   = "https://data.gov.sg/api/action/datastore_search"
+# GEMINI_ENDPOINT switches to the REST transport against another host,
+# e.g. the local emulators (emulators.py) for offline load tests
+GEMINI_ENDPOINT = os.getenv("GEMINI_ENDPOINT")
+if GEMINI_ENDPOINT:
+    genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                    client_options={"api_endpoint": GEMINI_ENDPOINT})
+else:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+TED_SEARCH = os.getenv("TED_SEARCH", "1") == "1"     # also look for EU comparables
+ANALYSIS_BUDGET = float(os.getenv("ANALYSIS_BUDGET", "30"))   # seconds per analysis, 0 = none
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "25"))
+TED_KEYWORDS = 3                                      # TED queries per tender
+CROSS_MARKET_LIMIT = 20                               # merged GeBIZ + TED comparables kept
+# a re-analysis keeps the previous LLM bid range while the comparables'
+# bid-to-estimate quartiles are within this (ratio points) of those the
+# range was generated from
+REANALYSE_TOLERANCE = float(os.getenv("REANALYSE_TOLERANCE", "0.02"))
+_DRIFT_KEYS = ("p25_ratio", "median_ratio", "p75_ratio")
+
+# Per-call overrides accepted by analyse_tender(..., **options), with defaults
+ANALYSIS_OPTIONS = {
+    "budget": ANALYSIS_BUDGET,
+    "search_limit": 20,
+    "ted": TED_SEARCH,
+    "gebiz_deadline": GEBIZ_DEADLINE,
+    "ted_deadline": TED_DEADLINE,
+    "top_k": COMPARABLES_TOP_K,
+    "min_score": COMPARABLES_MIN_SCORE,
+    "competitors": DEFAULT_COMPETITORS,
+    "scenarios": DEFAULT_SCENARIOS,
+    "cost_ratio": DEFAULT_COST_RATIO,
+}
 
 # ---------------------------------------------------------------------------
 # 2  Dataclass to hold the full result
@@ -49,6 +96,14 @@ class TenderAnalysis:
     similar_tenders: List[Dict]
     pricing_analysis: Dict
     bid_recommendation: Dict
+    timings: Dict[str, float] = field(default_factory=dict)   # stage → seconds
+    ted_tenders: List[Dict] = field(default_factory=list)
+    cached_stages: List[str] = field(default_factory=list)    # served from the stage memo
+    cross_market: List[Dict] = field(default_factory=list)    # GeBIZ + TED, merge-ranked
+    sources: Dict[str, Dict] = field(default_factory=dict)    # per-source search status
+    degraded: List[str] = field(default_factory=list)         # parts answered by a fallback
+    fingerprint: Optional[str] = None                         # tender id in the analysis store
+    stored: bool = False                                      # served from the analysis store
 
 
 # ---------------------------------------------------------------------------
@@ -59,8 +114,26 @@ class TenderAnalysis:
 class TenderAnalyzer:
     _GEMINI_MODEL = "gemini-2.5-flash"
 
-    def __init__(self) -> None:
+    def __init__(self, sketches: Optional[SketchIndex] = None,
+                 columns: Optional[AwardColumns] = None,
+                 store: Optional[AnalysisStore] = None,
+                 entities: Optional[EntityResolver] = None) -> None:
         self.model = genai.GenerativeModel(model_name=self._GEMINI_MODEL)
+        # dataset-wide price distributions (see sketches.py); the API passes
+        # its live index, the CLI reads the last saved one
+        if sketches is None and os.path.exists(SKETCH_PATH):
+            sketches = SketchIndex.load(SKETCH_PATH)
+        self.sketches = sketches
+        # with the memory-mapped award columns (see columnar.py) the market
+        # position uses exact quantiles instead of the sketches' estimates
+        self.columns = columns
+        # finished analyses are saved there and served again until new
+        # awards arrive (see analyses.py)
+        self.store = store
+        # cross-market winners (GeBIZ and TED) get canonical supplier ids
+        # from it, so one company's spellings read as one competitor
+        self.entities = entities
+        self.pipeline = self._build_pipeline()
 
     # ................................................................. utils
 
@@ -153,23 +226,37 @@ class TenderAnalyzer:
         Return ONLY a valid JSON list.
         """
         try:
-            r = self.model.generate_content(prompt)
+            r = self._generate(prompt)
             text = self._clean_json_response(r.text.strip())
             kws  = json.loads(text)
             return kws[:12] if isinstance(kws, list) else []
+        except CircuitOpen:
+            raise                   # the pipeline falls back (and marks the run degraded)
         except Exception as e:
+            if expired():
+                raise DeadlineExceeded("keyword extraction ran out of time") from e
             print("⚠️ Gemini keyword error:", e)
-            return self._extract_basic_keywords(f"{title} {desc}")
+            raise UseFallback("keyword extraction failed") from e
+
+    def _generate(self, prompt: str):
+        """One Gemini call, through the LLM circuit breaker."""
+        return breaker("llm").call(self.model.generate_content, prompt,
+                                   request_options={"timeout": timeout(LLM_TIMEOUT)})
 
     # ............................................................ GeBIZ API
 
     def search_similar_tenders(self, keywords: List[str], limit: int = 20) -> List[Dict]:
         results, seen = [], set()
+        answered, error = False, None
         for kw in keywords:
+            if expired():
+                print(f"⚠️ GeBIZ search out of time after {len(results)} awards")
+                break
             params = {"resource_id": GEBIZ_DATASET_ID, "q": kw, "limit": min(20, limit)}
             try:
-                r = requests.get(GEBIZ_ENDPOINT, params=params, timeout=20)
+                r = breaker("gebiz").call(self._gebiz_get, params)
                 r.raise_for_status()
+                answered = True
                 for rec in r.json()["result"]["records"]:
                     tid = rec.get("tender_no") or rec.get("ref_no")
                     if tid and tid not in seen:
@@ -177,19 +264,37 @@ class TenderAnalyzer:
                         results.append(rec)
                         if len(results) >= limit:
                             return results
+            except CircuitOpen:
+                if not results:
+                    raise           # the caller answers from the local mirror
+                print(f"⚠️ GeBIZ circuit open; keeping the {len(results)} awards found so far")
+                break
             except Exception as e:
                 print(f"⚠️ GeBIZ error for '{kw}':", e)
+                error = e
+        if error is not None and not answered:
+            raise error             # GeBIZ is down, not merely without matches
         return results
 
+    @staticmethod
+    def _gebiz_get(params: Dict) -> requests.Response:
+        return check(hedged("gebiz", requests.get, GEBIZ_ENDPOINT, params=params, timeout=timeout(20)))
+
 
     # ....................................................... pricing stats
 
-    def analyse_pricing(self, awards: List[Dict], est_value: str) -> Dict:
+    def analyse_pricing(self, awards: List[Dict], est_value: str,
+                        keywords: Optional[List[str]] = None, context: str = "",
+                        top_k: Optional[int] = COMPARABLES_TOP_K,
+                        min_score: float = COMPARABLES_MIN_SCORE) -> Dict:
         out = {
             "total": len(awards),
             "with_price": 0,
             "awards": [],
             "ratios": [],
+            "award_dates": [],
+            "weights": [],
+            "comparables": [],
             "stats": {},
             "target_estimate": est_value
         }
@@ -199,32 +304,96 @@ class TenderAnalyzer:
             print("❌ Invalid estimated value provided.")
             return out
 
+        valid = []
         for idx, a in enumerate(awards):
             raw_amt = a.get("awarded_amt")
             val = self._extract_numeric_value(raw_amt)
             if val is not None and val >= 1000:
                 print(f"✅ Valid award #{idx+1}: {val}")
-                out["awards"].append(val)
-                out["ratios"].append(val / est)
+                valid.append((a, val))
                 out["with_price"] += 1
             else:
                 print(f"⚠️ Skipped award #{idx+1}: {raw_amt}")
 
-        print(f"✅ Found {len(out['awards'])} usable pricing values out of {len(awards)} tenders.")
-
-        if len(out["awards"]) >= 1:
-            out["stats"] = {
-                "avg_awarded": statistics.mean(out["awards"]),
-                "avg_ratio": statistics.mean(out["ratios"]),
-                "min_ratio": min(out["ratios"]),
-                "max_ratio": max(out["ratios"]),
-            }
-            print("✅ Statistics calculated successfully:", out["stats"])
-        else:
+        print(f"✅ Found {len(valid)} usable pricing values out of {len(awards)} tenders.")
+        if not valid:
             print("❌ Not enough valid data points to compute statistics.")
+            return out
 
-        return out                                                                                                                                                        
+        # Score every priced award as a comparable, keep the relevant ones
+        recs = [a for a, _ in valid]
+        sig = score_comparables(
+            [a.get("tender_description") or a.get("description") or "" for a in recs],
+            [v for _, v in valid],
+            [a.get("award_date") for a in recs],
+            est,
+            list(keywords or []) + ([context] if context else []),
+        )
+        chosen = select_comparables(sig["score"], top_k, min_score)
+        for i in chosen:
+            a, val = valid[i]
+            out["awards"].append(val)
+            out["ratios"].append(val / est)
+            out["award_dates"].append(a.get("award_date"))
+            out["weights"].append(float(sig["score"][i]))
+            out["comparables"].append({
+                "tender_no": a.get("tender_no") or a.get("ref_no"),
+                "amount": val,
+                "ratio": val / est,
+                "score": float(sig["score"][i]),
+                "text": float(sig["text"][i]),
+                "value": float(sig["value"][i]),
+                "recency": float(sig["recency"][i]),
+            })
+        print(f"✅ Using {len(chosen)} comparables (of {len(valid)}) after relevance scoring.")
+
+        w = np.asarray(out["weights"])
+        ratios = np.asarray(out["ratios"])
+        p25, p50, p75 = weighted_quantiles(ratios, w, [0.25, 0.5, 0.75])
+        out["stats"] = {
+            "avg_awarded": float(np.average(out["awards"], weights=w)),
+            "avg_ratio": float(np.average(ratios, weights=w)),
+            "min_ratio": float(ratios.min()),
+            "max_ratio": float(ratios.max()),
+            "p25_ratio": float(p25),
+            "median_ratio": float(p50),
+            "p75_ratio": float(p75),
+            "comparables": len(chosen),
+            "excluded": len(valid) - len(chosen),
+        }
+        # recent awards say more about today's prices than old ones
+        rw = recency_weights(out["award_dates"]) * w
+        out["stats"]["recency_avg_ratio"] = float((ratios * rw).sum() / rw.sum())
+        out["stats"]["recency_median_ratio"] = float(weighted_quantiles(ratios, rw, [0.5])[0])
+        print("✅ Statistics calculated successfully:", out["stats"])
+        return out
+
+
+    MARKET_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def market_position(self, title: str, desc: str, est_value: str) -> Dict:
+        """Where our estimate sits among all awards of the tender's category,
+        from the award columns or the streaming sketches (no rescans of the
+        award history)."""
+        source = self.columns if self.columns is not None and len(self.columns) else self.sketches
+        if source is None:
+            return {}
+        category = categorise(f"{title} {desc}")
+        dim, key = ("category", category)
+        market = source.quantiles(self.MARKET_QUANTILES, dim, key)
+        if not market["count"]:
+            dim, key = ("all", "")
+            market = source.quantiles(self.MARKET_QUANTILES, dim, key)
+            if not market["count"]:
+                return {}
+        est = self._extract_numeric_value(est_value)
+        return {"category": category if dim == "category" else "all", **market,
+                "estimate_percentile": source.percentile(est, dim, key) if est else None}
 
+    def _market_version(self):
+        """How much award data the market position has seen (memo key)."""
+        return (self.columns.count if self.columns is not None else None,
+                self.sketches.consumed if self.sketches else None)
 
     # ........................................................ bid strategy
 
@@ -243,9 +412,11 @@ class TenderAnalyzer:
         - Total analyzed awards: {pricing['total']}
         - Awards with valid pricing: {pricing['with_price']}
         - Average awarded amount: SGD {p['avg_awarded']:.2f}
-        - Average bid-to-estimate ratio: {p['avg_ratio']:.2%}
+        - Comparables used: {p['comparables']} (weighted by text match, value band and recency; {p['excluded']} weak matches excluded)
+        - Relevance-weighted bid-to-estimate ratio: mean {p['avg_ratio']:.2%}, quartiles {p['p25_ratio']:.2%} / {p['median_ratio']:.2%} / {p['p75_ratio']:.2%}
         - Minimum ratio: {p['min_ratio']:.2%}, Maximum ratio: {p['max_ratio']:.2%}
-
+        - Recency-weighted ratio (1-year half-life): mean {p['recency_avg_ratio']:.2%}, median {p['recency_median_ratio']:.2%}
+        {self._simulation_summary(pricing.get("simulation"))}
         Provide ONLY a JSON response in this format:
         {{
           "bid_range_min_sgd": number,
@@ -258,24 +429,144 @@ class TenderAnalyzer:
         }}
         """
         try:
-            response = self.model.generate_content(prompt)
+            response = self._generate(prompt)
             data = json.loads(self._clean_json_object(response.text.strip()))
             return data
+        except CircuitOpen:
+            raise                   # the pipeline falls back to the statistical range
         except Exception as e:
+            if expired():
+                raise DeadlineExceeded("bid range ran out of time") from e
             return {"error": str(e)}
 
 
+    @staticmethod
+    def _simulation_summary(sim: Optional[Dict]) -> str:
+        if not sim:
+            return ""
+        points = ", ".join(f"{r:.0%} → {win_probability_at(sim, r):.0%}"
+                           for r in (0.8, 0.9, 1.0, 1.1))
+        return (
+            f"\n        SIMULATED WIN PROBABILITY ({sim['scenarios']:,} scenarios, "
+            f"{sim['competitors']} rivals, lowest price wins):\n"
+            f"        - Bid as % of estimate → P(win): {points}\n"
+            f"        - Best expected-margin bid: {sim['best_bid_ratio']:.0%} of estimate "
+            f"(P(win) {sim['win_probability_at_best']:.0%}, assuming cost at "
+            f"{sim['cost_ratio']:.0%} of estimate)\n"
+        )
+
     # .................................................... orchestration
 
-    def analyse_tender(self, title: str, desc: str, est_val: str) -> TenderAnalysis:
-        print("🔍 Extracting keywords")
-        kws = self.extract_keywords(desc, title)
-        print("🔍 Searching GeBIZ")
-        similar = self.search_similar_tenders(kws)
-        print("🔍 Analysing pricing")
-        pricing = self.analyse_pricing(similar, est_val)
+    def _build_pipeline(self) -> Pipeline:
+        """The analysis as a stage graph. Searches, the market lookup and
+        the LLM calls are the slow parts; the graph lets the independent
+        ones overlap and the memo skips any whose inputs are unchanged."""
+        # fallbacks answer from local data once the request budget is spent
+        return Pipeline([
+            Stage("keywords", self.extract_keywords, ("description", "title"), "keywords",
+                  fallback=lambda desc, title: self._extract_basic_keywords(f"{title} {desc}")),
+            # partial results (a source past its deadline) are not memoised
+            Stage("search", self._federated_search, ("keywords",), "search",
+                  config=lambda o: {"limit": o["search_limit"], "ted": o["ted"],
+                                    "gebiz_deadline": o["gebiz_deadline"],
+                                    "ted_deadline": o["ted_deadline"]},
+                  keep=lambda r: r["complete"], fallback=self._local_search),
+            Stage("cross_market", self._cross_market, ("search", "estimate", "keywords"),
+                  "cross_market"),
+            Stage("pricing", self._price_gebiz, ("search", "estimate", "keywords", "title"),
+                  "pricing", config=lambda o: {"top_k": o["top_k"], "min_score": o["min_score"]}),
+            Stage("market", self.market_position, ("title", "description", "estimate"), "market",
+                  version=self._market_version),
+            Stage("simulation", self._simulate, ("pricing", "estimate"), "simulation",
+                  config=lambda o: {"competitors": o["competitors"], "scenarios": o["scenarios"],
+                                    "cost_ratio": o["cost_ratio"]},
+                  fallback=lambda *args, **params: {}),
+            Stage("bid_range", self._bid_range,
+                  ("pricing", "market", "simulation", "title", "description", "estimate"),
+                  "strategy", fallback=self._statistical_bid_range,
+                  keep=lambda s: "error" not in s,
+                  # only re-analyses pass `previous`; other memo keys are unchanged
+                  config=lambda o: {"previous": o["previous"]} if o.get("previous") else {}),
+        ])
+
+    def _federated_search(self, keywords: List[str], limit: int, ted: bool = TED_SEARCH,
+                          gebiz_deadline: float = GEBIZ_DEADLINE,
+                          ted_deadline: float = TED_DEADLINE) -> Dict:
+        """GeBIZ and (optionally) TED at once, each within its deadline."""
+        sources = [Source("gebiz", self.search_similar_tenders, from_gebiz, gebiz_deadline)]
+        if ted:
+            sources.append(Source("ted", self._search_ted, from_ted, ted_deadline))
+        print(f"🔍 Searching {' + '.join(s.name for s in sources)}")
+        out = federated_search(sources, keywords, limit)
+        if out["sources"]["gebiz"]["status"] != "ok" and self.columns is not None:
+            local = self._local_awards(keywords, limit)
+            out["raw"]["gebiz"] = local
+            out["records"].extend(from_gebiz(r).to_dict() for r in local)
+            out["sources"]["gebiz"]["fallback"] = f"local ({len(local)} awards)"
+        return out
+
+    def _local_awards(self, keywords: List[str], limit: int) -> List[Dict]:
+        """Awards from the local column store matching the keywords, as
+        GeBIZ-shaped records (no tender numbers: the store does not keep them)."""
+        if self.columns is None:
+            return []
+        rows = [self.columns.row(i) for i in self.columns.search(keywords, limit)]
+        return [{"tender_no": None, "tender_description": r["description"], "agency": r["agency"],
+                 "supplier_name": r["supplier"], "awarded_amt": r["amount"],
+                 "award_date": r["award_date"], "mirror": "local"} for r in rows]
+
+    def _local_search(self, keywords: List[str], limit: int, ted: bool = TED_SEARCH,
+                      **_deadlines) -> Dict:
+        """The search stage's shape, answered from the local store only."""
+        local = self._local_awards(keywords, limit)
+        sources = {"gebiz": {"status": "skipped", "count": 0, "fallback": f"local ({len(local)} awards)"}}
+        if ted:
+            sources["ted"] = {"status": "skipped", "count": 0}
+        return {"raw": {"gebiz": local, "ted": []}, "sources": sources, "complete": False,
+                "records": [from_gebiz(r).to_dict() for r in local]}
+
+    def _cross_market(self, search: Dict, est_val: str, keywords: List[str]) -> List[Dict]:
+        est = self._extract_numeric_value(est_val)
+        ranked = merge_rank(search["records"], to_sgd(est, currency_of(est_val)), keywords,
+                            CROSS_MARKET_LIMIT)
+        if self.entities is not None:
+            for source in {r["source"] for r in ranked}:
+                rows = [r for r in ranked if r["source"] == source]
+                ids = self.entities.resolve_many([r["supplier"] for r in rows], source)
+                for r, eid in zip(rows, ids):
+                    r["supplier_id"] = eid
+        return ranked
+
+    def _price_gebiz(self, search: Dict, est_val: str, keywords: List[str], title: str,
+                     **params) -> Dict:
+        # the SGD ratios stay GeBIZ-only; TED shows up in the cross-market list
+        return self.analyse_pricing(search["raw"]["gebiz"], est_val, keywords, title, **params)
+
+    def _search_ted(self, keywords: List[str], limit: int = 20) -> List[Dict]:
+        results, seen = [], set()
+        for kw in keywords[:TED_KEYWORDS]:
+            for n in search_ted(kw, limit=min(20, limit)):
+                pid = n.get("publication-number")
+                if pid not in seen:
+                    seen.add(pid)
+                    results.append(n)
+        return results
+
+    def _simulate(self, pricing: Dict, est_val: str, **params) -> Dict:
+        if not pricing["ratios"]:
+            return {}
+        print("🔍 Simulating win probability")
+        return simulate_win_probability(pricing["ratios"], self._extract_numeric_value(est_val),
+                                        weights=pricing["weights"], **params)
+
+    def _bid_range(self, pricing: Dict, market: Dict, simulation: Dict,
+                   title: str, desc: str, est_val: str, previous: Optional[Dict] = None) -> Dict:
+        if previous and self._ratio_drift(previous["stats"], pricing.get("stats")) <= previous["tolerance"]:
+            print("✅ Pricing within tolerance of the stored bid range's basis; keeping it")
+            return {**previous["strategy"], "reused": True}
+        pricing = {**pricing, "market": market, **({"simulation": simulation} if simulation else {})}
         ctx = f"Title: {title}\nDescription: {desc}\nOur estimate: {est_val}"
-        print("🔍 Requesting bid range from Gemini")
+        print("🔍 Requesting bid range from Gemini")
         strategy = self.generate_bid_range(pricing, ctx)
 
         # convert range to SGD values if present
@@ -286,8 +577,104 @@ class TenderAnalyzer:
         if est_num and all(strategy[k] for k in ("bid_range_min_pct", "bid_range_max_pct")):
             strategy["bid_range_min_amt"] = est_num * strategy["bid_range_min_pct"]
             strategy["bid_range_max_amt"] = est_num * strategy["bid_range_max_pct"]
+        # the quartiles this range was written for; re-analyses measure drift
+        # against these, so small moves on every sync cannot add up unchecked
+        stats = pricing.get("stats")
+        strategy["basis_stats"] = {k: stats[k] for k in _DRIFT_KEYS} if stats else None
+        return strategy
 
-        return TenderAnalysis(kws, similar, pricing, strategy)
+    @staticmethod
+    def _ratio_drift(old: Optional[Dict], new: Optional[Dict]) -> float:
+        """Largest move of the comparables' bid-to-estimate quartiles."""
+        if not old or not new:
+            return 0.0 if not old and not new else float("inf")
+        return max(abs(new[k] - old[k]) for k in _DRIFT_KEYS)
+
+    def _statistical_bid_range(self, pricing: Dict, market: Dict, simulation: Dict,
+                               title: str, desc: str, est_val: str, **_previous) -> Dict:
+        """Bid range without the LLM: the comparables' interquartile ratio range."""
+        p = pricing.get("stats")
+        if not p:
+            return {"error": "Too little pricing data", "degraded": True}
+        strategy = {"bid_range_min_pct": p["p25_ratio"], "bid_range_max_pct": p["p75_ratio"],
+                    "risk_level": "Medium", "confidence_level": "Low", "reasoning": None,
+                    "degraded": True}
+        est_num = self._extract_numeric_value(est_val)
+        if est_num:
+            strategy["bid_range_min_amt"] = est_num * strategy["bid_range_min_pct"]
+            strategy["bid_range_max_amt"] = est_num * strategy["bid_range_max_pct"]
+        return strategy
+
+    def data_version(self) -> int:
+        """Awards the local indexes have taken in; stored analyses are tied to it."""
+        if self.columns is not None:
+            self.columns.refresh()          # a sync in another process moves it on
+            return self.columns.count
+        return self.sketches.consumed if self.sketches else 0
+
+    def analyse_tender(self, title: str, desc: str, est_val: str, refresh: bool = False,
+                       previous: Optional[Dict] = None, tolerance: float = REANALYSE_TOLERANCE,
+                       **options) -> TenderAnalysis:
+        """Run the stage graph. `options` override ANALYSIS_OPTIONS for this
+        call; only the stages they feed (and those downstream) recompute.
+        The whole run, outbound calls included, shares the `budget`; past it
+        the remaining stages answer from local data and the result lists
+        them in `degraded`. With a store, a complete analysis of the same
+        tender, options and award data is returned as is unless `refresh`.
+        `previous` (a stored result) makes this a re-analysis: its LLM bid
+        range is kept if the pricing quartiles moved less than `tolerance`."""
+        unknown = set(options) - set(ANALYSIS_OPTIONS)
+        if unknown:
+            raise ValueError(f"Unknown analysis options: {', '.join(sorted(unknown))}")
+        opts = {**ANALYSIS_OPTIONS, **options}
+        fp, config = fingerprint(title, desc, est_val), config_digest(opts, self._GEMINI_MODEL)
+        version = self.data_version()
+        if self.store is not None and not refresh:
+            hit = self.store.get(fp, config, version)
+            if hit:
+                print(f"✅ Stored analysis {fp[:12]} (award data v{version})")
+                return TenderAnalysis(**{**hit["result"], "stored": True})
+        start = time.perf_counter()
+        print("🔍 Running analysis stages")
+        inputs = {"title": title, "description": desc, "estimate": est_val}
+        if previous is not None and previous.get("keywords"):
+            # same search terms, so the dependencies the store tracks still hold
+            inputs["keywords"] = previous["keywords"]
+        with deadline(opts["budget"]):
+            run = self.pipeline.run(inputs, {**opts, "previous": self._reusable(previous, tolerance)})
+        v = run.values
+        pricing = {**v["pricing"], "market": v["market"]}
+        if v["simulation"]:
+            pricing["simulation"] = v["simulation"]
+        timings = {**run.timings, "total": time.perf_counter() - start}
+        search = v["search"]
+        degraded = list(run.degraded) + [f"{name}_search" for name, s in search["sources"].items()
+                                         if s["status"] != "ok" and "search" not in run.degraded]
+        if ("error" in v["strategy"] or v["strategy"].get("degraded")) and "bid_range" not in degraded:
+            degraded.append("bid_range")
+        if degraded:
+            print("⚠️ Degraded result, answered locally:", ", ".join(degraded))
+        analysis = TenderAnalysis(v["keywords"], search["raw"]["gebiz"], pricing, v["strategy"],
+                                  timings, search["raw"].get("ted", []), run.cached,
+                                  v["cross_market"], search["sources"], degraded, fp)
+        if self.store is not None:
+            self.store.save(fp, config, version, title, desc, est_val, analysis, opts)
+        return analysis
+
+    @staticmethod
+    def _reusable(previous: Optional[Dict], tolerance: float) -> Optional[Dict]:
+        """What the bid-range stage needs to keep a stored LLM bid range:
+        the range and the pricing quartiles it was generated from."""
+        strategy = (previous or {}).get("bid_recommendation") or {}
+        if not strategy or "error" in strategy or strategy.get("degraded"):
+            return None
+        if "basis_stats" in strategy:
+            basis = strategy["basis_stats"]
+        elif strategy.get("reused"):
+            return None             # stored before ranges kept their basis; it is unknown
+        else:
+            basis = previous["pricing_analysis"].get("stats")
+        return {"stats": basis, "strategy": strategy, "tolerance": tolerance}
 
     # ...................................................... pretty‑printer
 
@@ -305,11 +692,37 @@ class TenderAnalyzer:
             desc  = (rec.get("tender_description") or rec.get("description") or "").replace("\n", " ")
             print(f"  • {tno}  |  {price}  |  {desc[:75]}…")
 
+        if a.cross_market:
+            print(f"\n🌐 CROSS-MARKET COMPARABLES ({len(a.cross_market)}) – showing first 5")
+            for c in a.cross_market[:5]:
+                print(f"  • {c['source'].upper():5} {c['ref']}  |  {self._fmt_sgd(c['amount_sgd'])}"
+                      f"  |  {c['title'][:60]}…")
+        if missing := [n for n, s in a.sources.items() if s["status"] != "ok"]:
+            print("  ⚠️ Partial results, no reply in time from:", ", ".join(missing))
+
         if stats := a.pricing_analysis.get("stats"):
             print("\n💰 HISTORICAL PRICING")
             print("  Avg award :", self._fmt_sgd(stats['avg_awarded']))
             print("  Avg ratio :", f"{stats['avg_ratio']:.2%}")
+            print("  Quartiles :", f"{stats['p25_ratio']:.2%} / {stats['median_ratio']:.2%} / "
+                  f"{stats['p75_ratio']:.2%} ({stats['comparables']} comparables, relevance-weighted)")
             print("  Min–Max   :", f"{stats['min_ratio']:.2%} – {stats['max_ratio']:.2%}")
+            print("  Recent    :", f"{stats['recency_avg_ratio']:.2%} (recency-weighted)")
+
+        if market := a.pricing_analysis.get("market"):
+            q = market["quantiles"]
+            print(f"\n📈 MARKET PRICES ({market['category']}, {market['count']:,} awards)")
+            print("  P10 / P50 / P90 :", " / ".join(self._fmt_sgd(q[p]) for p in ("p10", "p50", "p90")))
+            print("  P25 – P75       :", f"{self._fmt_sgd(q['p25'])} – {self._fmt_sgd(q['p75'])}")
+            if market.get("estimate_percentile") is not None:
+                print(f"  Our estimate    : P{market['estimate_percentile']:.0f}")
+
+        if sim := a.pricing_analysis.get("simulation"):
+            print("\n🎲 WIN PROBABILITY (simulated)")
+            for r in (0.8, 0.9, 1.0, 1.1):
+                print(f"  Bid {r:.0%} of est. : {win_probability_at(sim, r):.0%}")
+            print(f"  Best margin bid : {sim['best_bid_ratio']:.0%} "
+                  f"(P(win) {sim['win_probability_at_best']:.0%})")
 
         print("\n🎯 BID RANGE RECOMMENDATION")
         s = a.bid_recommendation
@@ -356,7 +769,7 @@ class TenderAnalyzer:
 
 
 def main() -> None:
-    ta = TenderAnalyzer()
+    ta = TenderAnalyzer(store=AnalysisStore())
 
     tender_file = "data/sampple.txt"   # change to your file
     if os.path.exists(tender_file):
@@ -372,8 +785,12 @@ def main() -> None:
         }
         print("⚠️ Using hard‑coded sample tender")
 
-    analysis = ta.analyse_tender(t["title"], t["description"], t["estimated_value"])
+    # PROFILE_SAMPLE_RATE=1 profiles this run (see profiling.py)
+    analyse = profiled("analyse_tender")(ta.analyse_tender)
+    analysis = analyse(t["title"], t["description"], t["estimated_value"])
     ta.print_report(analysis)
+    if analyse.last_profile:
+        print(f"🔬 Profile → {os.path.join(PROFILE_DIR, analyse.last_profile)}.txt")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Tender offer optimiser
+----------------------
+• Scores TenderOffers against the eight TenderCriteria weights in a single
+  NumPy pass (offer matrix × weight vector).
+• Top-k selection via partial sort (argpartition), so ranking tens of
+  thousands of offers never sorts the whole pool.
+• Budget-constrained portfolio selection as a 0/1 knapsack over a bucketed
+  budget, with an optional average-risk cap enforced by Lagrangian
+  relaxation (bisection on a risk penalty).
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# TenderCriteria key → TenderOffer field, in matrix column order
+CRITERIA = (
+    ("costWeight", "totalCost"),
+    ("qualityWeight", "qualityScore"),
+    ("deliveryWeight", "deliveryTime"),
+    ("reliabilityWeight", "reliabilityScore"),
+    ("technicalWeight", "technicalScore"),
+    ("financialWeight", "financialStability"),
+    ("performanceWeight", "pastPerformance"),
+    ("riskWeight", "riskLevel"),
+)
+DEFAULT_WEIGHTS = {"costWeight": 30, "qualityWeight": 25, "deliveryWeight": 15,
+                   "reliabilityWeight": 10, "technicalWeight": 10, "financialWeight": 5,
+                   "performanceWeight": 3, "riskWeight": 2}
+
+RISK_SCORE  = {"low": 1.0, "medium": 0.5, "high": 0.0}   # higher is better
+RISK_POINTS = {"low": 1.0, "medium": 2.0, "high": 3.0}   # as shown in the UI's riskScore
+
+BUDGET_BUCKETS = 1000
+LAMBDA_ITERATIONS = 8
+
+# ---------------------------------------------------------------------------
+# 1  Offer matrix & scoring
+# ---------------------------------------------------------------------------
+
+
+def _minmax_lower_better(x: np.ndarray) -> np.ndarray:
+    lo, hi = x.min(), x.max()
+    if hi <= lo:
+        return np.ones_like(x)
+    return (hi - x) / (hi - lo)
+
+
+def offer_matrix(offers: Sequence[Dict]) -> np.ndarray:
+    """n × 8 matrix of criteria scores in [0, 1], higher is better."""
+    n = len(offers)
+    raw = np.empty((n, len(CRITERIA)), dtype=np.float64)
+    for i, o in enumerate(offers):
+        raw[i, 0] = float(o.get("totalCost") or 0)
+        raw[i, 1] = float(o.get("qualityScore") or 0)
+        raw[i, 2] = float(o.get("deliveryTime") or 0)
+        raw[i, 3] = float(o.get("reliabilityScore") or 0)
+        raw[i, 4] = float(o.get("technicalScore") or 0)
+        raw[i, 5] = float(o.get("financialStability") or 0)
+        raw[i, 6] = float(o.get("pastPerformance") or 0)
+        raw[i, 7] = RISK_SCORE.get(str(o.get("riskLevel", "medium")).lower(), 0.5)
+    return normalise_matrix(raw)
+
+
+def normalise_matrix(raw: np.ndarray) -> np.ndarray:
+    """Scale raw criteria columns (cost, quality, delivery, …, risk) to [0, 1]."""
+    X = np.empty_like(raw, dtype=np.float64)
+    if not len(raw):
+        return X
+    X[:, 0] = _minmax_lower_better(raw[:, 0])
+    X[:, 2] = _minmax_lower_better(raw[:, 2])
+    for col in (1, 3, 4, 5, 6):
+        X[:, col] = np.clip(raw[:, col] / 10.0, 0.0, 1.0)
+    X[:, 7] = raw[:, 7]
+    return X
+
+
+def weight_vector(criteria: Optional[Dict] = None) -> np.ndarray:
+    c = {**DEFAULT_WEIGHTS, **(criteria or {})}
+    w = np.array([max(0.0, float(c[k])) for k, _ in CRITERIA], dtype=np.float64)
+    total = w.sum()
+    return w / total if total > 0 else np.full(len(CRITERIA), 1.0 / len(CRITERIA))
+
+
+def score_offers(X: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Weighted score 0–100 per offer."""
+    return (X @ w) * 100.0
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k best scores, best first, without a full sort."""
+    n = len(scores)
+    k = max(0, min(k, n))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+# ---------------------------------------------------------------------------
+# 2  Constrained portfolio selection
+# ---------------------------------------------------------------------------
+
+
+def _knapsack(values: np.ndarray, weights: np.ndarray, capacity: int) -> np.ndarray:
+    """0/1 knapsack on integer weights; returns a boolean selection mask.
+
+    The DP row is updated with one vectorised shift per item, and the take
+    decisions are kept as a bit matrix for the backtrack.
+    """
+    # At most capacity // w items of weight w can ever fit, so only the best
+    # that many per distinct weight can appear in an optimum - drop the rest
+    cand_idx = np.flatnonzero((values > 0) & (weights <= capacity))
+    order = cand_idx[np.lexsort((-values[cand_idx], weights[cand_idx]))]
+    w_sorted = weights[order]
+    group_start = np.r_[0, np.flatnonzero(np.diff(w_sorted)) + 1]
+    first = np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+    keep = order[(np.arange(len(order)) - first) < capacity // np.maximum(w_sorted, 1)]
+
+    n = len(values)
+    best = np.zeros(capacity + 1, dtype=np.float64)
+    take = np.zeros((len(keep), capacity + 1), dtype=bool)
+    for j, i in enumerate(keep):
+        wi, vi = int(weights[i]), values[i]
+        cand = best[:capacity + 1 - wi] + vi
+        better = cand > best[wi:]
+        take[j, wi:] = better
+        best[wi:] = np.where(better, cand, best[wi:])
+    mask = np.zeros(n, dtype=bool)
+    c = capacity
+    for j in range(len(keep) - 1, -1, -1):
+        if take[j, c]:
+            i = keep[j]
+            mask[i] = True
+            c -= int(weights[i])
+    return mask
+
+
+def select_portfolio(costs: np.ndarray, scores: np.ndarray, risks: np.ndarray,
+                     budget: float, max_avg_risk: Optional[float] = None,
+                     buckets: int = BUDGET_BUCKETS) -> np.ndarray:
+    """Pick the subset maximising total score with Σcost ≤ budget and, if
+    given, mean risk points ≤ max_avg_risk. Returns selected indices.
+
+    Costs are rounded *up* into `buckets` budget units, so any returned
+    selection is feasible at the cost of slight conservatism.
+    """
+    eligible = np.flatnonzero((costs <= budget) & (scores > 0))
+    if not len(eligible) or budget <= 0:
+        return np.empty(0, dtype=np.int64)
+    unit = budget / buckets
+    w = np.maximum(1, np.ceil(costs[eligible] / unit)).astype(np.int64)
+    v = scores[eligible]
+    r = risks[eligible]
+
+    def solve(lam: float) -> np.ndarray:
+        # mean risk ≤ cap  ⇔  Σ (risk_i − cap) ≤ 0, penalised by λ
+        excess = r - (max_avg_risk if max_avg_risk is not None else 0.0)
+        return _knapsack(v - lam * excess if lam else v, w, buckets)
+
+    mask = solve(0.0)
+    if max_avg_risk is not None and mask.any() and r[mask].mean() > max_avg_risk:
+        lo, hi = 0.0, float(v.max()) * 2
+        feasible = None
+        for _ in range(LAMBDA_ITERATIONS):
+            lam = (lo + hi) / 2
+            m = solve(lam)
+            if m.any() and r[m].mean() <= max_avg_risk:
+                feasible, hi = m, lam
+            else:
+                lo = lam
+        if feasible is None:
+            # fall back to the single best offer that meets the cap on its own
+            ok = np.flatnonzero(r <= max_avg_risk)
+            feasible = np.zeros(len(v), dtype=bool)
+            if len(ok):
+                feasible[ok[np.argmax(v[ok])]] = True
+        mask = feasible
+    sel = eligible[mask]
+    return sel[np.argsort(-scores[sel], kind="stable")]
+
+
+# ---------------------------------------------------------------------------
+# 3  Entry point used by the API
+# ---------------------------------------------------------------------------
+
+
+def optimise(offers: List[Dict], criteria: Optional[Dict] = None, k: int = 3,
+             budget: Optional[float] = None, max_avg_risk: Optional[float] = None,
+             max_risk_level: Optional[str] = None) -> Dict:
+    """Score all offers and select either the top k or, when a budget is
+    given, the best budget/risk-feasible portfolio. Result mirrors the
+    frontend's OptimizationResult."""
+    if not offers:
+        return {"selectedTenders": [], "totalCost": 0, "averageQuality": 0,
+                "averageDeliveryTime": 0, "riskScore": 0, "overallScore": 0, "ranking": []}
+
+    X = offer_matrix(offers)
+    scores = score_offers(X, weight_vector(criteria))
+    costs = np.array([float(o.get("totalCost") or 0) for o in offers])
+    risks = np.array([RISK_POINTS.get(str(o.get("riskLevel", "medium")).lower(), 2.0) for o in offers])
+
+    if max_risk_level:
+        cap = RISK_POINTS.get(str(max_risk_level).lower(), 3.0)
+        scores = np.where(risks <= cap, scores, -np.inf)
+
+    if budget is not None:
+        sel = select_portfolio(costs, scores, risks, float(budget), max_avg_risk)
+    else:
+        sel = top_k(scores, k)
+        sel = sel[np.isfinite(scores[sel])]
+
+    selected = [{**offers[i], "totalScore": float(scores[i])} for i in sel]
+    n = len(sel) or 1
+    return {
+        "selectedTenders": selected,
+        "totalCost": float(costs[sel].sum()),
+        "averageQuality": float(sum(o.get("qualityScore") or 0 for o in selected) / n),
+        "averageDeliveryTime": float(sum(o.get("deliveryTime") or 0 for o in selected) / n),
+        "riskScore": float(risks[sel].mean()) if len(sel) else 0.0,
+        "overallScore": float(scores[sel].mean()) if len(sel) else 0.0,
+        # offers over the risk cap rank last with a null score (JSON has no -Infinity)
+        "ranking": [{"id": offers[i].get("id"),
+                     "totalScore": float(scores[i]) if np.isfinite(scores[i]) else None}
+                    for i in top_k(np.where(np.isfinite(scores), scores, -1e18), min(len(offers), 50))],
+    }
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Pareto frontier of tender offers
+--------------------------------
+• Finds the non-dominated TenderOffers across cost, delivery time, quality
+  and risk (lower cost / delivery / risk and higher quality are better).
+• Skyline algorithms by dimensionality: sort-and-sweep for 2 objectives,
+  sweep with a staircase for 3, Kung–Bentley divide and conquer for 4+
+  (the merge recurses on the remaining dimensions instead of comparing
+  every pair).
+• ParetoFrontier keeps a live frontier that updates in O(|frontier|) when a
+  single offer is added.
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_right
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from offer_optimiser import RISK_POINTS
+
+# name → (TenderOffer field, +1 to minimise / -1 to maximise)
+OBJECTIVES = {
+    "cost":     ("totalCost", 1.0),
+    "delivery": ("deliveryTime", 1.0),
+    "quality":  ("qualityScore", -1.0),
+    "risk":     ("riskLevel", 1.0),
+}
+DEFAULT_OBJECTIVES = ("cost", "delivery", "quality", "risk")
+
+_BRUTE_FORCE_MAX = 64
+
+# ---------------------------------------------------------------------------
+# 1  Objective matrix
+# ---------------------------------------------------------------------------
+
+
+def _objective_value(offer: Dict, name: str) -> float:
+    fld, sign = OBJECTIVES[name]
+    if fld == "riskLevel":
+        v = RISK_POINTS.get(str(offer.get(fld, "medium")).lower(), 2.0)
+    else:
+        v = float(offer.get(fld) or 0)
+    return sign * v
+
+
+def objective_matrix(offers: Sequence[Dict], objectives: Sequence[str] = DEFAULT_OBJECTIVES) -> np.ndarray:
+    """n × d matrix where every column is to be minimised."""
+    return np.array([[_objective_value(o, name) for name in objectives] for o in offers],
+                    dtype=np.float64).reshape(len(offers), len(objectives))
+
+
+# ---------------------------------------------------------------------------
+# 2  Skyline algorithms (on unique, lexicographically sorted rows)
+# ---------------------------------------------------------------------------
+
+
+def _sweep_2d(P: np.ndarray) -> np.ndarray:
+    # sorted by x then y: a point survives iff its y beats every earlier y
+    y = P[:, 1]
+    prev_min = np.minimum.accumulate(np.r_[np.inf, y[:-1]])
+    return np.flatnonzero(y < prev_min)
+
+
+def _sweep_3d(P: np.ndarray) -> np.ndarray:
+    # sorted by x: a point is dominated iff an earlier frontier point has
+    # y' ≤ y and z' ≤ z. The (y, z) staircase holds y ascending, z
+    # strictly descending, so the min z over y' ≤ y is one bisect away.
+    ys: List[float] = []
+    zs: List[float] = []
+    keep = []
+    for i, (_, y, z) in enumerate(P):
+        j = bisect_right(ys, y)
+        if j and zs[j - 1] <= z:
+            continue
+        keep.append(i)
+        k = j
+        while k < len(ys) and zs[k] >= z:
+            k += 1
+        del ys[j:k], zs[j:k]
+        ys.insert(j, y)
+        zs.insert(j, z)
+    return np.array(keep, dtype=np.int64)
+
+
+def _dominated_by(A: np.ndarray, B: np.ndarray, block: int = 256) -> np.ndarray:
+    """Mask of rows of B weakly dominated by some row of A (A ≤ B everywhere),
+    by brute force."""
+    out = np.zeros(len(B), dtype=bool)
+    if not len(A):
+        return out
+    for s in range(0, len(B), block):
+        chunk = B[s:s + block]
+        out[s:s + block] = (A[None, :, :] <= chunk[:, None, :]).all(axis=2).any(axis=1)
+    return out
+
+
+def _filter(A: np.ndarray, B: np.ndarray) -> np.ndarray:
+    """Same mask as _dominated_by, by Bentley's multidimensional divide and
+    conquer: split A ∪ B at the median of the first column; the low part
+    of A can only dominate the high part of B on the remaining columns, so
+    that pair recurses with one dimension fewer, down to a 2-D sweep."""
+    out = np.zeros(len(B), dtype=bool)
+    if not len(A) or not len(B):
+        return out
+    d = B.shape[1]
+    if d == 1:
+        return B[:, 0] >= A[:, 0].min()
+    if d == 2:
+        # sorted by x: b is dominated iff the least y among a.x ≤ b.x is ≤ b.y
+        order = np.argsort(A[:, 0], kind="stable")
+        ax, min_y = A[order, 0], np.minimum.accumulate(A[order, 1])
+        j = np.searchsorted(ax, B[:, 0], side="right")
+        hit = j > 0
+        out[hit] = min_y[j[hit] - 1] <= B[hit, 1]
+        return out
+    if len(A) * len(B) <= _BRUTE_FORCE_MAX ** 2:
+        return _dominated_by(A, B)
+    v = np.concatenate([A[:, 0], B[:, 0]])
+    m = np.partition(v, len(v) // 2)[len(v) // 2]
+    # both sides must be non-empty; if the column is constant it cannot
+    # decide anything and is dropped
+    if (v < m).any():
+        low_a, low_b = A[:, 0] < m, B[:, 0] < m
+    elif (v > m).any():
+        low_a, low_b = A[:, 0] <= m, B[:, 0] <= m
+    else:
+        return _filter(A[:, 1:], B[:, 1:])
+    out[low_b] = _filter(A[low_a], B[low_b])
+    high = B[~low_b]
+    dom = _filter(A[~low_a], high)
+    rest = ~dom
+    dom[rest] = _filter(A[low_a, 1:], high[rest, 1:])
+    out[~low_b] = dom
+    return out
+
+
+def _brute(P: np.ndarray) -> np.ndarray:
+    le = (P[None, :, :] <= P[:, None, :]).all(axis=2)     # le[i, j]: j ≤ i everywhere
+    np.fill_diagonal(le, False)
+    return np.flatnonzero(~le.any(axis=1))                # rows are unique, so ≤ ⇒ dominates
+
+
+def _divide_and_conquer(P: np.ndarray) -> np.ndarray:
+    n = len(P)
+    if n <= _BRUTE_FORCE_MAX:
+        return _brute(P)
+    mid = n // 2
+    left = _divide_and_conquer(P[:mid])
+    right = _divide_and_conquer(P[mid:]) + mid
+    # rows are sorted on the first column and unique, so a left point
+    # dominates a right one iff it is ≤ on the remaining columns
+    survivors = ~_filter(P[left, 1:], P[right, 1:])
+    return np.concatenate([left, right[survivors]])
+
+
+def skyline(P: np.ndarray) -> np.ndarray:
+    """Indices of the non-dominated rows of P (all columns minimised).
+    Duplicate rows are either all on the frontier or all off it."""
+    n, d = P.shape
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    U, inverse = np.unique(P, axis=0, return_inverse=True)   # sorted lexicographically
+    inverse = inverse.reshape(-1)
+    if d == 1:
+        front = np.array([0])
+    elif d == 2:
+        front = _sweep_2d(U)
+    elif d == 3:
+        front = _sweep_3d(U)
+    else:
+        front = _divide_and_conquer(U)
+    on_front = np.zeros(len(U), dtype=bool)
+    on_front[front] = True
+    return np.flatnonzero(on_front[inverse])
+
+
+def pareto_front(offers: Sequence[Dict], objectives: Sequence[str] = DEFAULT_OBJECTIVES) -> List[Dict]:
+    if not offers:
+        return []
+    return [offers[i] for i in skyline(objective_matrix(offers, objectives))]
+
+
+# ---------------------------------------------------------------------------
+# 3  Incremental frontier
+# ---------------------------------------------------------------------------
+
+
+class ParetoFrontier:
+    """Live frontier over a growing offer pool. Only frontier points are
+    kept: a point dominated once stays dominated as offers are added."""
+
+    def __init__(self, objectives: Sequence[str] = DEFAULT_OBJECTIVES) -> None:
+        self.objectives = tuple(objectives)
+        self._points = np.empty((0, len(self.objectives)))
+        self._offers: List[Dict] = []
+
+    @classmethod
+    def from_offers(cls, offers: Sequence[Dict],
+                    objectives: Sequence[str] = DEFAULT_OBJECTIVES) -> "ParetoFrontier":
+        f = cls(objectives)
+        if offers:
+            P = objective_matrix(offers, objectives)
+            idx = skyline(P)
+            f._points = P[idx]
+            f._offers = [offers[i] for i in idx]
+        return f
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    @property
+    def offers(self) -> List[Dict]:
+        return list(self._offers)
+
+    def add(self, offer: Dict) -> bool:
+        """Insert an offer; returns True if it joined the frontier."""
+        p = np.array([_objective_value(offer, n) for n in self.objectives])
+        if len(self._points):
+            le = (self._points <= p).all(axis=1)
+            if (le & (self._points < p).any(axis=1)).any():
+                return False
+            evicted = (p <= self._points).all(axis=1) & (p < self._points).any(axis=1)
+            if evicted.any():
+                keep = ~evicted
+                self._points = self._points[keep]
+                self._offers = [o for o, k in zip(self._offers, keep) if k]
+        self._points = np.vstack([self._points, p])
+        self._offers.append(offer)
+        return True
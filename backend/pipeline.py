@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Stage-graph pipeline
+--------------------
+• A pipeline is a DAG of named stages, each declaring the values it reads
+  (`inputs`) and the value it produces (`output`); the edges follow from
+  those names, so stages are added without wiring them by hand.
+• The executor starts every stage whose inputs are ready, so independent
+  branches (GeBIZ and TED search, the market lookup, …) overlap instead of
+  running one after another. A caller may supply a stage's output as an
+  input (e.g. keywords kept from an earlier run); that stage is skipped.
+• Stage outputs are memoised under a hash of the stage's inputs and its
+  config (tunables such as top-k, or a data version), so re-running with one
+  setting changed recomputes only the stages that setting reaches.
+• Runs honour the request deadline (deadlines.py): once it has passed, a
+  stage with a fallback gets the fallback's cheaper answer instead, whether
+  it had not started yet, is still running or gave up with
+  DeadlineExceeded. A stage refused by an open circuit breaker (CircuitOpen,
+  breakers.py), or one that raises UseFallback because its upstream gave no
+  usable answer, falls back the same way. Fallback outputs are never
+  memoised, and the run lists the stage in `degraded`.
+
+Requires:
+  nothing beyond the standard library
+"""
+
+from __future__ import annotations
+
+import os
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import deadlines
+from deadlines import DeadlineExceeded
+from breakers import CircuitOpen
+
+
+class UseFallback(RuntimeError):
+    """Raised by a stage that got no usable answer (e.g. an LLM reply that
+    does not parse): its fallback answers instead."""
+
+
+DEFAULT_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+MEMO_ENTRIES = int(os.getenv("PIPELINE_MEMO_ENTRIES", "512"))       # 0 disables the memo
+MEMO_TTL_SECONDS = float(os.getenv("PIPELINE_MEMO_TTL", "3600"))    # searches and LLM replies go stale
+
+# ---------------------------------------------------------------------------
+# 1  Stages
+# ---------------------------------------------------------------------------
+
+
+@dataclass(frozen=True)
+class Stage:
+    """fn(*[values[i] for i in inputs], **config(options)) → values[output].
+
+    `config` picks the stage's tunables out of the run options; they are
+    passed to fn as keyword arguments and are part of the memo key, as is
+    `version()` (e.g. how much data an index has seen). `memo=False`
+    always reruns; `keep(output)` returning False skips memoising that one
+    output (e.g. a search that came back partial). `fallback` takes the
+    same arguments as fn and stands in for it past the deadline.
+    """
+    name: str
+    fn: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    output: str
+    config: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+    version: Optional[Callable[[], Any]] = None
+    memo: bool = True
+    keep: Optional[Callable[[Any], bool]] = None
+    fallback: Optional[Callable[..., Any]] = None
+
+
+def _digest(value: Any) -> str:
+    blob = json.dumps(value, sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class Memo:
+    """Bounded LRU of stage outputs with an age limit; thread-safe."""
+
+    def __init__(self, entries: int = MEMO_ENTRIES, ttl: float = MEMO_TTL_SECONDS) -> None:
+        self.entries = entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or time.monotonic() - hit[0] > self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, copy.deepcopy(hit[1])
+
+    def put(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), copy.deepcopy(value))
+            self._data.move_to_end(key)
+            while len(self._data) > self.entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+# ---------------------------------------------------------------------------
+# 2  Graph & executor
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Run:
+    values: Dict[str, Any]
+    timings: Dict[str, float] = field(default_factory=dict)     # stage → seconds
+    cached: List[str] = field(default_factory=list)             # stages served from the memo
+    degraded: List[str] = field(default_factory=list)           # stages served by their fallback
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage], workers: int = DEFAULT_WORKERS,
+                 memo: Optional[Memo] = None) -> None:
+        self.stages: Dict[str, Stage] = {}
+        producers: Dict[str, str] = {}
+        for s in stages:
+            if s.name in self.stages:
+                raise ValueError(f"Duplicate stage '{s.name}'")
+            if s.output in producers:
+                raise ValueError(f"'{s.output}' is produced by both '{producers[s.output]}' and '{s.name}'")
+            self.stages[s.name] = s
+            producers[s.output] = s.name
+        self.producers = producers
+        self.workers = workers
+        self.memo = memo if memo is not None else Memo()
+        self.order = self._topological_order()
+
+    def _topological_order(self) -> List[str]:
+        deps = {n: {self.producers[i] for i in s.inputs if i in self.producers}
+                for n, s in self.stages.items()}
+        order, done = [], set()
+        while len(order) < len(deps):
+            ready = [n for n in deps if n not in done and deps[n] <= done]
+            if not ready:
+                cycle = sorted(n for n in deps if n not in done)
+                raise ValueError(f"Stage graph has a cycle among: {', '.join(cycle)}")
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+    def external_inputs(self) -> List[str]:
+        """Values the caller has to supply."""
+        return sorted({i for s in self.stages.values() for i in s.inputs} - set(self.producers))
+
+    def memo_key(self, stage: Stage, values: Dict[str, Any], config: Dict[str, Any]) -> str:
+        version = stage.version() if stage.version else None
+        return _digest([stage.name, [values[i] for i in stage.inputs], config, version])
+
+    def _call(self, stage: Stage, args: List[Any], config: Dict[str, Any]) -> Tuple[Any, float]:
+        t0 = time.perf_counter()
+        out = stage.fn(*args, **config)
+        return out, time.perf_counter() - t0
+
+    def run(self, inputs: Dict[str, Any], options: Optional[Dict[str, Any]] = None,
+            targets: Optional[Iterable[str]] = None) -> Run:
+        """Execute the stages needed for `targets` (default: all), each as
+        soon as its inputs exist, within the deadline in force (if any)."""
+        options = options or {}
+        missing = [i for i in self.external_inputs() if i not in inputs]
+        if missing:
+            raise ValueError(f"Missing pipeline inputs: {', '.join(missing)}")
+        wanted = self._needed(targets) if targets else set(self.stages)
+        run = Run(values=dict(inputs))
+        # a stage whose output the caller supplies is not run
+        pending = [n for n in self.order if n in wanted and self.stages[n].output not in inputs]
+        running: Dict[Future, Tuple[Stage, Optional[str], List[Any], Dict[str, Any]]] = {}
+
+        def degrade(stage: Stage, args: List[Any], config: Dict[str, Any]) -> None:
+            t0 = time.perf_counter()
+            run.values[stage.output] = stage.fallback(*args, **config)
+            run.timings[stage.name] = time.perf_counter() - t0
+            run.degraded.append(stage.name)
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stage")
+        try:
+            while pending or running:
+                ready = [n for n in pending if all(i in run.values for i in self.stages[n].inputs)]
+                if not ready and not running:
+                    raise RuntimeError(f"Stages cannot start: {', '.join(pending)}")
+                for name in ready:
+                    pending.remove(name)
+                    stage = self.stages[name]
+                    config = stage.config(options) if stage.config else {}
+                    key = self.memo_key(stage, run.values, config) if stage.memo else None
+                    if key is not None:
+                        t0 = time.perf_counter()
+                        hit, value = self.memo.get(key)
+                        if hit:
+                            run.values[stage.output] = value
+                            run.timings[name] = time.perf_counter() - t0
+                            run.cached.append(name)
+                            continue
+                    args = [run.values[i] for i in stage.inputs]
+                    if stage.fallback and deadlines.expired():
+                        degrade(stage, args, config)
+                        continue
+                    running[deadlines.submit(pool, self._call, stage, args, config)] = \
+                        (stage, key, args, config)
+                if not running:
+                    continue            # memo hits may have unblocked more stages
+                done, _ = wait(running, timeout=deadlines.remaining(), return_when=FIRST_COMPLETED)
+                if not done:
+                    # out of time: stages with a fallback are abandoned, the
+                    # rest (cheap, local) are waited for
+                    for fut, (stage, _, args, config) in list(running.items()):
+                        if stage.fallback:
+                            del running[fut]
+                            degrade(stage, args, config)
+                    if running:
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    stage, key, args, config = running.pop(fut)
+                    try:
+                        value, secs = fut.result()
+                    except (DeadlineExceeded, CircuitOpen, UseFallback):
+                        if not stage.fallback:
+                            raise
+                        degrade(stage, args, config)
+                        continue
+                    run.values[stage.output] = value
+                    run.timings[stage.name] = secs
+                    if key is not None and (stage.keep is None or stage.keep(value)):
+                        self.memo.put(key, value)
+        finally:
+            # abandoned stages finish in the background; nobody waits for them
+            pool.shutdown(wait=False, cancel_futures=True)
+        return run
+
+    def _needed(self, targets: Iterable[str]) -> set:
+        """Stages whose outputs the targets (stage or value names) depend on."""
+        need, stack = set(), [self.producers.get(t, t) for t in targets]
+        while stack:
+            name = stack.pop()
+            if name in need or name not in self.stages:
+                continue
+            need.add(name)
+            stack.extend(self.producers[i] for i in self.stages[name].inputs if i in self.producers)
+        return need
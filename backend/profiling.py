@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Per-request profiling
+---------------------
+• Opt-in profiling of API requests (or any call): per request with an
+  `X-Profile` header or `?profile=` query flag, globally with
+  PROFILE_SAMPLE_RATE (1.0 = every request, 0.01 = one in a hundred).
+• Per-request flags only ever get the cheap sampler unless the server
+  runs with PROFILE_ON_REQUEST=trace, so an anonymous caller cannot force
+  deterministic profiling; PROFILE_ON_REQUEST=0 ignores the flags.
+• Two profilers, both stdlib:
+    – "sample": a background thread reads the request thread's stack every
+      PROFILE_INTERVAL_MS and counts collapsed stacks (flame-graph
+      "folded" format); cheap enough to leave on for a share of traffic,
+    – "trace": deterministic cProfile with a pstats dump (on Python 3.12+
+      only one can run at a time; a second falls back to sampling).
+• Work the request hands to thread pools through deadlines.submit (the
+  pipeline's stage-* threads, federated searches, hedged calls) is
+  profiled too: the session travels in the copied context and each pool
+  thread joins it for the duration of the call. Sampled stacks from pool
+  threads are rooted at the pool's name, e.g. "[stage]".
+• Artifacts land in PROFILE_DIR under the request id (the caller's
+  X-Request-ID, or a generated one returned in that header):
+    <id>.json metadata, <id>.txt top-functions summary, plus <id>.folded
+    (sample) or <id>.prof (trace, open with `python -m pstats` / snakeviz).
+• Requests that are not profiled pay one random() call.
+
+Usage:
+  curl -H 'X-Profile: 1' ...            # sample this request
+  curl '...?profile=trace'              # cProfile it (PROFILE_ON_REQUEST=trace)
+  PROFILE_SAMPLE_RATE=0.01 python api.py
+  GET /profiles, GET /profiles/<id>, GET /profiles/<id>/<kind>
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import pstats
+import cProfile
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Optional
+
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "profiles"),
+)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+# which per-request header / query flags to honour: "sample" (trace requests
+# are sampled instead), "trace" (both) or "0" (none)
+PROFILE_ON_REQUEST = os.getenv("PROFILE_ON_REQUEST", "sample").strip().lower()
+
+MODES = ("sample", "trace")
+TOP_FUNCTIONS = 40
+_REQUEST_ID_OK = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-_.")
+
+# the session profiling the current unit of work; deadlines.submit copies it
+# into pool threads, which join it through follow()
+_current: ContextVar[Optional["Session"]] = ContextVar("profile_session", default=None)
+
+# ---------------------------------------------------------------------------
+# 1  Profilers
+# ---------------------------------------------------------------------------
+
+
+class StackSampler:
+    """Samples the Python stacks of a set of threads at a fixed interval from
+    a background thread. Stacks are stored root-first as "a;b;c" → count."""
+
+    def __init__(self, thread_id: Optional[int] = None,
+                 interval_ms: float = PROFILE_INTERVAL_MS) -> None:
+        # thread id → root label ("" for the thread that started the sampler)
+        self.threads: Dict[int, str] = {thread_id or threading.get_ident(): ""}
+        self.interval = interval_ms / 1000.0
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_thread(self, thread_id: int, label: str) -> bool:
+        """Sample this thread too; False if it already was."""
+        with self._lock:
+            if thread_id in self.threads:
+                return False
+            self.threads[thread_id] = label
+            return True
+
+    def remove_thread(self, thread_id: int) -> None:
+        with self._lock:
+            self.threads.pop(thread_id, None)
+
+    @staticmethod
+    def _label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self.threads.items())
+            for thread_id, root in threads:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame))
+                    frame = frame.f_back
+                if root:
+                    stack.append(root)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def summary(self, top: int = TOP_FUNCTIONS) -> str:
+        """Share of samples in which each function was on the stack (inclusive)
+        and at the top of it (self)."""
+        inclusive: Counter = Counter()
+        own: Counter = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += n
+            for f in set(frames):
+                inclusive[f] += n
+        total = self.samples or 1
+        lines = [f"{self.samples} stack samples every {self.interval * 1000:g} ms", "",
+                 f"{'incl %':>7} {'self %':>7}  function"]
+        for f, n in inclusive.most_common(top):
+            lines.append(f"{100 * n / total:7.1f} {100 * own[f] / total:7.1f}  {f}")
+        return "\n".join(lines) + "\n"
+
+
+class Session:
+    """One profiled unit of work; writes its artifacts on finish()."""
+
+    def __init__(self, request_id: str, mode: str = PROFILE_MODE, label: str = "",
+                 directory: str = PROFILE_DIR) -> None:
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode '{mode}' (expected {' or '.join(MODES)})")
+        self.request_id = request_id
+        self.mode = mode
+        self.label = label
+        self.directory = directory
+        self._sampler: Optional[StackSampler] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._thread_stats: List[pstats.Stats] = []     # traces of pool threads that joined
+        self._lock = threading.Lock()
+        self._token = None
+        self._t0 = 0.0
+        self._wall_start = ""
+
+    def start(self) -> "Session":
+        self._wall_start = datetime.now(timezone.utc).isoformat(timespec="milliseconds")
+        self._t0 = time.perf_counter()
+        if self.mode == "trace":
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Python 3.12+: another session's profiler is already active
+                self._profile, self.mode = None, "sample"
+        if self.mode == "sample":
+            self._sampler = StackSampler()
+            self._sampler.start()
+        self._token = _current.set(self)
+        return self
+
+    @contextmanager
+    def joined(self) -> Iterator[None]:
+        """Profile the calling (pool) thread as part of this session while
+        the block runs."""
+        if self._sampler is not None:
+            thread_id = threading.get_ident()
+            root = "[" + threading.current_thread().name.rsplit("_", 1)[0] + "]"
+            added = self._sampler.add_thread(thread_id, root)
+            try:
+                yield
+            finally:
+                if added:
+                    self._sampler.remove_thread(thread_id)
+            return
+        prof: Optional[cProfile.Profile] = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            prof = None         # Python 3.12+: the session's profile already sees every thread
+        try:
+            yield
+        finally:
+            if prof is not None:
+                prof.disable()
+                stats = pstats.Stats(prof)
+                with self._lock:
+                    self._thread_stats.append(stats)
+
+    def finish(self, **meta) -> Dict:
+        elapsed = time.perf_counter() - self._t0
+        if self._token is not None:
+            try:
+                _current.reset(self._token)
+            except ValueError:
+                pass            # finished from another context; that one ends with it
+            self._token = None
+        base = os.path.join(self.directory, self.request_id)
+        os.makedirs(self.directory, exist_ok=True)
+        if self._profile is not None:
+            self._profile.disable()
+            out = io.StringIO()
+            stats = pstats.Stats(self._profile, stream=out)
+            with self._lock:
+                for s in self._thread_stats:
+                    stats.add(s)
+            stats.dump_stats(base + ".prof")
+            stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+            summary, artifact = out.getvalue(), base + ".prof"
+        else:
+            self._sampler.stop()
+            with open(base + ".folded", "w", encoding="utf-8") as f:
+                f.write(self._sampler.folded())
+            summary, artifact = self._sampler.summary(), base + ".folded"
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(summary)
+        record = {"request_id": self.request_id, "mode": self.mode, "label": self.label,
+                  "started": self._wall_start, "duration_ms": elapsed * 1000.0,
+                  "artifact": os.path.basename(artifact),
+                  **({"samples": self._sampler.samples} if self._sampler else {}), **meta}
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2)
+        return record
+
+    def __enter__(self) -> "Session":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        try:
+            self.finish(**({"error": repr(exc[1])} if exc[1] else {}))
+        except OSError as e:
+            print(f"⚠️ Could not write profile {self.request_id}:", e)
+
+
+def follow(fn: Callable, *args, **kwargs):
+    """fn(*args, **kwargs), profiled as part of the current session if there
+    is one. deadlines.submit runs every pool call through this."""
+    session = _current.get()
+    if session is None:
+        return fn(*args, **kwargs)
+    with session.joined():
+        return fn(*args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# 2  Deciding what to profile
+# ---------------------------------------------------------------------------
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def clean_request_id(rid: Optional[str]) -> Optional[str]:
+    """A caller-supplied id, if it is safe to use as a file name."""
+    if rid and len(rid) <= 128 and set(rid) <= _REQUEST_ID_OK and rid.strip("."):
+        return rid
+    return None
+
+
+def requested_mode(flag: Optional[str]) -> Optional[str]:
+    """"1" / "true" / "yes" / "sample" → "sample", "trace" / "cprofile" → "trace"."""
+    flag = (flag or "").strip().lower()
+    if flag in ("trace", "cprofile", "deterministic"):
+        return "trace"
+    if flag in ("1", "true", "yes", "on", "sample"):
+        return "sample"
+    return None
+
+
+def choose_mode(flag: Optional[str] = None, rate: float = PROFILE_SAMPLE_RATE) -> Optional[str]:
+    """Mode to profile this unit of work in, or None to leave it alone."""
+    if PROFILE_ON_REQUEST in ("sample", "trace"):
+        mode = requested_mode(flag)
+        if mode:
+            return "trace" if mode == "trace" and PROFILE_ON_REQUEST == "trace" else "sample"
+    if rate > 0 and random.random() < rate:
+        return PROFILE_MODE
+    return None
+
+
+def profiled(label: Optional[str] = None, rate: float = PROFILE_SAMPLE_RATE) -> Callable:
+    """Decorator: profile a share of calls to any function (e.g.
+    analyse_tender outside the API). The profile id is returned in the
+    function's `.last_profile` attribute."""
+    def wrap(fn: Callable) -> Callable:
+        @wraps(fn)
+        def inner(*args, **kwargs):
+            mode = choose_mode(rate=rate)
+            if mode is None:
+                return fn(*args, **kwargs)
+            session = Session(new_request_id(), mode, label or fn.__qualname__)
+            inner.last_profile = session.request_id
+            with session:
+                return fn(*args, **kwargs)
+        inner.last_profile = None
+        return inner
+    return wrap
+
+
+# ---------------------------------------------------------------------------
+# 3  Flask integration
+# ---------------------------------------------------------------------------
+
+
+def list_profiles(directory: str = PROFILE_DIR, limit: int = 50) -> List[Dict]:
+    if not os.path.isdir(directory):
+        return []
+    metas = sorted((e for e in os.scandir(directory) if e.name.endswith(".json")),
+                   key=lambda e: e.stat().st_mtime, reverse=True)[:limit]
+    out = []
+    for e in metas:
+        try:
+            with open(e.path, "r", encoding="utf-8") as f:
+                out.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return out
+
+
+def install(app, directory: str = PROFILE_DIR) -> None:
+    """Profile requests to `app` on demand and serve the stored artifacts."""
+    from flask import g, request, jsonify, send_file
+
+    @app.before_request
+    def _start_profile():
+        rid = clean_request_id(request.headers.get("X-Request-ID")) or new_request_id()
+        g.request_id = rid
+        if request.path.startswith("/profiles"):
+            return
+        flag = request.headers.get("X-Profile") or request.args.get("profile")
+        mode = choose_mode(flag)
+        if mode:
+            g.profile = Session(rid, mode, f"{request.method} {request.path}", directory).start()
+
+    @app.after_request
+    def _finish_profile(response):
+        rid = getattr(g, "request_id", None)
+        if rid:
+            response.headers["X-Request-ID"] = rid
+        session = g.pop("profile", None)
+        if session is not None:
+            try:
+                session.finish(status=response.status_code)
+                response.headers["X-Profile"] = f"/profiles/{rid}"
+            except OSError as e:
+                print(f"⚠️ Could not write profile {rid}:", e)
+        return response
+
+    @app.teardown_request
+    def _abandon_profile(exc):
+        # after_request is skipped when a request fails outright; stop the
+        # profiler (and the sampler thread) here instead
+        session = g.pop("profile", None)
+        if session is not None:
+            try:
+                session.finish(**({"error": repr(exc)} if exc else {}))
+            except OSError as e:
+                print(f"⚠️ Could not write profile {session.request_id}:", e)
+
+    @app.route("/profiles")
+    def profiles_index():
+        return jsonify(list_profiles(directory, int(request.args.get("limit", 50))))
+
+    @app.route("/profiles/<rid>")
+    @app.route("/profiles/<rid>/<kind>")
+    def profile_artifact(rid, kind="summary"):
+        rid = clean_request_id(rid)
+        ext = {"summary": ".txt", "meta": ".json", "folded": ".folded", "prof": ".prof"}.get(kind)
+        if not rid or not ext:
+            return jsonify({"error": "Unknown profile or artifact kind"}), 404
+        path = os.path.join(directory, rid + ext)
+        if not os.path.exists(path):
+            return jsonify({"error": f"No {kind} artifact for request {rid}"}), 404
+        return send_file(os.path.abspath(path), mimetype="application/json" if ext == ".json"
+                         else "application/octet-stream" if ext == ".prof" else "text/plain")
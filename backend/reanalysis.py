@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Incremental re-analysis
+-----------------------
+• A stored analysis (analyses.py) goes stale only when an award it would
+  have used is published. Its dependencies are the keywords its
+  comparables were searched with: an award whose description contains all
+  words of one of them would turn up in that search.
+• On every batch of newly synced awards the reanalyser finds the affected
+  analyses, moves every other current analysis up to the new award-data
+  version (so it keeps being served from the store) and leaves the
+  affected ones behind.
+• reanalyse() then re-runs the analyses left behind, once each however
+  many batches touched them. Search, pricing and market position are
+  recomputed; the LLM bid range is only asked for again when the
+  comparables' bid-to-estimate quartiles are more than REANALYSE_TOLERANCE
+  away from those it was generated from, otherwise the stored one is kept.
+  Drift is measured against that basis, not the last run, so a series of
+  small moves still triggers a new range once they add up.
+• The category is not a trigger on its own: every award shifts its
+  category's market quantiles a little, which would make every analysis
+  in the category stale on every sync.
+
+Usage:
+  python reanalysis.py sync                # pull new GeBIZ awards, re-run affected analyses
+  python reanalysis.py sync --dry-run      # only report which analyses would re-run
+  python reanalysis.py stale               # re-run analyses behind the award data
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import argparse
+from typing import Dict, List, Optional, Set
+
+from awards import Award, AwardHistory, sync_gebiz
+from columnar import AwardColumns
+from analyses import AnalysisStore
+from main import REANALYSE_TOLERANCE, TenderAnalyzer
+
+# ---------------------------------------------------------------------------
+# 1  Reanalyser
+# ---------------------------------------------------------------------------
+
+
+class Reanalyser:
+    """Follows an AwardHistory and keeps the analysis store current."""
+
+    def __init__(self, analyzer: TenderAnalyzer, store: AnalysisStore,
+                 tolerance: float = REANALYSE_TOLERANCE) -> None:
+        self.analyzer = analyzer
+        self.store = store
+        self.tolerance = tolerance
+        self.version = analyzer.data_version()
+        self.pending: Set[int] = set()          # analysis ids new awards affect
+        self.stats = {"awards": 0, "affected": 0, "advanced": 0,
+                      "rerun": 0, "llm_skipped": 0, "failed": 0}
+
+    @classmethod
+    def from_history(cls, history: AwardHistory, analyzer: TenderAnalyzer,
+                     store: AnalysisStore, **kwargs) -> "Reanalyser":
+        """Subscribe after the analyzer's column store has, so the data
+        version has already moved on when a batch arrives here."""
+        r = cls(analyzer, store, **kwargs)
+        history.subscribe(r.add_awards)
+        return r
+
+    def add_awards(self, awards: List[Award]) -> None:
+        new_version = self.analyzer.data_version()
+        hit = self.store.affected([a.description for a in awards])
+        self.pending |= hit
+        self.stats["awards"] += len(awards)
+        self.stats["affected"] = len(self.pending)
+        self.stats["advanced"] += self.store.advance(self.version, new_version, self.pending)
+        self.version = new_version
+
+    def reanalyse(self, every_stale: bool = False, limit: Optional[int] = None) -> Dict:
+        """Re-run the analyses new awards affected (or every stale one)."""
+        rows = self.store.stale(self.analyzer.data_version(), None if every_stale else self.pending)
+        for row in rows[:limit]:
+            if row["description"] is None:
+                continue                        # stored before descriptions were kept
+            t0 = time.perf_counter()
+            try:
+                a = self.analyzer.analyse_tender(row["title"], row["description"], row["estimate"],
+                                                 refresh=True, previous=row["result"],
+                                                 tolerance=self.tolerance, **row["options"])
+            except Exception as e:
+                print(f"⚠️ Re-analysis of {row['fingerprint'][:12]} failed:", e)
+                self.stats["failed"] += 1
+                continue
+            self.pending.discard(row["id"])
+            self.stats["rerun"] += 1
+            self.stats["llm_skipped"] += bool(a.bid_recommendation.get("reused"))
+            print(f"✅ Re-analysed {row['fingerprint'][:12]} in {time.perf_counter() - t0:.1f}s"
+                  f"{' (bid range kept)' if a.bid_recommendation.get('reused') else ''}"
+                  f"  {row['title'][:50]}")
+        return self.stats
+
+
+# ---------------------------------------------------------------------------
+# 2  CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Keep stored analyses current as awards arrive.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("sync", help="pull new GeBIZ awards, then re-run affected analyses")
+    s.add_argument("--max-records", type=int)
+    s.add_argument("--batch-size", type=int, default=1000)
+    s.add_argument("--dry-run", action="store_true", help="report, do not re-run")
+    st = sub.add_parser("stale", help="re-run every analysis behind the award data")
+    for p in (s, st):
+        p.add_argument("--tolerance", type=float, default=REANALYSE_TOLERANCE,
+                       help="quartile move (ratio points) below which the LLM bid range is kept")
+        p.add_argument("--limit", type=int, help="re-run at most this many analyses")
+    args = ap.parse_args(argv)
+
+    history = AwardHistory()
+    columns = AwardColumns.from_history(history)
+    store = AnalysisStore()
+    analyzer = TenderAnalyzer(columns=columns, store=store)
+    reanalyser = Reanalyser.from_history(history, analyzer, store, tolerance=args.tolerance)
+
+    if args.cmd == "sync":
+        n = sync_gebiz(history, args.batch_size, args.max_records)
+        print(f"✅ {n} new awards; {reanalyser.stats['affected']} analyses affected, "
+              f"{reanalyser.stats['advanced']} still current")
+        if args.dry_run:
+            for row in store.stale(analyzer.data_version(), reanalyser.pending):
+                print(f"  • {row['fingerprint'][:12]}  {row['title'][:60]}")
+            return 0
+        stats = reanalyser.reanalyse(limit=args.limit)
+    else:
+        stats = reanalyser.reanalyse(every_stale=True, limit=args.limit)
+    print(f"✅ {stats['rerun']} re-analysed ({stats['llm_skipped']} without the LLM), "
+          f"{stats['failed']} failed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
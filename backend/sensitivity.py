@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Criteria-weight sensitivity
+---------------------------
+• Scores every offer under thousands of TenderCriteria weight settings at
+  once: the n × 8 offer matrix times an 8 × m weight matrix, one matmul.
+• Weight settings come from a grid over chosen criteria or from random
+  multiplicative perturbations of the user's weights.
+• Reports how stable the ranking is (win / top-k frequencies, rank spread,
+  Spearman correlation with the base ranking), where the winner changes
+  as each weight moves (exact, from the upper envelope of the score
+  lines), and each weight's elasticity on the winning margin.
+
+Requires:
+  pip install numpy
+"""
+
+from __future__ import annotations
+
+import itertools
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from offer_optimiser import CRITERIA, offer_matrix, weight_vector
+
+DEFAULT_SAMPLES = 2000
+DEFAULT_SPREAD  = 0.25          # random: log-sd of the perturbation; grid: ± fraction
+DEFAULT_STEPS   = 5
+MAX_SAMPLES     = 200_000
+_EPS = 1e-9
+
+CRITERIA_KEYS = tuple(k for k, _ in CRITERIA)
+
+# ---------------------------------------------------------------------------
+# 1  Weight settings
+# ---------------------------------------------------------------------------
+
+
+def random_weights(base: np.ndarray, samples: int = DEFAULT_SAMPLES,
+                   spread: float = DEFAULT_SPREAD, seed: Optional[int] = None) -> np.ndarray:
+    """m × 8 weight vectors: each weight scaled by exp(N(0, spread)), rows
+    renormalised. Zero weights get a small floor so they can be explored."""
+    rng = np.random.default_rng(seed)
+    floor = np.where(base > 0, base, base.max() * 0.05)
+    W = floor * np.exp(rng.normal(0.0, spread, (samples, len(base))))
+    return W / W.sum(axis=1, keepdims=True)
+
+
+def grid_weights(base: np.ndarray, vary: Sequence[str] = CRITERIA_KEYS,
+                 steps: int = DEFAULT_STEPS, spread: float = DEFAULT_SPREAD) -> np.ndarray:
+    """Cartesian grid: each criterion in `vary` takes `steps` levels across
+    base × [1 − spread, 1 + spread]; the others stay at base."""
+    cols = [CRITERIA_KEYS.index(k) for k in vary]
+    if steps ** len(cols) > MAX_SAMPLES:
+        raise ValueError(f"grid of {steps}^{len(cols)} settings exceeds {MAX_SAMPLES}; "
+                         f"vary fewer criteria or use random sampling")
+    levels = np.linspace(1 - spread, 1 + spread, steps)
+    factors = np.array(list(itertools.product(levels, repeat=len(cols)))).reshape(-1, len(cols))
+    W = np.tile(base, (len(factors), 1))
+    W[:, cols] *= factors
+    W = np.clip(W, 0.0, None)
+    total = W.sum(axis=1, keepdims=True)
+    return np.divide(W, total, out=np.full_like(W, 1.0 / W.shape[1]), where=total > 0)
+
+
+# ---------------------------------------------------------------------------
+# 2  Rank stability
+# ---------------------------------------------------------------------------
+
+
+def _ranks(S: np.ndarray) -> np.ndarray:
+    """0-based rank of each offer (row) in each setting (column), best = 0."""
+    order = np.argsort(-S, axis=0, kind="stable")
+    R = np.empty_like(order)
+    np.put_along_axis(R, order, np.arange(S.shape[0])[:, None], axis=0)
+    return R
+
+
+def rank_stability(X: np.ndarray, w0: np.ndarray, W: np.ndarray, k: int = 3) -> Dict:
+    S = X @ W.T                                  # n × m, the whole batch in one matmul
+    base = X @ w0
+    R = _ranks(S)
+    r0 = _ranks(base[:, None])[:, 0]
+    n, m = S.shape
+    winners = np.argmax(S, axis=0)
+    win_freq = np.bincount(winners, minlength=n) / m
+    topk_freq = (R < k).mean(axis=1)
+
+    # Spearman between the base ranking and each setting (ranks are permutations)
+    if n > 1:
+        d2 = ((R - r0[:, None]) ** 2).sum(axis=0)
+        spearman = 1 - 6 * d2 / (n * (n * n - 1))
+    else:
+        spearman = np.ones(m)
+
+    return {
+        "settings": m,
+        "base_winner": int(np.argmax(base)),
+        "winner_unchanged": float((winners == np.argmax(base)).mean()),
+        "spearman": {"mean": float(spearman.mean()), "min": float(spearman.min()),
+                     "p5": float(np.percentile(spearman, 5))},
+        "offers": [{"index": int(i), "base_rank": int(r0[i]) + 1,
+                    "win_frequency": float(win_freq[i]),
+                    "topk_frequency": float(topk_freq[i]),
+                    "rank_min": int(R[i].min()) + 1, "rank_max": int(R[i].max()) + 1,
+                    "rank_mean": float(R[i].mean()) + 1}
+                   for i in np.argsort(r0)],
+    }
+
+
+# ---------------------------------------------------------------------------
+# 3  Winner-change boundaries & elasticity
+# ---------------------------------------------------------------------------
+
+
+def _envelope(a: np.ndarray, b: np.ndarray) -> List[Dict]:
+    """Upper envelope of the lines s_j(t) = b_j + (a_j − b_j)·t on t ∈ [0, 1]:
+    [{"from": t0, "to": t1, "winner": j}, …]."""
+    slope = a - b
+    t = 0.0
+    j = int(np.lexsort((-slope, -b))[0])        # best at t = 0, steepest on ties
+    out = []
+    while True:
+        steeper = slope > slope[j]
+        if not steeper.any():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cross = (b[j] - b) / (slope - slope[j])
+        cross = np.where(steeper & (cross > t + _EPS), cross, np.inf)
+        t_next = float(cross.min())
+        if t_next >= 1.0 - _EPS:
+            break
+        # several lines can cross at the same point: take the steepest
+        tied = np.flatnonzero(cross <= t_next + _EPS)
+        nxt = int(tied[np.argmax(slope[tied])])
+        out.append({"from": t, "to": t_next, "winner": j})
+        t, j = t_next, nxt
+    out.append({"from": t, "to": 1.0, "winner": j})
+    return out
+
+
+def winner_boundaries(X: np.ndarray, w0: np.ndarray) -> Dict[str, Dict]:
+    """For each criterion, move its share of the total weight from 0 to 1
+    (the others keep their relative proportions) and record where the
+    winner changes, plus how far the current share is from the nearest
+    change."""
+    out = {}
+    for i, key in enumerate(CRITERIA_KEYS):
+        rest = w0.copy()
+        rest[i] = 0.0
+        if rest.sum() <= 0:
+            continue
+        rest /= rest.sum()
+        segments = _envelope(X[:, i], X @ rest)
+        cuts = [s["to"] for s in segments[:-1]]
+        current = float(w0[i])
+        out[key] = {
+            "current_share": current,
+            "segments": segments,
+            "boundaries": cuts,
+            "distance_to_change": (min(abs(c - current) for c in cuts) if cuts else None),
+        }
+    return out
+
+
+def margin_elasticity(X: np.ndarray, w0: np.ndarray) -> Dict[str, float]:
+    """% change in the winner's lead over the runner-up per 1% change in
+    each weight (others rescaled to keep the total)."""
+    s = X @ w0
+    if len(s) < 2:
+        return {k: 0.0 for k in CRITERIA_KEYS}
+    first, second = np.argsort(-s, kind="stable")[:2]
+    d = X[first] - X[second]
+    margin = float(d @ w0)
+    out = {}
+    for i, key in enumerate(CRITERIA_KEYS):
+        wi = float(w0[i])
+        if margin <= 0 or wi >= 1.0:
+            out[key] = 0.0
+            continue
+        # along w(t) = t·e_i + (1 − t)·w_rest/(1 − w_i):  dm/dt = d_i − (d·w − d_i w_i)/(1 − w_i)
+        dm = d[i] - (margin - d[i] * wi) / (1 - wi)
+        out[key] = float(dm * wi / margin)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# 4  Entry point used by the API
+# ---------------------------------------------------------------------------
+
+
+def analyse_sensitivity(offers: List[Dict], criteria: Optional[Dict] = None,
+                        mode: str = "random", samples: int = DEFAULT_SAMPLES,
+                        spread: float = DEFAULT_SPREAD, vary: Optional[Sequence[str]] = None,
+                        steps: int = DEFAULT_STEPS, k: int = 3,
+                        seed: Optional[int] = None) -> Dict:
+    if not offers:
+        return {"settings": 0, "offers": [], "boundaries": {}, "elasticity": {}}
+    unknown = [v for v in (vary or ()) if v not in CRITERIA_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown criteria: {', '.join(unknown)}")
+
+    X = offer_matrix(offers)
+    w0 = weight_vector(criteria)
+    if mode == "grid":
+        W = grid_weights(w0, vary or CRITERIA_KEYS, steps, spread)
+    elif mode == "random":
+        W = random_weights(w0, min(int(samples), MAX_SAMPLES), spread, seed)
+    else:
+        raise ValueError(f"Unknown mode '{mode}' (expected 'random' or 'grid')")
+
+    out = rank_stability(X, w0, W, k)
+    for row in out["offers"]:
+        row["id"] = offers[row["index"]].get("id")
+    boundaries = winner_boundaries(X, w0)
+    for b in boundaries.values():
+        for seg in b["segments"]:
+            seg["winner"] = offers[seg["winner"]].get("id", seg["winner"])
+    out.update({
+        "mode": mode,
+        "base_weights": dict(zip(CRITERIA_KEYS, w0.tolist())),
+        "boundaries": boundaries,
+        "elasticity": margin_elasticity(X, w0),
+    })
+    out["base_winner"] = offers[out["base_winner"]].get("id", out["base_winner"])
+    return out
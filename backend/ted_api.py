@@ -1,10 +1,21 @@
 import requests
 import os
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
 
+from deadlines import hedged, timeout
+from breakers import CircuitOpen, breaker, check
+
 load_dotenv()
 
 TED_API_KEY = os.getenv("TED_API_KEY")  # Optional, not required yet
+TED_ENDPOINT = os.getenv("TED_ENDPOINT", "https://api.ted.europa.eu/v3/notices/search")
+TED_CACHE_ENTRIES = int(os.getenv("TED_CACHE_ENTRIES", "256"))
+
+# last good answer per (keywords, limit), served while TED is failing or its circuit is open
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
 
 headers = {
     "Accept": "application/json",
@@ -12,6 +23,24 @@ headers = {
     "User-Agent": "TenderOptimizer/1.0"
 }
 
+def _cached(key):
+    with _cache_lock:
+        notices = _cache.get(key)
+        if notices is not None:
+            _cache.move_to_end(key)
+        return notices
+
+def _remember(key, notices):
+    with _cache_lock:
+        _cache[key] = notices
+        _cache.move_to_end(key)
+        while len(_cache) > TED_CACHE_ENTRIES:
+            _cache.popitem(last=False)
+
+def _post(payload):
+    return check(hedged("ted", requests.post, TED_ENDPOINT, json=payload, headers=headers,
+                        timeout=timeout(20)))
+
 def get_similar_tenders(sector_keywords="software", limit=5):
     payload = {
         "query": f"description-glo ~ \"{sector_keywords}\"",
@@ -20,18 +49,24 @@ def get_similar_tenders(sector_keywords="software", limit=5):
         "onlyLatestVersions": True,
         "paginationMode": "PAGE_NUMBER",
         "fields": [
-            "TI", "CY", "estimated-value-lot", "tender-value",
+            "TI", "CY", "estimated-value-lot", "estimated-value-cur-lot",
+            "tender-value", "tender-value-cur",
             "winner-country", "winner-name", "BT-711-LotResult",
             "award-criterion-name-lot"
         ]
     }
+    key = (sector_keywords, limit)
     try:
-        response = requests.post("https://api.ted.europa.eu/v3/notices/search", json=payload, headers=headers, timeout=20)
+        response = breaker("ted").call(_post, payload)
         if response.status_code == 200:
-            return response.json().get("notices", [])
+            notices = response.json().get("notices", [])
+            _remember(key, notices)
+            return notices
         else:
             print("TED API error:", response.text)
             return []
+    except CircuitOpen:
+        return _cached(key) or []
     except Exception as e:
         print("Exception calling TED API:", e)
-        return []
+        return _cached(key) or []
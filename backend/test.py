@@ -33,6 +33,7 @@ load_dotenv()
 import boto3
 
 AWS_REGION   = os.getenv("AWS_REGION", "us-west-2")
+BEDROCK_ENDPOINT = os.getenv("BEDROCK_ENDPOINT")  # e.g. the local emulators
 BEDROCK_KEY  = os.getenv("BEDROCK_X_API_KEY")  # optional x-api-key gateway token
 _BEDROCK_MODEL_ID = "anthropic.claude-3-5-haiku-20241022-v1:0"
 
@@ -42,7 +43,8 @@ _BEDROCK_MODEL_ID = "anthropic.claude-3-5-haiku-20241022-v1:0"
 
 def _bedrock_client():
     """Return a boto3 Bedrock Runtime client."""
-    return boto3.client("bedrock-runtime", region_name=AWS_REGION)
+    return boto3.client("bedrock-runtime", region_name=AWS_REGION,
+                        endpoint_url=BEDROCK_ENDPOINT or None)
 _bedrock = _bedrock_client() 
 
 
@@ -72,7 +74,7 @@ def call_claude(prompt: str,
 
 
 GEBIZ_DATASET_ID = "d_acde1106003906a75c3fa052592f2fcb"
-GEBIZ_ENDPOINT   = "https://data.gov.sg/api/action/datastore_search"
+GEBIZ_ENDPOINT   = os.getenv("GEBIZ_ENDPOINT", "https://data.gov.sg/api/action/datastore_search")
 
 # ---------------------------------------------------------------------------
 # 2  Dataclass to hold the full result
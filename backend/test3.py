@@ -9,8 +9,7 @@ from dataclasses import dataclass
 from typing import List, Dict, Optional
 
 # For handling DOCX and PDF
-from docx import Document
-import PyPDF2
+from document_loader import extract_text, parse_tender_content
 
 load_dotenv()
 
@@ -41,20 +40,8 @@ class TenderAnalyzer:
 
     def load_tender_from_file(self, file_path: str) -> Dict[str, str]:
         """Load tender information from TXT, DOCX, or PDF file"""
-        ext = os.path.splitext(file_path)[1].lower()
-        text = ""
         try:
-            if ext == '.docx':
-                doc = Document(file_path)
-                text = '\n'.join([para.text for para in doc.paragraphs])
-            elif ext == '.pdf':
-                with open(file_path, 'rb') as f:
-                    reader = PyPDF2.PdfReader(f)
-                    pages = [page.extract_text() or '' for page in reader.pages]
-                    text = '\n'.join(pages)
-            else:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    text = f.read()
+            text = extract_text(file_path)
         except Exception as e:
             print(f"❌ Error loading file '{file_path}': {e}")
             return {}
@@ -62,36 +49,7 @@ class TenderAnalyzer:
         return self._parse_tender_content(text)
 
     def _parse_tender_content(self, content: str) -> Dict[str, str]:
-        tender_data = {"title":"", "description":"", "estimated_value":""}
-        lines = content.strip().split("\n")
-        current_section = None
-        current_content = []
-        for line in lines:
-            stripped = line.strip()
-            if stripped.lower().startswith('title:'):
-                if current_section:
-                    tender_data[current_section] = "\n".join(current_content).strip()
-                current_section = 'title'
-                current_content = [stripped.split(':',1)[1].strip()]
-            elif stripped.lower().startswith('description:'):
-                if current_section:
-                    tender_data[current_section] = "\n".join(current_content).strip()
-                current_section = 'description'
-                current_content = [stripped.split(':',1)[1].strip()]
-            elif stripped.lower().startswith('estimated value:') or stripped.lower().startswith('estimated_value:'):
-                if current_section:
-                    tender_data[current_section] = "\n".join(current_content).strip()
-                current_section = 'estimated_value'
-                current_content = [stripped.split(':',1)[1].strip()]
-            elif stripped and current_section:
-                current_content.append(stripped)
-        if current_section:
-            tender_data[current_section] = "\n".join(current_content).strip()
-        # Fallback to entire text as description
-        if not tender_data['title'] and not tender_data['description']:
-            tender_data['description'] = content
-            tender_data['estimated_value'] = '1000000 EUR'
-        return tender_data
+        return parse_tender_content(content)
 
     def extract_keywords_from_tender(self, desc: str, title: str="") -> List[str]:
         prompt = f"""
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Award trend engine
+------------------
+• Maintains monthly buckets of award amounts per category and per agency
+  (count, mean, quantiles), updated incrementally from AwardHistory syncs —
+  only the buckets a new award falls into are touched.
+• Rolling windows and recency-weighted statistics are assembled from the
+  buckets inside the window / decay horizon, never from the full history.
+• recency_weights() gives the same exponential decay for ad-hoc award lists
+  (e.g. the comparables in TenderAnalyzer.analyse_pricing).
+• from_columns() fills every bucket from the memory-mapped award columns
+  with one lexsort per dimension.
+"""
+
+from __future__ import annotations
+
+import threading
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from awards import Award, AwardHistory, parse_date
+from columnar import AwardColumns, sorted_groups
+from historical import QuantileTable
+
+DEFAULT_HALF_LIFE_DAYS = 365
+HORIZON_HALF_LIVES = 4          # older buckets weigh < 1/16 and are skipped
+TREND_MONTHS = 12
+TREND_THRESHOLD = 0.02          # |monthly log-slope| below this counts as stable
+
+# ---------------------------------------------------------------------------
+# 1  Recency weighting
+# ---------------------------------------------------------------------------
+
+
+def _month(d: date) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def _month_start(m: str) -> date:
+    return date(int(m[:4]), int(m[5:7]), 1)
+
+
+def _months_between(a: str, b: str) -> int:
+    return (int(b[:4]) - int(a[:4])) * 12 + int(b[5:7]) - int(a[5:7])
+
+
+def recency_weights(dates: Sequence[Optional[str]], half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+                    today: Optional[date] = None) -> np.ndarray:
+    """Exponential-decay weight per award date (ISO or any format parse_date
+    accepts); undated awards get the mean weight of the dated ones."""
+    today = today or date.today()
+    ages = np.array([
+        (today - date.fromisoformat(iso)).days if (iso := parse_date(d)) else np.nan
+        for d in dates
+    ], dtype=np.float64)
+    w = 0.5 ** (np.clip(ages, 0, None) / half_life_days)
+    known = ~np.isnan(w)
+    if not known.any():
+        return np.ones(len(dates))
+    w[~known] = w[known].mean()
+    return w
+
+
+def weighted_quantiles(values: np.ndarray, weights: np.ndarray, qs: Sequence[float]) -> np.ndarray:
+    """Quantiles of a weighted sample (midpoint interpolation on the CDF)."""
+    order = np.argsort(values)
+    v, w = values[order], weights[order]
+    cdf = (np.cumsum(w) - 0.5 * w) / w.sum()
+    return np.interp(qs, cdf, v)
+
+
+# ---------------------------------------------------------------------------
+# 2  Engine
+# ---------------------------------------------------------------------------
+
+
+class TrendEngine:
+    """Monthly QuantileTable buckets keyed by (dimension, key) → month."""
+
+    def __init__(self) -> None:
+        self.buckets: Dict[Tuple[str, str], Dict[str, QuantileTable]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_history(cls, history: AwardHistory) -> "TrendEngine":
+        eng = cls()
+        eng.add_awards(history.awards)
+        history.subscribe(eng.add_awards)
+        return eng
+
+    @classmethod
+    def from_columns(cls, columns: AwardColumns, history: Optional[AwardHistory] = None
+                     ) -> "TrendEngine":
+        """Build the buckets from the column store; with `history`, follow
+        its syncs as from_history does."""
+        eng = cls()
+        day = columns.day
+        dated = ~np.isnat(day)
+        amount = np.where(dated, columns.amount, np.nan)
+        months, month_codes = np.unique(day.astype("M8[M]"), return_inverse=True)
+        month_names = [str(m) for m in np.datetime_as_string(months)]
+        n_months = len(months)
+        for dim in ("all", "category", "agency"):
+            keys, codes = columns.scope_codes(dim)
+            cell = codes.astype(np.int64) * n_months + month_codes.reshape(-1)
+            for c, xs in sorted_groups(cell, amount):
+                scope = (dim, keys[c // n_months])
+                eng.buckets.setdefault(scope, {})[month_names[c % n_months]] = \
+                    QuantileTable.from_sorted(xs)
+        if history is not None:
+            history.subscribe(eng.add_awards)
+        return eng
+
+    def add_awards(self, awards: Iterable[Award]) -> None:
+        with self._lock:
+            for a in awards:
+                if not a.amount or not a.award_date:
+                    continue
+                m = a.award_date[:7]
+                for scope in (("all", ""), ("category", a.category), ("agency", a.agency)):
+                    months = self.buckets.setdefault(scope, {})
+                    if m not in months:
+                        months[m] = QuantileTable()
+                    months[m].add(a.amount)
+
+    def _months(self, dim: str, key: str) -> Dict[str, QuantileTable]:
+        return self.buckets.get((dim, key), {})
+
+    # ............................................................. queries
+
+    def series(self, dim: str = "all", key: str = "", start: Optional[str] = None,
+               end: Optional[str] = None) -> List[Dict]:
+        """Monthly count / mean / quartiles, oldest first."""
+        with self._lock:
+            out = []
+            for m in sorted(self._months(dim, key)):
+                if (start and m < start) or (end and m > end):
+                    continue
+                s = self._months(dim, key)[m].summary()
+                out.append({"month": m, "count": s["count"], "mean": s["mean"],
+                            "p25": s["p25"], "median": s["p50"], "p75": s["p75"]})
+            return out
+
+    def rolling(self, dim: str = "all", key: str = "", window_months: int = 12,
+                end: Optional[str] = None) -> Dict:
+        """Statistics over the last `window_months` buckets up to `end`."""
+        end = end or _month(date.today())
+        with self._lock:
+            merged = QuantileTable.merged(
+                t for m, t in self._months(dim, key).items()
+                if 0 <= _months_between(m, end) < window_months)
+        return {"window_months": window_months, "end": end, **merged.summary()}
+
+    def recency_weighted(self, dim: str = "all", key: str = "",
+                         half_life_days: float = DEFAULT_HALF_LIFE_DAYS,
+                         today: Optional[date] = None) -> Dict:
+        """Decay-weighted mean and quartiles; each bucket's awards share the
+        weight of the bucket's mid-month."""
+        today = today or date.today()
+        horizon = half_life_days * HORIZON_HALF_LIVES
+        vals, wts = [], []
+        with self._lock:
+            for m, t in self._months(dim, key).items():
+                age = (today - _month_start(m)).days + 15
+                if age > horizon:
+                    continue
+                xs = np.asarray(t.values())
+                vals.append(xs)
+                wts.append(np.full(len(xs), 0.5 ** (max(age, 0) / half_life_days)))
+        if not vals:
+            return {"count": 0}
+        v, w = np.concatenate(vals), np.concatenate(wts)
+        p25, p50, p75 = weighted_quantiles(v, w, (0.25, 0.5, 0.75))
+        return {"count": int(len(v)), "effective_n": float(w.sum() ** 2 / (w ** 2).sum()),
+                "mean": float((v * w).sum() / w.sum()), "p25": float(p25),
+                "median": float(p50), "p75": float(p75), "half_life_days": half_life_days}
+
+    def trend(self, dim: str = "all", key: str = "", months: int = TREND_MONTHS,
+              end: Optional[str] = None) -> Dict:
+        """Direction of monthly medians over the last `months` buckets, from a
+        count-weighted least-squares fit of log(median) on month index."""
+        end = end or _month(date.today())
+        pts = [(-_months_between(r["month"], end), r["median"], r["count"])
+               for r in self.series(dim, key)
+               if 0 <= _months_between(r["month"], end) < months and r["median"]]
+        if len(pts) < 3:
+            return {"trend": "stable", "slope": 0.0, "months": len(pts)}
+        x, y, n = (np.array(c, dtype=np.float64) for c in zip(*pts))
+        slope = float(np.polyfit(x, np.log(y), 1, w=np.sqrt(n))[0])
+        direction = ("stable" if abs(slope) < TREND_THRESHOLD
+                     else "increasing" if slope > 0 else "decreasing")
+        return {"trend": direction, "slope": slope, "months": len(pts)}
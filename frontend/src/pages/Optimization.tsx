@@ -3,6 +3,8 @@ import { useTender } from '../context/TenderContext'
 import { TenderOffer, TenderCriteria, OptimizationResult } from '../types/tender'
 import { Settings, TrendingUp, DollarSign, Clock, Award, CheckCircle, AlertTriangle } from 'lucide-react'
 
+const API_BASE = 'http://localhost:3000'
+
 const Optimization = () => {
   const { state, dispatch } = useTender()
   const { tenders, criteria } = state
@@ -18,32 +20,48 @@ const Optimization = () => {
     )
   }
 
-  // Optimization algorithm
-  const optimizeTenders = () => {
+  // Optimization algorithm: scored server-side against the criteria weights,
+  // with the local heuristic as a fallback when the API is unreachable
+  const optimizeTenders = async () => {
     setIsOptimizing(true)
-    
-    // Simulate processing time
-    setTimeout(() => {
-      const result = calculateOptimalSelection(tenders, criteria)
-      setOptimizationResult(result)
-      dispatch({ type: 'SET_OPTIMIZATION_RESULT', payload: result })
-      setIsOptimizing(false)
-    }, 1500)
+
+    let result: OptimizationResult
+    try {
+      const response = await fetch(`${API_BASE}/optimise`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ offers: tenders, criteria, k: 3 })
+      })
+      if (!response.ok) {
+        throw new Error(`Optimisation failed with status ${response.status}`)
+      }
+      const data = await response.json()
+      result = { ...data, reasoning: generateReasoning(data.selectedTenders, criteria) }
+    } catch (error) {
+      console.error('Falling back to local optimisation:', error)
+      result = calculateOptimalSelection(tenders, criteria)
+    }
+
+    setOptimizationResult(result)
+    dispatch({ type: 'SET_OPTIMIZATION_RESULT', payload: result })
+    setIsOptimizing(false)
   }
 
   const calculateOptimalSelection = (tenders: TenderOffer[], criteria: TenderCriteria): OptimizationResult => {
+    // Hoisted out of the per-tender map so scoring stays O(n)
+    const maxCost = Math.max(...tenders.map(t => t.totalCost))
+    const maxDeliveryTime = Math.max(...tenders.map(t => t.deliveryTime))
+
     // Calculate weighted scores for each tender using new business-relevant criteria
     const scoredTenders = tenders.map(tender => {
       // Relevance (25%) - Based on quality score and technical score
       const relevanceScore = ((tender.qualityScore + tender.technicalScore) / 20) * 25
       
       // Profitability (30%) - Based on cost efficiency and financial stability
-      const maxCost = Math.max(...tenders.map(t => t.totalCost))
       const costEfficiency = (1 - (tender.totalCost / maxCost))
       const profitabilityScore = (costEfficiency * 0.7 + (tender.financialStability / 10) * 0.3) * 30
       
       // Resources feasibility (20%) - Based on delivery time and reliability
-      const maxDeliveryTime = Math.max(...tenders.map(t => t.deliveryTime))
       const deliveryEfficiency = (1 - (tender.deliveryTime / maxDeliveryTime))
       const resourcesScore = (deliveryEfficiency * 0.6 + (tender.reliabilityScore / 10) * 0.4) * 20
       
@@ -15,9 +15,21 @@ export interface ExtractedData {
   description?: string
   terms?: string
   confidence: number // 0-1, how confident we are in the extraction
+  fieldConfidence?: Record<string, number> // 0-1 per extracted field
+  error?: string
   [key: string]: any // Allow dynamic property access
 }
 
+interface ExtractionResult {
+  filename: string
+  ok: boolean
+  error?: string
+  confidence: number
+  fields: Record<string, { value: any; confidence: number }>
+}
+
+const API_BASE = 'http://localhost:3000'
+
 export class DocumentProcessor {
   private static instance: DocumentProcessor
 
@@ -29,20 +41,11 @@ export class DocumentProcessor {
   }
 
   async processDocument(file: File): Promise<ExtractedData> {
-    const fileType = this.getFileType(file)
-    
-    switch (fileType) {
-      case 'pdf':
-        return this.processPDF(file)
-      case 'image':
-        return this.processImage(file)
-      case 'text':
-        return this.processText(file)
-      case 'document':
-        return this.processWordDocument(file)
-      default:
-        throw new Error(`Unsupported file type: ${fileType}`)
+    const [result] = await this.processMultipleFiles([file])
+    if (result.error) {
+      throw new Error(result.error)
     }
+    return result
   }
 
   private getFileType(file: File): string {
@@ -56,52 +59,16 @@ export class DocumentProcessor {
     return 'unknown'
   }
 
-  private async processPDF(file: File): Promise<ExtractedData> {
-    // Simulate PDF processing with OCR and text extraction
-    return new Promise((resolve) => {
-      setTimeout(() => {
-        const extractedData = this.extractFromText(this.generateSampleText())
-        resolve({
-          ...extractedData,
-          confidence: 0.85
-        })
-      }, 2000)
+  private fromBackend(result: ExtractionResult): ExtractedData {
+    const data: ExtractedData = { confidence: result.confidence, fieldConfidence: {} }
+    Object.entries(result.fields).forEach(([key, field]) => {
+      data[key] = field.value
+      data.fieldConfidence![key] = field.confidence
     })
-  }
-
-  private async processImage(file: File): Promise<ExtractedData> {
-    // Simulate image processing with OCR
-    return new Promise((resolve) => {
-      setTimeout(() => {
-        const extractedData = this.extractFromText(this.generateSampleText())
-        resolve({
-          ...extractedData,
-          confidence: 0.75
-        })
-      }, 1500)
-    })
-  }
-
-  private async processText(file: File): Promise<ExtractedData> {
-    const text = await file.text()
-    const extractedData = this.extractFromText(text)
-    return {
-      ...extractedData,
-      confidence: 0.90
+    if (!result.ok) {
+      data.error = result.error
     }
-  }
-
-  private async processWordDocument(file: File): Promise<ExtractedData> {
-    // Simulate document processing
-    return new Promise((resolve) => {
-      setTimeout(() => {
-        const extractedData = this.extractFromText(this.generateSampleText())
-        resolve({
-          ...extractedData,
-          confidence: 0.80
-        })
-      }, 1800)
-    })
+    return data
   }
 
   private extractFromText(text: string): ExtractedData {
@@ -160,52 +127,29 @@ export class DocumentProcessor {
     return data
   }
 
-  private generateSampleText(): string {
-    const samples = [
-      `TENDER PROPOSAL
-Supplier: ABC Construction Ltd.
-Project: Office Building Renovation
-Total Cost: $125,000 USD
-Delivery Time: 45 days
-Quality Score: 8.5/10
-Risk Level: Medium
-Description: Comprehensive renovation services including electrical, plumbing, and structural work.`,
-      
-      `COMPANY: XYZ Services Inc.
-PROJECT NAME: IT Infrastructure Upgrade
-AMOUNT: €85,000
-LEAD TIME: 30 days
-QUALITY GRADE: 9/10
-RISK: Low
-Terms: Payment 50% upfront, 50% upon completion.`,
-      
-      `Vendor: Tech Solutions Corp
-Tender: Software Development
-Price: $200,000
-Duration: 60 days
-Quality: 7.5 out of 10
-Risk Level: High
-Description: Custom software development for inventory management system.`
-    ]
-    
-    return samples[Math.floor(Math.random() * samples.length)]
-  }
-
-  // Batch processing for multiple files
+  // Batch processing for multiple files: one multipart upload, the backend
+  // extracts them in parallel and returns results in the same order
   async processMultipleFiles(files: File[]): Promise<ExtractedData[]> {
-    const results: ExtractedData[] = []
-    
-    for (const file of files) {
-      try {
-        const result = await this.processDocument(file)
-        results.push(result)
-      } catch (error) {
-        console.error(`Error processing ${file.name}:`, error)
-        results.push({ confidence: 0 })
+    const form = new FormData()
+    files.forEach(file => form.append('files', file))
+
+    try {
+      const response = await fetch(`${API_BASE}/extract`, { method: 'POST', body: form })
+      if (!response.ok) {
+        throw new Error(`Extraction failed with status ${response.status}`)
       }
+      const { results } = await response.json() as { results: ExtractionResult[] }
+      return results.map(result => this.fromBackend(result))
+    } catch (error) {
+      console.error('Error extracting documents:', error)
+      // Plain-text files can still be read locally when the backend is down
+      return Promise.all(files.map(async file => {
+        if (this.getFileType(file) !== 'text') {
+          return { confidence: 0, error: String(error) }
+        }
+        return { ...this.extractFromText(await file.text()), confidence: 0.5 }
+      }))
     }
-    
-    return results
   }
 
   // Merge extracted data from multiple sources
@@ -215,7 +159,7 @@ Description: Custom software development for inventory management system.`
 
     dataArray.forEach(data => {
       Object.entries(data).forEach(([key, value]) => {
-        if (key === 'confidence') return
+        if (['confidence', 'fieldConfidence', 'error'].includes(key)) return
         
         if (value !== undefined) {
           if (!merged[key]) {
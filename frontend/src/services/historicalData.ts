@@ -6,14 +6,16 @@ export interface HistoricalComparison {
     max: number
     average: number
     percentile: number // Where the current tender falls in the range
+    currency: string // Same currency as the tender
   }
+  // null when no comparable award carries an evaluation score
   scoreComparison: {
     historicalAverage: number
     historicalMax: number
     historicalMin: number
     currentScore: number
     percentile: number
-  }
+  } | null
   recommendations: string[]
   riskAssessment: {
     level: 'low' | 'medium' | 'high'
@@ -28,6 +30,25 @@ export interface HistoricalComparison {
   }
 }
 
+interface BackendDistribution {
+  count: number
+  min: number
+  max: number
+  mean: number
+  p50: number
+  percentile: number
+  position: string
+}
+
+interface BackendComparison {
+  category: string | null
+  currency: string
+  price: Record<string, BackendDistribution | undefined>
+  score: Record<string, BackendDistribution | undefined>
+}
+
+const API_BASE = 'http://localhost:3000'
+
 export class HistoricalDataService {
   private static instance: HistoricalDataService
 
@@ -38,31 +59,35 @@ export class HistoricalDataService {
     return HistoricalDataService.instance
   }
 
-  // Simulate historical data based on the uploaded tender
+  // Compare the tender against the award history precomputed on the backend
   async analyzeAgainstHistoricalData(tender: TenderOffer): Promise<HistoricalComparison> {
-    // Simulate API delay
-    await new Promise(resolve => setTimeout(resolve, 2000))
-
-    // Generate realistic historical data based on the tender's characteristics
     const baseCost = tender.totalCost
     const baseScore = (tender.qualityScore + tender.technicalScore + tender.reliabilityScore + tender.financialStability + tender.pastPerformance) / 5
 
-    // Generate price range (historical data)
-    const priceVariation = 0.3 // 30% variation
-    const minPrice = baseCost * (1 - priceVariation)
-    const maxPrice = baseCost * (1 + priceVariation)
-    const avgPrice = (minPrice + maxPrice) / 2
-    const currentPercentile = ((baseCost - minPrice) / (maxPrice - minPrice)) * 100
+    const response = await fetch(`${API_BASE}/historical/compare`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        amount: baseCost,
+        currency: tender.currency,
+        score: baseScore,
+        description: `${tender.projectName} ${tender.description}`
+      })
+    })
+    if (!response.ok) {
+      throw new Error(`Historical comparison failed with status ${response.status}`)
+    }
+    const comparison = await response.json() as BackendComparison
 
-    // Generate score comparison
-    const scoreVariation = 2 // ±2 points variation
-    const historicalMin = Math.max(1, baseScore - scoreVariation)
-    const historicalMax = Math.min(10, baseScore + scoreVariation)
-    const historicalAvg = (historicalMin + historicalMax) / 2
-    const scorePercentile = ((baseScore - historicalMin) / (historicalMax - historicalMin)) * 100
+    // Prefer the narrowest scope with history: category, then all awards
+    const price = comparison.price.category || comparison.price.all
+    const score = comparison.score.category || comparison.score.all
+    if (!price) {
+      throw new Error('No award history available for comparison')
+    }
 
     // Generate recommendations
-    const recommendations = this.generateRecommendations(tender, currentPercentile, scorePercentile)
+    const recommendations = this.generateRecommendations(tender, price.percentile, score ? score.percentile : null)
 
     // Generate risk assessment
     const riskAssessment = this.generateRiskAssessment(tender)
@@ -72,25 +97,26 @@ export class HistoricalDataService {
 
     return {
       priceRange: {
-        min: Math.round(minPrice),
-        max: Math.round(maxPrice),
-        average: Math.round(avgPrice),
-        percentile: Math.round(currentPercentile)
+        min: Math.round(price.min),
+        max: Math.round(price.max),
+        average: Math.round(price.mean),
+        percentile: Math.round(price.percentile),
+        currency: comparison.currency
       },
-      scoreComparison: {
-        historicalAverage: Math.round(historicalAvg * 10) / 10,
-        historicalMax: Math.round(historicalMax * 10) / 10,
-        historicalMin: Math.round(historicalMin * 10) / 10,
+      scoreComparison: score ? {
+        historicalAverage: Math.round(score.mean * 10) / 10,
+        historicalMax: Math.round(score.max * 10) / 10,
+        historicalMin: Math.round(score.min * 10) / 10,
         currentScore: Math.round(baseScore * 10) / 10,
-        percentile: Math.round(scorePercentile)
-      },
+        percentile: Math.round(score.percentile)
+      } : null,
       recommendations,
       riskAssessment,
       marketInsights
     }
   }
 
-  private generateRecommendations(tender: TenderOffer, pricePercentile: number, scorePercentile: number): string[] {
+  private generateRecommendations(tender: TenderOffer, pricePercentile: number, scorePercentile: number | null): string[] {
     const recommendations: string[] = []
 
     if (pricePercentile > 80) {
@@ -99,7 +125,9 @@ export class HistoricalDataService {
       recommendations.push('Excellent pricing - this tender is in the lower 20% of historical prices')
     }
 
-    if (scorePercentile > 80) {
+    if (scorePercentile === null) {
+      recommendations.push('No score history for comparable awards - quality could not be ranked')
+    } else if (scorePercentile > 80) {
       recommendations.push('High quality tender - consider this as a premium option')
     } else if (scorePercentile < 40) {
       recommendations.push('Quality concerns - review technical specifications carefully')